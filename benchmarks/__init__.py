@@ -0,0 +1 @@
+# benchmark suite of bioink_models, run with python -m benchmarks.run
@@ -0,0 +1,254 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+
+from benchmarks import synthetic
+
+# BENCHMARK SUITE #
+# times every stage of the pipeline over growing inputs and appends the results to a history file
+# (one JSON object per line, with the git commit), so a run can be compared against earlier commits
+# on the same machine:
+#   kernel  : analytic profile of main.py's CALCULATION SECTION, N = 10^3 .. 10^7
+#   read    : read_data (ParaView csv) on synthetic ss_data.csv files
+#   xy      : .xy parsing of plot_ss_uy.py (text parse, cold cache, warm memory-mapped cache)
+#   fit     : power law fit of the simulation viscosity (and scipy's curve_fit when installed)
+#   render  : cross-section contour raster and the five needle report figures
+#   gcode   : G-code planner, power law (closed form) and Carreau-Yasuda (master curve) over
+#             10^3 .. 10^6 lines
+# synthetic files go to benchmarks/.data and are reused between runs; the history file is kept
+# there as well (outside the tracked tree) unless --history names another path
+#
+#   python -m benchmarks.run [--stages kernel,read] [--max-bytes 1e9] [--quick] [--compare]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, ".data")
+HISTORY = os.path.join(DATA_DIR, "history.jsonl")
+STAGES = ("kernel", "read", "xy", "fit", "render", "gcode")
+FILE_SIZES = (1e6, 1e7, 1e8, 1e9)  # [bytes]
+
+PARAMS = dict(R=100e-6, Ln=20e-3, Pn=1465.807e3, K=160.630, n=0.360)
+
+
+# best and median wall time of repeat calls [s]; at least one call, and no more than budget [s]
+def measure(func, repeat=5, budget=10.0):
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat and (not times or time.perf_counter() - start < budget):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+    return {"best": min(times), "median": float(np.median(times)), "repeat": len(times)}
+
+
+def bench_kernel(quick=False, **_):
+    from bioink_models import report
+
+    for exponent in range(3, 6 if quick else 8):
+        N = 10**exponent
+        result = measure(lambda: report.analytic_profile(N=N, **PARAMS))
+        yield {"name": "kernel.analytic_profile", "size": N, **result}
+
+
+def bench_read(max_bytes=1e8, quick=False, **_):
+    from bioink_models import paraview
+
+    for size in FILE_SIZES:
+        if size > max_bytes or (quick and size > 1e7):
+            break
+        path = synthetic.cached(synthetic.write_ss_csv, DATA_DIR, f"ss_{size:.0e}.csv", size)
+        result = measure(lambda: paraview.read_profile(path), repeat=3)
+        yield {"name": "read_data", "size": os.path.getsize(path), **result}
+
+
+def bench_xy(max_bytes=1e8, quick=False, **_):
+    from bioink_models import xy
+
+    for size in FILE_SIZES:
+        if size > max_bytes or (quick and size > 1e7):
+            break
+        path = synthetic.cached(synthetic.write_uls_xy, DATA_DIR, f"{size:.0e}uLs.xy", size)
+        nbytes = os.path.getsize(path)
+        result = measure(lambda: xy.load_xy(path, use_cache=False), repeat=3)
+        yield {"name": "xy.parse", "size": nbytes, **result}
+        with tempfile.TemporaryDirectory() as cache_dir:
+            result = measure(lambda: xy.load_xy(path, cache_dir=cache_dir), repeat=1)
+            yield {"name": "xy.load_cold", "size": nbytes, **result}
+            result = measure(
+                lambda: np.abs(xy.load_xy(path, cache_dir=cache_dir)["U_y"]).mean()
+            )
+            yield {"name": "xy.load_warm", "size": nbytes, **result}
+
+
+def bench_fit(quick=False, **_):
+    from bioink_models import kernel, report
+
+    rng = np.random.default_rng(0)
+    try:
+        from scipy.optimize import curve_fit
+    except ImportError:
+        curve_fit = None
+    for exponent in range(3, 5 if quick else 7):
+        N = 10**exponent
+        r = np.linspace(1e-6, PARAMS["R"], N)
+        args = (PARAMS["Ln"], PARAMS["Pn"], PARAMS["K"], PARAMS["n"])
+        shear_rate = kernel.gamma_dot(r, *args)
+        nu = kernel.eta(r, *args) * (1 + 0.05 * rng.standard_normal(N))
+        result = measure(lambda: report.fit_simulation(shear_rate, nu))
+        yield {"name": "fit.power_law", "size": N, **result}
+        if curve_fit is not None:
+            result = measure(
+                lambda: curve_fit(lambda g, K, m: K * g ** (-m), shear_rate, nu)
+            )
+            yield {"name": "fit.scipy_curve_fit", "size": N, **result}
+
+
+def bench_render(quick=False, **_):
+    from bioink_models import contour, figures, report
+
+    profile = report.analytic_profile(N=1000, **PARAMS)
+    r, tau = profile["r"] * 1e6, profile["tau_rz"]
+    for resolution in (200, 400, 800) if quick else (200, 400, 800, 1600, 3200):
+        result = measure(lambda: contour.radial_raster(r, tau, resolution))
+        yield {"name": "contour.radial_raster", "size": resolution, **result}
+
+    simulation = {}
+    for field, values in (
+        ("U", profile["Vz"]),
+        ("shearRate", -profile["dVzdr"]),
+        ("shearStress", profile["tau_rz"]),
+        ("nu", profile["eta"]),
+    ):
+        simulation["df_" + field] = values
+        simulation["xx_" + field] = r
+    data = {
+        "x": r,
+        "Vz": profile["Vz"],
+        "dVzdr": profile["dVzdr"],
+        "tau_rz": tau,
+        "eta": profile["eta"],
+        **simulation,
+        "K": PARAMS["K"],
+        "n": PARAMS["n"],
+        "popt": np.array([PARAMS["K"], 1 - PARAMS["n"]]),
+    }
+    with tempfile.TemporaryDirectory() as out_dir:
+        for name in figures.NEEDLE_REPORT:
+            path = os.path.join(out_dir, name + ".png")
+            result = measure(lambda: figures.render(name, data, path, dpi=100), repeat=3)
+            yield {"name": f"figures.{name}", "size": 100, **result}
+
+
+def bench_gcode(quick=False, **_):
+    from bioink_models import gcode
+    from bioink_models.geometry import Needle
+    from bioink_models.rheology import CarreauYasuda, PowerLaw
+
+    needle = Needle.straight(PARAMS["R"], PARAMS["Ln"])
+    models = {
+        "power_law": PowerLaw(PARAMS["K"], PARAMS["n"]),
+        "carreau_yasuda": CarreauYasuda(50.0, 0.01, 0.5, 2.0, 0.4),
+    }
+    for exponent in range(3, 5 if quick else 7):
+        lines = synthetic.gcode_lines(10**exponent)
+        for name, model in models.items():
+            planner = gcode.Planner(needle, model)
+            result = measure(lambda: gcode.plan(iter(lines), io.StringIO(), planner), repeat=3)
+            yield {"name": f"gcode.plan.{name}", "size": len(lines), **result}
+
+
+BENCHMARKS = {
+    "kernel": bench_kernel,
+    "read": bench_read,
+    "xy": bench_xy,
+    "fit": bench_fit,
+    "render": bench_render,
+    "gcode": bench_gcode,
+}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.node(),
+        "processor": platform.machine(),
+    }
+
+
+# last recorded best time of every (name, size) on this machine
+def load_history(path=HISTORY, machine=None):
+    last = {}
+    if not os.path.exists(path):
+        return last
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if machine is None or record.get("machine") == machine:
+                last[record["name"], record["size"]] = record
+    return last
+
+
+def run(stages=STAGES, history=HISTORY, compare=False, **options):
+    env = environment()
+    previous = load_history(history, env["machine"]) if compare else {}
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    records = []
+    for stage in stages:
+        for result in BENCHMARKS[stage](**options):
+            record = {"timestamp": timestamp, "stage": stage, **result, **env}
+            records.append(record)
+            line = f"{result['name']:<32} {result['size']:>12g} {result['best'] * 1e3:>12.3f} ms"
+            old = previous.get((result["name"], result["size"]))
+            if old is not None:
+                commit = (old["commit"] or "?")[:8]
+                line += f"  x{result['best'] / old['best']:.2f} vs {commit}"
+            print(line, flush=True)
+            if history:
+                os.makedirs(os.path.dirname(os.path.abspath(history)), exist_ok=True)
+                with open(history, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bioink_models pipeline")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated")
+    parser.add_argument("--max-bytes", type=float, default=1e8, help="largest synthetic file")
+    parser.add_argument("--quick", action="store_true", help="small sizes only")
+    parser.add_argument("--history", default=HISTORY, help="results file ('' to skip)")
+    parser.add_argument("--compare", action="store_true", help="ratio to the last result")
+    args = parser.parse_args(argv)
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = sorted(set(stages) - set(STAGES))
+    if unknown:
+        parser.error(f"unknown stages: {unknown}")
+    run(
+        stages,
+        args.history,
+        args.compare,
+        max_bytes=args.max_bytes,
+        quick=args.quick,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import os
+import numpy as np
+from functools import partial
+
+from bioink_models import kernel, xy
+
+# SYNTHETIC INPUT FILES #
+# power law needle profiles written in the layout of the real inputs, sized by bytes rather than
+# rows so the readers can be measured from 1 MB to 1 GB; files are written chunk by chunk, so even
+# the largest one never sits in memory
+#   ss_csv : ParaView "plot over line" export across the needle cross-section, like data/ss_data.csv
+#   uls_xy : OpenFOAM line sample along the radius, like data/<flow rate>uLs.xy
+#   gcode  : a random walk of extruding G1 moves with a travel move every tenth line (in memory)
+# the first two sample the radius 0..R repeatedly (one sweep = SWEEP rows) with a little noise
+
+R = 100e-6  # [m]
+LN = 20e-3  # [m]
+K = 160.630  # [Pa*s^n]
+N_INDEX = 0.360  # [-]
+RHO = 1000  # [kg/m^3]
+SWEEP = 1000
+CHUNK_ROWS = 100_000
+
+SS_CSV_COLUMNS = (
+    "U:0", "U:1", "U:2",
+    *(f"grad(U):{i}" for i in range(9)),
+    "nu", "p",
+    *(f"shearStress:{i}" for i in range(6)),
+    "strainRate",
+    "wallShearStress:0", "wallShearStress:1", "wallShearStress:2",
+    "vtkValidPointMask", "arc_length", "Points:0", "Points:1", "Points:2",
+)  # fmt: skip
+ROW_BYTES = {"%.5g": 135, "%19.12g": 200}  # lower bound of a row, sizes the last chunks
+
+
+def _radius(start, stop):
+    i = np.arange(start, stop) % SWEEP
+    return np.maximum(i / (SWEEP - 1) * R, 1e-9)
+
+
+def _ss_csv_chunk(start, stop, rng, Pn):
+    r = _radius(start, stop)
+    rows = r.size
+    tau = kernel.tau_rz(r, LN, Pn)
+    gamma_dot = kernel.gamma_dot(r, LN, Pn, K, N_INDEX)
+    noise = 1 + 1e-3 * rng.standard_normal(rows)
+    table = np.zeros((rows, len(SS_CSV_COLUMNS)))
+    col = {name: i for i, name in enumerate(SS_CSV_COLUMNS)}
+    table[:, col["U:2"]] = kernel.Vz(r, R, LN, Pn, K, N_INDEX) * noise
+    table[:, col["grad(U):6"]] = -gamma_dot / np.sqrt(2)
+    table[:, col["grad(U):7"]] = -gamma_dot / np.sqrt(2)
+    table[:, col["nu"]] = tau / gamma_dot / RHO * noise
+    table[:, col["p"]] = Pn / RHO / 2
+    table[:, col["shearStress:4"]] = -tau / RHO / np.sqrt(2) * noise
+    table[:, col["shearStress:5"]] = -tau / RHO / np.sqrt(2) * noise
+    table[:, col["strainRate"]] = gamma_dot * noise
+    table[:, col["vtkValidPointMask"]] = 1
+    table[:, col["arc_length"]] = r
+    table[:, col["Points:0"]] = r / np.sqrt(2)
+    table[:, col["Points:1"]] = r / np.sqrt(2)
+    table[:, col["Points:2"]] = 0.0065
+    return table
+
+
+def _xy_chunk(start, stop, rng, Pn):
+    r = _radius(start, stop)
+    rows = r.size
+    tau = kernel.tau_rz(r, LN, Pn)
+    table = 1e-6 * rng.standard_normal((rows, len(xy.COLUMNS)))
+    table[:, 0] = r
+    table[:, 2] = -tau / RHO
+    table[:, 8] = -kernel.Vz(r, R, LN, Pn, K, N_INDEX)
+    return table
+
+
+# write chunks until the file holds size_bytes
+def _write(path, header, fmt, delimiter, chunk, size_bytes, seed):
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(header + "\n")
+        start = 0
+        while f.tell() < size_bytes:
+            rows = max(min(CHUNK_ROWS, int((size_bytes - f.tell()) // ROW_BYTES[fmt]) + 1), 1)
+            np.savetxt(f, chunk(start, start + rows, rng), fmt=fmt, delimiter=delimiter)
+            start += rows
+    return path
+
+
+# ParaView csv of about size_bytes
+def write_ss_csv(path, size_bytes, flow_rate=1e-9, seed=0):
+    Pn = kernel.Pn_func(flow_rate, R, LN, K, N_INDEX)
+    header = ",".join(f'"{c}"' for c in SS_CSV_COLUMNS)
+    chunk = partial(_ss_csv_chunk, Pn=Pn)
+    return _write(path, header, "%.5g", ",", chunk, size_bytes, seed)
+
+
+# OpenFOAM .xy sample of about size_bytes; name it '<flow rate [uL/s]>uLs.xy' for ingest
+def write_uls_xy(path, size_bytes, flow_rate=1e-9, seed=0):
+    Pn = kernel.Pn_func(flow_rate, R, LN, K, N_INDEX)
+    header = f"#{xy.COLUMNS[0]:>18}" + "".join(f" {c:>19}" for c in xy.COLUMNS[1:])
+    chunk = partial(_xy_chunk, Pn=Pn)
+    return _write(path, header, "%19.12g", " ", chunk, size_bytes, seed)
+
+
+# reuse an earlier file of the same name and size class
+def cached(writer, directory, name, size_bytes, **kwargs):
+    path = os.path.join(directory, name)
+    if not os.path.exists(path) or abs(os.path.getsize(path) - size_bytes) > 0.1 * size_bytes:
+        writer(path, size_bytes, **kwargs)
+    return path
+
+
+# lines of a slicer-like G-code print (relative E in mm^3, mixed feed rates)
+def gcode_lines(count, seed=0):
+    rng = np.random.default_rng(seed)
+    path = np.cumsum(rng.uniform(-2, 2, (count, 2)), axis=0)
+    e = rng.uniform(0.05, 0.6, count)
+    feed = rng.choice([300, 600, 1200], count)
+    lines = ["G21\n", "G90\n", "M83\n", "G92 E0\n"]
+    for i in range(count):
+        if i % 10 == 0:
+            lines.append(f"G0 X{path[i, 0]:.3f} Y{path[i, 1]:.3f} F3000\n")
+        else:
+            lines.append(f"G1 X{path[i, 0]:.3f} Y{path[i, 1]:.3f} E{e[i]:.4f} F{feed[i]}\n")
+    return lines
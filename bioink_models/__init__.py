@@ -0,0 +1,58 @@
+# Bioink inside a cylindrical needle; analytical models shared by main.py and the plot scripts
+#
+# importing the package has no side effects and only loads NumPy: the closed-form power law below
+# is ready to use, every other module is imported on first attribute access (bioink_models.figures,
+# bioink_models.fitting, ...), and pandas / matplotlib are only imported by the functions that need
+# them; `python -m bioink_models.importcheck` guards the import time
+import importlib
+
+from bioink_models.kernel import (
+    Pn_func,
+    Qave,
+    Re_PL,
+    V_average,
+    Vz,
+    eta,
+    eta_PL,
+    gamma_dot,
+    tau_rz,
+    tau_wall,
+)
+
+SUBMODULES = (
+    "cache",
+    "cli",
+    "coaxial",
+    "contour",
+    "dose",
+    "figures",
+    "fitting",
+    "gcode",
+    "geometry",
+    "grid",
+    "importcheck",
+    "ingest",
+    "instrument",
+    "kernel",
+    "master_curve",
+    "openfoam",
+    "paraview",
+    "pipeflow",
+    "report",
+    "rheology",
+    "solver",
+    "sweep",
+    "uncertainty",
+    "validate",
+    "xy",
+)
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(SUBMODULES))
@@ -0,0 +1,3 @@
+from bioink_models.cli import main
+
+main()
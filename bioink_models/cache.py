@@ -0,0 +1,131 @@
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+# RESULT CACHE #
+# content-addressed cache for computed arrays (analytic profiles, fits, sweep tables)
+# key   : sha256 of the parameters (model, K, n, R, Ln, Pn, N, ...) plus the content hash of every
+#         input file, so an edited data file gives a new key; callers put a version of the
+#         computation in the parameters (report.PROFILE_VERSION, report.FIT_VERSION), so entries
+#         stored on disk by older code are not served after it changes
+# value : dict {name: array or scalar}
+# a bounded in-memory LRU sits in front of an optional size-capped on-disk store of .npz files;
+# the least recently used files are removed once the store grows past max_bytes
+
+_file_hashes = {}  # (path, mtime_ns, size) -> content hash, so unchanged files are hashed once
+
+
+# sha256 of a file's content
+def file_hash(path, block_size=1 << 20):
+    stat = os.stat(path)
+    memo = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if memo not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        _file_hashes[memo] = digest.hexdigest()
+    return _file_hashes[memo]
+
+
+def _update(digest, part):
+    if isinstance(part, np.ndarray):
+        digest.update(f"ndarray{part.dtype.str}{part.shape}".encode())
+        digest.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, (list, tuple)):
+        digest.update(f"{type(part).__name__}{len(part)}".encode())
+        for p in part:
+            _update(digest, p)
+    elif isinstance(part, dict):
+        _update(digest, sorted(part.items()))
+    else:
+        digest.update(f"{type(part).__name__}:{part!r};".encode())
+
+
+# cache key from parameters and input files
+def make_key(*parts, files=()):
+    digest = hashlib.sha256()
+    _update(digest, parts)
+    for path in files:
+        digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_items=64, directory=None, max_bytes=256 * 2**20):
+        self.max_items = max_items
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # value for key, or None on a miss
+    def get(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._memory[key]
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key), allow_pickle=False) as stored:
+                value = {name: stored[name] for name in stored.files}
+            os.utime(self._path(key))  # mark as recently used for the disk eviction
+            self._remember(key, value)
+            self.stats["disk_hits"] += 1
+            return value
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self._path(key) + ".tmp.npz"
+            np.savez(tmp, **value)
+            os.replace(tmp, self._path(key))
+            self._trim_disk()
+
+    # cached value, or compute() stored under key
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    # remove the least recently used files until the store fits in max_bytes
+    def _trim_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz") and not name.endswith(".tmp.npz"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory is not None and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["disk_hits"]) / lookups if lookups else 0.0
+        return {**self.stats, "lookups": lookups, "hit_rate": hit_rate}
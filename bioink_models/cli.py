@@ -0,0 +1,171 @@
+import io
+import os
+import sys
+import csv
+import json
+import argparse
+import itertools
+import numpy as np
+from math import isfinite, pi
+
+from bioink_models import kernel
+
+# STREAMING SOLVER #
+# reads needle/ink parameter records and writes the power law results, one record per line:
+#   input  : newline-delimited JSON objects or CSV with a header line, from a file or stdin
+#            R [m], Ln [m], K [Pa*s^n], n [-] and either Pn [Pa] or Qn [m^3/s]
+#   output : the record with Pn, Qave, tau_wall, V_average, residence_time added, as NDJSON or CSV
+# records are evaluated in vectorized micro-batches and every batch is written (and flushed) before
+# the next one is read, so memory is bounded by the batch size and the tool can sit in a pipeline
+# other fields (ids, labels, ...) are passed through untouched; a record with Pn uses it, otherwise
+# Pn comes from Qn; missing or invalid numbers give null (JSON) / nan (CSV) results, and an NDJSON
+# line that is not a JSON object becomes a record {"error": ...} with null results (the error
+# column of CSV output), so one bad line never stops the stream
+#
+#   python -m bioink_models.cli [records.ndjson | records.csv | -] [--output csv]
+
+PARAMETERS = ("R", "Ln", "K", "n", "Pn", "Qn")
+RESULTS = ("Pn", "Qave", "tau_wall", "V_average", "residence_time")
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# a first line that is JSON, or starts like a JSON object / array, is NDJSON (a broken or
+# non-object first line then becomes an error record); a CSV header is neither
+def _looks_like_json(line):
+    if line.lstrip().startswith(("{", "[")):
+        return True
+    try:
+        json.loads(line)
+    except json.JSONDecodeError:
+        return False
+    return True
+
+
+# first line decides the format in "auto" mode
+def read_records(stream, fmt="auto"):
+    lines = (line for line in stream if line.strip())
+    first = next(lines, None)
+    if first is None:
+        return
+    lines = itertools.chain([first], lines)
+    if fmt == "auto":
+        fmt = "ndjson" if _looks_like_json(first) else "csv"
+    if fmt == "ndjson":
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"error": f"invalid JSON: {e.msg}"}
+                continue
+            if isinstance(record, dict):
+                yield record
+            else:
+                yield {"error": f"not a JSON object: {type(record).__name__}"}
+    else:
+        yield from csv.DictReader(lines)
+
+
+# results of a list of records, {name: (records,) array}
+def solve_batch(records):
+    p = {
+        k: np.array([_number(r.get(k)) for r in records], dtype=np.float64)
+        for k in PARAMETERS
+    }
+    R, Ln, K, n = p["R"], p["Ln"], p["K"], p["n"]
+    pressure_is_known = np.isfinite(p["Pn"])
+    with np.errstate(all="ignore"):
+        Pn = np.where(pressure_is_known, p["Pn"], kernel.Pn_func(p["Qn"], R, Ln, K, n))
+        Q = np.where(pressure_is_known, kernel.Qave(R, Ln, Pn, K, n), p["Qn"])
+        V_average = Q / (pi * R**2)
+        return {
+            "Pn": Pn,
+            "Qave": Q,
+            "tau_wall": kernel.tau_wall(R, Ln, Pn),
+            "V_average": V_average,
+            "residence_time": Ln / V_average,
+        }
+
+
+def _ndjson_lines(records, results):
+    columns = [[v if isfinite(v) else None for v in results[k].tolist()] for k in RESULTS]
+    for record, values in zip(records, zip(*columns)):
+        record.update(zip(RESULTS, values))
+        yield json.dumps(record) + "\n"
+
+
+class _CsvWriter:
+    def __init__(self, out):
+        self.out = out
+        self.fields = None
+
+    def write(self, records, results):
+        columns = [results[k].tolist() for k in RESULTS]
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, self.fields or [], extrasaction="ignore")
+        if self.fields is None:
+            # header from the first valid record (the parameters when the whole first batch is
+            # broken): its fields, the results, then an error column for broken lines
+            first = next((r for r in records if "error" not in r), dict.fromkeys(PARAMETERS))
+            self.fields = [k for k in first if k not in RESULTS] + list(RESULTS) + ["error"]
+            writer.fieldnames = self.fields
+            writer.writeheader()
+        for record, values in zip(records, zip(*columns)):
+            record.update(zip(RESULTS, values))
+            writer.writerow(record)
+        self.out.write(buffer.getvalue())
+
+
+# solve every record of stream and write the results to out, batch_size records at a time
+def run(stream, out, input_format="auto", output_format="ndjson", batch_size=10_000):
+    records = read_records(stream, input_format)
+    csv_writer = _CsvWriter(out) if output_format == "csv" else None
+    count = 0
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            break
+        results = solve_batch(batch)
+        if csv_writer is not None:
+            csv_writer.write(batch, results)
+        else:
+            out.write("".join(_ndjson_lines(batch, results)))
+        out.flush()
+        count += len(batch)
+    return count
+
+
+# downstream closed the pipe (e.g. | head): point stdout at devnull so the interpreter's final flush
+# does not raise again; the command line tools then stop quietly
+def silence_stdout():
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Power law needle flow for a stream of parameter records (NDJSON or CSV)"
+    )
+    parser.add_argument("input", nargs="?", default="-", help="records file (default: stdin)")
+    parser.add_argument("--input-format", choices=("auto", "ndjson", "csv"), default="auto")
+    parser.add_argument("--output", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    stream = sys.stdin if args.input == "-" else open(args.input, newline="")
+    try:
+        run(stream, sys.stdout, args.input_format, args.output, args.batch_size)
+    except BrokenPipeError:
+        silence_stdout()
+        return
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import numpy as np
+from math import pi
+
+from bioink_models.rheology import _gauss_01, QUAD_NODES, QUAD_NODES_PROFILE
+
+# COAXIAL CORE-SHELL FLOW #
+# two inks stratified in one needle of radius R: the core ink in r < r_i, the shell ink in
+# r_i < r < R, both driven by the same pressure gradient G = Pn/Ln; fully developed flow keeps
+# tau_rz(r) = G*r/2 across the interface, and the velocity is continuous there:
+#   shell : U(r) = integral_r^R gamma_dot_s(G*s/2) ds
+#   core  : U(r) = U(r_i) + integral_r^r_i gamma_dot_c(G*s/2) ds
+# integrating by parts, the layer flow rates are
+#   Q_shell = integral_r_i^R pi*s^2*gamma_dot_s ds - pi*r_i^2*U(r_i)
+#   Q_core  = integral_0^r_i pi*s^2*gamma_dot_c ds + pi*r_i^2*U(r_i)
+# with Gauss-Legendre nodes (gamma_dot(tau) of each rheology model, closed form for the power law;
+# no flow below a yield stress, so the lower limit is moved to the yield radius)
+# for given Q_core and Q_shell the interface fraction k = r_i/R and G are found by nested
+# vectorized root-finding over every operating point at once:
+#   inner : G with Q_shell(G, k) = Q_shell (solver.find_pressure, log-log Illinois)
+#   outer : bisection on k of Q_core(G(k), k) - Q_core, which grows with k
+# models are rheology model instances whose parameters broadcast against the operating points
+
+BISECTION_ITER = 60  # halves the interface bracket to ~1e-18 of R
+
+
+def _broadcast_model(model, shape):
+    return type(model)(*[np.broadcast_to(p, shape) for p in model.ink])
+
+
+# the same model with k trailing axes added to every parameter
+def _expand(model, k):
+    return type(model)(*[p.reshape(p.shape + (1,) * k) for p in model.ink])
+
+
+# integral_a^b s^power * gamma_dot(G*s/2) ds on Gauss nodes (trailing axis), zero below the
+# yield radius 2*tau_y/G
+def _integral(model, G, a, b, power, nodes=QUAD_NODES):
+    s_nodes, w_nodes = _gauss_01(nodes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_yield = np.where(G > 0, 2 * model.yield_stress() / G, np.inf)
+    lo = np.minimum(np.maximum(a, r_yield), b)
+    span = b - lo
+    s = lo[..., None] + span[..., None] * s_nodes
+    gamma_dot = _expand(model, 1).shear_rate(G[..., None] * s / 2)
+    return span * ((s**power * gamma_dot) @ w_nodes)
+
+
+# layer flow rates and interface velocity for the gradient G and interface radius r_i
+def layer_flow_rates(core, shell, G, r_i, R):
+    G, r_i, R = [np.asarray(a, dtype=np.float64) for a in (G, r_i, R)]
+    U_i = _integral(shell, G, r_i, R, 0)
+    area = pi * r_i**2 * U_i
+    Q_shell = pi * _integral(shell, G, r_i, R, 2) - area
+    Q_core = pi * _integral(core, G, np.zeros_like(r_i), r_i, 2) + area
+    return Q_core, Q_shell, U_i
+
+
+# operating points Q_core, Q_shell [m^3/s] in a needle R, Ln [m]; returns, each of the broadcast
+# shape: r_interface [m], fraction r_i/R, G [Pa/m], Pn [Pa], tau_wall, tau_interface [Pa],
+# U_interface, U_max [m/s] and the layer flow rates reached
+def solve(core, shell, Q_core, Q_shell, R, Ln, rtol=1e-10):
+    from bioink_models.solver import find_pressure
+
+    arrays = [np.asarray(a, dtype=np.float64) for a in (Q_core, Q_shell, R, Ln)]
+    shape = np.broadcast_shapes(
+        *[a.shape for a in arrays], *[p.shape for p in core.ink + shell.ink]
+    )
+    Q_core, Q_shell, R, Ln = [np.broadcast_to(a, shape) for a in arrays]
+    core, shell = _broadcast_model(core, shape), _broadcast_model(shell, shape)
+
+    def shell_flow(G, R, k):
+        return layer_flow_rates(core, shell, G, k * R, R)[1]
+
+    def gradient(k):
+        return find_pressure(shell_flow, Q_shell, R, k, P_lo=1e3, P_hi=1e9, rtol=rtol)
+
+    lo, hi = np.zeros(shape), np.ones(shape)
+    for _ in range(BISECTION_ITER):
+        k = 0.5 * (lo + hi)
+        G = gradient(k)
+        too_much_core = layer_flow_rates(core, shell, G, k * R, R)[0] > Q_core
+        lo, hi = np.where(too_much_core, lo, k), np.where(too_much_core, k, hi)
+        if np.all(hi - lo <= rtol):
+            break
+    k = 0.5 * (lo + hi)
+    G = gradient(k)
+    r_i = k * R
+    Q_c, Q_s, U_i = layer_flow_rates(core, shell, G, r_i, R)
+    return {
+        "r_interface": r_i,
+        "fraction": k,
+        "G": G,
+        "Pn": G * Ln,
+        "tau_wall": G * R / 2,
+        "tau_interface": G * r_i / 2,
+        "U_interface": U_i,
+        "U_max": U_i + _integral(core, G, np.zeros_like(r_i), r_i, 0),
+        "Q_core": Q_c,
+        "Q_shell": Q_s,
+    }
+
+
+# per-layer profiles of solved operating points, in the form of report.analytic_profile:
+#   {"core": {r, Vz, dVzdr, tau_rz, eta}, "shell": {...}}, arrays (*shape, N), each layer on N
+#   radii from its inner to its outer radius (the core from 1e-6*R, like the single fluid)
+def profiles(core, shell, result, R, N=1000):
+    r_i, G = result["r_interface"], result["G"]
+    shape = r_i.shape
+    R = np.broadcast_to(np.asarray(R, dtype=np.float64), shape)
+    t = np.linspace(0, 1, N)
+    layers = {
+        "core": (_expand(_broadcast_model(core, shape), 1), 1e-6 * R, r_i),
+        "shell": (_expand(_broadcast_model(shell, shape), 1), r_i, R),
+    }
+    out = {}
+    for name, (model, inner, outer) in layers.items():
+        r = inner[..., None] + (outer - inner)[..., None] * t
+        Gx = np.broadcast_to(G[..., None], r.shape)
+        if name == "shell":
+            Vz = _integral(model, Gx, r, np.broadcast_to(R[..., None], r.shape), 0,
+                           QUAD_NODES_PROFILE)
+        else:
+            Vz = result["U_interface"][..., None] + _integral(
+                model, Gx, r, np.broadcast_to(r_i[..., None], r.shape), 0, QUAD_NODES_PROFILE
+            )
+        tau = Gx * r / 2
+        gamma_dot = model.shear_rate(tau)
+        with np.errstate(divide="ignore"):
+            eta = np.where(gamma_dot > 0, tau / gamma_dot, np.inf)
+        out[name] = {"r": r, "Vz": Vz, "dVzdr": -gamma_dot, "tau_rz": tau, "eta": eta}
+    return out
+
+
+def main(argv=None):
+    from bioink_models.rheology import MODELS
+
+    parser = argparse.ArgumentParser(
+        description="Interface radius and pressure drop of coaxial core-shell needle flow"
+    )
+    parser.add_argument("--core-model", default="power_law", choices=sorted(MODELS))
+    parser.add_argument("--core-params", type=float, nargs="+", default=[160.630, 0.360])
+    parser.add_argument("--shell-model", default="power_law", choices=sorted(MODELS))
+    parser.add_argument("--shell-params", type=float, nargs="+", default=[18.5, 0.51])
+    parser.add_argument("--core-flow", type=float, nargs="+", default=[1e-9], help="[m^3/s]")
+    parser.add_argument("--shell-flow", type=float, nargs="+", default=[1e-9], help="[m^3/s]")
+    parser.add_argument("--radius", type=float, default=100e-6, help="needle radius [m]")
+    parser.add_argument("--length", type=float, default=0.02, help="needle length [m]")
+    args = parser.parse_args(argv)
+
+    core = MODELS[args.core_model](*args.core_params)
+    shell = MODELS[args.shell_model](*args.shell_params)
+    # every core flow rate with every shell flow rate
+    Q_core = np.asarray(args.core_flow)[:, None]
+    Q_shell = np.asarray(args.shell_flow)[None, :]
+    result = solve(core, shell, Q_core, Q_shell, args.radius, args.length)
+    print(
+        f"{'Q_core':>8} {'Q_shell':>8} {'r_i [um]':>9} {'r_i/R':>7} {'Pn [kPa]':>10} "
+        f"{'tau_w [kPa]':>11} {'tau_i [kPa]':>11} {'U_i [mm/s]':>10}"
+    )
+    Q_core, Q_shell = np.broadcast_arrays(Q_core, Q_shell)
+    for i in np.ndindex(result["Pn"].shape):
+        print(
+            f"{Q_core[i] * 1e9:>8.4g} {Q_shell[i] * 1e9:>8.4g} "
+            f"{result['r_interface'][i] * 1e6:>9.4f} {result['fraction'][i]:>7.4f} "
+            f"{result['Pn'][i] * 1e-3:>10.5g} {result['tau_wall'][i] * 1e-3:>11.5g} "
+            f"{result['tau_interface'][i] * 1e-3:>11.5g} {result['U_interface'][i] * 1e3:>10.5g}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
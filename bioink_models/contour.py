@@ -0,0 +1,37 @@
+import numpy as np
+
+# CROSS-SECTION CONTOUR #
+# the needle cross-section field only depends on the radius, so instead of N x N meshgrids of the
+# profile it is drawn as a raster: every pixel centre is mapped to its radius and the radial profile
+# is interpolated there once; memory and time only depend on the raster resolution, not on N
+# pixels outside the needle (radius > r[-1]) are left blank, like contourf leaves values above the
+# top level unfilled
+
+
+# (resolution, resolution) image of field(r) over the square [-r_max, r_max]^2
+def radial_raster(r, field, resolution=800, r_max=None):
+    r = np.asarray(r, dtype=np.float64)
+    field = np.asarray(field, dtype=np.float64)
+    r_max = r[-1] if r_max is None else r_max
+    half = r_max / resolution
+    centres = np.linspace(-r_max + half, r_max - half, resolution)
+    radius = np.hypot(centres[:, None], centres[None, :])
+    return np.interp(radius, r, field, right=np.nan)
+
+
+# filled contour of a radial field on ax, banded on levels like contourf
+def radial_contourf(ax, r, field, levels, cmap, resolution=800, r_max=None):
+    from matplotlib.colors import BoundaryNorm
+
+    r_max = np.asarray(r)[-1] if r_max is None else r_max
+    image = radial_raster(r, field, resolution, r_max)
+    image = np.where(image > levels[-1], np.nan, image)
+    return ax.imshow(
+        image,
+        extent=(-r_max, r_max, -r_max, r_max),
+        origin="lower",
+        cmap=cmap,
+        norm=BoundaryNorm(levels, cmap.N),
+        interpolation="nearest",
+        aspect="auto",
+    )
@@ -0,0 +1,211 @@
+import csv
+import argparse
+import numpy as np
+
+from bioink_models.uncertainty import HISTOGRAM_BINS, PERCENTILES, StreamingHistogram
+
+# CELL SHEAR DOSE #
+# cells travel along straight streamlines of the fully developed needle flow, so a cell entering at
+# radius r stays there for the whole needle length Ln:
+#   residence time t(r) = Ln/Vz(r),  shear stress tau(r) = tau_rz(r),  dose D(r) = tau(r)*t(r)
+# virtual cells are seeded over the cross-section in proportion to the flux 2*pi*r*Vz(r) dr (every
+# printed cell crossed the needle, most of them through the fast core), by inverting the
+# cumulative flux of the profile; "stratified" places one cell per equal flux slice, "random" draws
+# them. cells are processed in chunks and the residence time, dose and shear stress go into
+# streaming log-spaced histograms (uncertainty.StreamingHistogram), so millions of cells take the
+# memory of one chunk; distribution() turns a histogram into the fraction and CDF per bin
+# the profile is r [m] with Vz [m/s] and tau [Pa] from the analytic model (analytic_profile) or a
+# simulation .xy/ParaView csv sample (simulation_profile), linearly interpolated between points
+# cells next to the wall are slow and see the highest stress, so the upper tail of both
+# distributions comes from the last profile points
+
+QUANTITIES = ("residence_time", "dose", "shear_stress")
+UNITS = {"residence_time": "s", "dose": "Pa*s", "shear_stress": "Pa"}
+DISTRIBUTION_COLUMNS = ("quantity", "lower", "upper", "count", "fraction", "cdf")
+
+
+# {r, Vz, tau} of a rheology model on N radii from the axis to the wall
+def analytic_profile(model, R, Ln, Pn, N=2001):
+    r = np.linspace(0.0, R, N)
+    return {"r": r, "Vz": model.velocity(r, Pn, R, Ln), "tau": model.tau_rz(r, Ln, Pn)}
+
+
+# {r, Vz, tau} of a simulation sample; both sides of the axis of an .xy line are folded onto one
+# radius axis (points at the same radius averaged), samples beyond R dropped
+def simulation_profile(path, R=None, rho=1000):
+    from bioink_models.validate import load_samples
+
+    r, fields = load_samples(path, rho)
+    Vz, tau = np.abs(fields["velocity"]), np.abs(fields["shear_stress"])
+    keep = np.isfinite(r) & np.isfinite(Vz) & np.isfinite(tau)
+    if R is not None:
+        keep &= r <= R
+    r_unique, inverse, counts = np.unique(r[keep], return_inverse=True, return_counts=True)
+    return {
+        "r": r_unique,
+        "Vz": np.bincount(inverse, Vz[keep]) / counts,
+        "tau": np.bincount(inverse, tau[keep]) / counts,
+    }
+
+
+# cumulative flux 2*pi*integral Vz*r dr at every profile radius (trapezoid rule)
+def cumulative_flux(profile):
+    r, Vz = profile["r"], profile["Vz"]
+    q = Vz * r
+    return np.concatenate([[0.0], np.cumsum(np.pi * (q[1:] + q[:-1]) * np.diff(r))])
+
+
+# seeding radii of cells [start, stop) out of count, flux weighted
+def seed_cells(profile, start, stop, count, seeding="stratified", rng=None):
+    flux = cumulative_flux(profile)
+    if seeding == "stratified":
+        u = (np.arange(start, stop) + 0.5) / count
+    elif seeding == "random":
+        u = (rng or np.random.default_rng()).random(stop - start)
+    else:
+        raise ValueError(f"unknown seeding {seeding!r} (use 'stratified' or 'random')")
+    # np.interp needs increasing flux: drop the steps where the flux does not grow
+    grows = np.concatenate([[True], np.diff(flux) > 0])
+    return np.interp(u * flux[-1], flux[grows], profile["r"][grows])
+
+
+# residence time [s], shear stress [Pa] and dose [Pa*s] of cells at radii r
+def exposure(profile, r, Ln):
+    Vz = np.interp(r, profile["r"], profile["Vz"])
+    tau = np.interp(r, profile["r"], profile["tau"])
+    with np.errstate(divide="ignore"):
+        time = Ln / Vz
+    return {"residence_time": time, "dose": tau * time, "shear_stress": tau}
+
+
+# histogram range of every quantity from the profile points that carry flux, widened by span
+def _ranges(profile, Ln, span=10.0):
+    flowing = profile["Vz"] > 0
+    values = exposure(profile, profile["r"][flowing], Ln)
+    ranges = {}
+    for name, v in values.items():
+        v = v[np.isfinite(v) & (v > 0)]
+        lo, hi = (v.min(), v.max()) if v.size else (1e-12, 1.0)
+        ranges[name] = (lo / span, hi * span)
+    return ranges
+
+
+# dose and residence time distributions of cells seeded over the profile; returns
+#   {"cells": count, "flow_rate": Q of the profile [m^3/s], "histograms": {quantity: histogram},
+#    "percentiles": {quantity: {q: value}}, "mean": {...}}
+# the flux-weighted mean residence time equals the needle volume over the flow rate
+def shear_dose(
+    profile,
+    Ln,
+    cells=1_000_000,
+    seeding="stratified",
+    seed=None,
+    chunk_size=250_000,
+    bins=HISTOGRAM_BINS,
+    percentiles=PERCENTILES,
+):
+    rng = np.random.default_rng(seed)
+    histograms = {
+        name: StreamingHistogram(lo, hi, bins) for name, (lo, hi) in _ranges(profile, Ln).items()
+    }
+    for start in range(0, cells, chunk_size):
+        stop = min(start + chunk_size, cells)
+        r = seed_cells(profile, start, stop, cells, seeding, rng)
+        for name, values in exposure(profile, r, Ln).items():
+            histograms[name].add(values)
+    return {
+        "cells": cells,
+        "flow_rate": cumulative_flux(profile)[-1],
+        "histograms": histograms,
+        "percentiles": {
+            name: dict(zip(percentiles, h.percentile(percentiles).tolist()))
+            for name, h in histograms.items()
+        },
+        "mean": {name: h.mean for name, h in histograms.items()},
+    }
+
+
+# per-bin table of a histogram: lower and upper edges, count, fraction of cells and CDF at the
+# upper edge; the under/overflow bins are the first and last rows (edges 0 and inf)
+def distribution(histogram):
+    edges = histogram.edges
+    counts = histogram.counts
+    fraction = counts / max(histogram.count, 1)
+    return {
+        "lower": np.concatenate([[0.0], edges]),
+        "upper": np.concatenate([edges, [np.inf]]),
+        "count": counts,
+        "fraction": fraction,
+        "cdf": np.cumsum(fraction),
+    }
+
+
+# distributions of every quantity as one csv, empty bins left out
+def write_distributions(result, out_path):
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(DISTRIBUTION_COLUMNS)
+        for name in QUANTITIES:
+            table = distribution(result["histograms"][name])
+            rows = np.flatnonzero(table["count"])
+            for i in rows:
+                writer.writerow(
+                    [name] + [repr(float(table[c][i])) for c in DISTRIBUTION_COLUMNS[1:3]]
+                    + [int(table["count"][i])]
+                    + [repr(float(table[c][i])) for c in DISTRIBUTION_COLUMNS[4:]]
+                )
+
+
+def format_table(result):
+    qs = list(next(iter(result["percentiles"].values())))
+    lines = [
+        f"{'quantity':<15} {'unit':<5} {'mean':>10}" + "".join(f" {f'p{q:g}':>10}" for q in qs)
+    ]
+    for name in QUANTITIES:
+        values = [result["mean"][name]] + list(result["percentiles"][name].values())
+        lines.append(f"{name:<15} {UNITS[name]:<5}" + "".join(f" {v:>10.4g}" for v in values))
+    lines.append(f"{result['cells']} cells, profile flow rate {result['flow_rate'] * 1e9:.4g} uL/s")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from bioink_models.rheology import MODELS
+
+    parser = argparse.ArgumentParser(
+        description="Shear dose and residence time distributions of cells crossing the needle"
+    )
+    parser.add_argument(
+        "profile", nargs="?", help="simulation .xy or ParaView csv (analytic model if omitted)"
+    )
+    parser.add_argument("--model", default="power_law", choices=sorted(MODELS))
+    parser.add_argument(
+        "--params",
+        type=float,
+        nargs="+",
+        default=[160.630, 0.360],
+        help="model parameters in order (power law: K n)",
+    )
+    parser.add_argument("--pressure", type=float, default=1465.807e3, help="pressure drop [Pa]")
+    parser.add_argument("--length", type=float, default=0.02, help="needle length [m]")
+    parser.add_argument("--radius", type=float, default=100e-6, help="needle radius [m]")
+    parser.add_argument("--rho", type=float, default=1000, help="density [kg/m^3]")
+    parser.add_argument("--cells", type=int, default=1_000_000)
+    parser.add_argument("--seeding", default="stratified", choices=("stratified", "random"))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("-o", "--out", help="also write the histograms and CDFs as csv")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        profile = simulation_profile(args.profile, args.radius, args.rho)
+    else:
+        model = MODELS[args.model](*args.params)
+        profile = analytic_profile(model, args.radius, args.length, args.pressure)
+    result = shear_dose(profile, args.length, args.cells, args.seeding, args.seed)
+    print(format_table(result))
+    if args.out:
+        write_distributions(result, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
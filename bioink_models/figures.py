@@ -0,0 +1,404 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from bioink_models import contour
+
+# FIGURES #
+# every figure of main.py and plot_ss_p_csv.py as a builder that draws on a given matplotlib Figure,
+# so the same code serves the interactive scripts (plt.figure(...)) and headless rendering, where
+# each worker process builds a plain Figure on the Agg canvas from the computed arrays only
+#
+# arrays of the needle report (radius in micrometer, everything else in SI units):
+#   x, Vz, dVzdr, tau_rz, eta                 : analytical solution
+#   xx_U, df_U, xx_shearRate, df_shearRate,
+#   xx_shearStress, df_shearStress, xx_nu, df_nu : OpenFOAM simulation
+#   K, n, popt                                : bioink parameters and simulation fit (K, 1 - n)
+
+RC = {
+    "font.size": 12,
+    "axes.labelsize": 14,
+    "axes.titlesize": 14,
+    "legend.fontsize": 12,
+    "xtick.labelsize": 10,
+    "ytick.labelsize": 10,
+}
+
+# plot settings
+linewidth = 5
+figsize_single = (9, 9)  # for single plot use only
+figsize_double = (16, 8)  # for double plots use only
+title_font_weight = "bold"
+legend_size = {"size": 19}
+radius_name = "Variable Radius, $r$"  # micrometer
+radius_name_w_unit = "Variable Radius, $r$ [$\\mu$m]"
+fig2_name = "Shear Rate, $\\dot{\\gamma}$"
+fig2_name2 = "Shear Rate, $\\dot{\\gamma}$ [1/s]"
+fig3a_name = "Shear Stress, $\\tau_{rz}$"
+fig3a_name2 = "Shear Stress, $\\tau_{rz}$ [Pa]"
+
+
+def power_law(gamma_dot_n, K, n):
+    return K * np.power(gamma_dot_n, -n)  # power law model
+
+
+def _mirror(x, y):
+    return np.concatenate([-x[::-1], x[1:]]), np.concatenate([y[::-1], y[1:]])
+
+
+# Velocity Profile
+def velocity_profile(fig, x, Vz, xx_U, df_U, plot_title=False, **_):
+    fig1_name = "Velocity Profile, $V_z(r)$"  # unit = [micrometer/s]
+    ax = fig.add_subplot()
+    # Analytical Solution #
+    ax.plot(*_mirror(x, Vz * 1e3), "r", lw=linewidth, ls="--")  # (e3)=millimeter/s
+    # OpenFOAM Simulation #
+    ax.plot(*_mirror(xx_U, df_U * 1e3), "g", lw=linewidth, ls="-", alpha=0.7)
+
+    fig.supxlabel(f"{radius_name_w_unit}")
+    fig.supylabel(f"{fig1_name} [mm/s]")  # millimeter/s
+    if plot_title:
+        fig.suptitle(f"{fig1_name} vs. {radius_name}", weight=title_font_weight)
+    fig.legend(
+        ["Analytical Solution", "OpenFOAM Simulation"],
+        loc="lower center",
+        bbox_to_anchor=(0.5, 0.15),
+        prop=legend_size,
+    )
+
+
+# Shear Rate
+def shear_rate(fig, x, dVzdr, xx_shearRate, df_shearRate, plot_title=False, **_):
+    ax = fig.add_subplot()
+    # Analytical Solution #
+    ax.plot(x, -dVzdr, "r", lw=linewidth, ls="--")
+    # OpenFOAM Simulation #
+    ax.plot(xx_shearRate, df_shearRate, "g", lw=linewidth, ls="-", alpha=0.7)
+
+    fig.supxlabel(f"{radius_name_w_unit}")
+    fig.supylabel(f"{fig2_name} [1/s]")
+    if plot_title:
+        fig.suptitle(f"{fig2_name} vs. {radius_name}", weight=title_font_weight)
+    fig.legend(
+        ["Analytical Solution", "OpenFOAM Simulation"],
+        loc="lower center",
+        bbox_to_anchor=(0.5, 0.15),
+        prop=legend_size,
+    )
+    ax.set_yscale("log")  # enable log scale on the y-axis (Shear Rate)
+
+
+# Shear Stress
+def shear_stress(
+    fig,
+    x,
+    dVzdr,
+    tau_rz,
+    xx_shearStress,
+    df_shearStress,
+    df_shearRate,
+    plot_title=False,
+    **_,
+):
+    axes = fig.subplots(1, 2)
+
+    # Analytical Solution #
+    axes[0].plot(x, tau_rz, "r", lw=linewidth, ls="--", label="Analytical Solution")
+    # OpenFOAM Simulation #
+    axes[0].plot(
+        xx_shearStress,
+        df_shearStress,
+        "g",
+        lw=linewidth,
+        ls="-",
+        label="OpenFOAM Simulation",
+        alpha=0.7,
+    )
+    if plot_title:
+        axes[0].set_title(f"{fig3a_name} vs. {radius_name}", weight=title_font_weight)
+    axes[0].set_xlabel(f"{radius_name_w_unit}")
+    axes[0].set_ylabel(f"{fig3a_name2}")
+    axes[0].legend(loc="upper left", prop=legend_size)
+
+    fig3b_name = "Shear Stress, $\\tau_{rz}$ vs. Shear Rate, $\\dot{\\gamma}$"
+    # Analytical Solution #
+    axes[1].plot(
+        -dVzdr, tau_rz, "r", lw=linewidth, ls="--", label="Analytical Solution"
+    )
+    # OpenFOAM Simulation #
+    axes[1].plot(
+        df_shearRate,
+        df_shearStress,
+        "g",
+        lw=linewidth,
+        ls="-",
+        label="OpenFOAM Simulation",
+        alpha=0.7,
+    )
+    if plot_title:
+        axes[1].set_title(f"{fig3b_name}", weight="bold")
+    axes[1].set_xlabel(f"{fig2_name2}")
+    axes[1].set_ylabel(f"{fig3a_name2}")
+    axes[1].legend(loc="upper left", prop=legend_size)
+
+
+# Apparent Viscosity (with the zoomed inset)
+def apparent_viscosity(
+    fig,
+    x,
+    dVzdr,
+    eta,
+    xx_nu,
+    df_nu,
+    df_shearRate,
+    K,
+    n,
+    popt,
+    plot_title=False,
+    **_,
+):
+    import matplotlib.patches as patches
+    import matplotlib.ticker
+
+    axes = fig.subplots(1, 2)
+
+    fig5a_name = "Apparent Viscosity, $\\eta$"
+    fig5a_name2 = "Apparent Viscosity, $\\eta$ [Pa$\\cdot{}$s]"
+
+    # Analytical Solution #
+    axes[0].plot(
+        x, eta, "r", lw=linewidth, ls="--", label="Analytical Solution", alpha=0.8
+    )
+    # OpenFOAM Simulation #
+    axes[0].plot(
+        xx_nu, df_nu, "g", lw=linewidth, ls="-", label="OpenFOAM Simulation", alpha=0.7
+    )
+    if plot_title:
+        axes[0].set_title(f"{fig5a_name} vs. {radius_name}", weight=title_font_weight)
+    axes[0].set_xlabel(f"{radius_name_w_unit}")
+    axes[0].set_ylabel(f"{fig5a_name2}")
+    axes[0].legend(loc="upper right", prop=legend_size)
+
+    fig5b_name = "Apparent Viscosity, $\\eta$ vs. Shear Rate, $\\dot{\\gamma}$"
+    df_shearRate_fit = np.ravel(df_shearRate)
+    # Power Law Fitting Curve #
+    power_law_df_shearRate_fit_popt = power_law(df_shearRate_fit, *popt)
+    eta_equ_fit_power = f"$\\eta$ = {K}$\\dot\\gamma^{{{-n}}}$"
+    axes[1].plot(
+        -dVzdr,
+        eta,
+        "r",
+        lw=linewidth,
+        ls="--",
+        label=f"Power Law Fitting Curve, {eta_equ_fit_power}",
+    )
+    # OpenFOAM Simulation #
+    axes[1].plot(
+        df_shearRate,
+        df_nu,
+        "g",
+        lw=linewidth,
+        ls="-",
+        label="OpenFOAM Simulation",
+        alpha=0.6,
+    )
+    # Simulation Fitting Curve #
+    eta_fit_name = "$\\eta_{fit}$"
+    eta_equ_fit_scipy = eta_fit_name + " = {}$\\dot\\gamma^{{{}}}$".format(
+        round(popt[0], 3), round(popt[1] - 1, 3)
+    )
+    axes[1].plot(
+        df_shearRate_fit,
+        power_law_df_shearRate_fit_popt,
+        "blue",
+        lw=linewidth,
+        ls="--",
+        alpha=0.7,
+        label=f"Simulation Fitting Curve, {eta_equ_fit_scipy}",
+    )
+
+    # small plot inside
+    # adjust accordingly for different data
+    ax5s = fig.add_axes([0.66, 0.41, 0.21, 0.21])
+    ax5s.plot(-dVzdr, eta, "r", lw=linewidth, ls="--", alpha=0.8)
+    ax5s.plot(df_shearRate, df_nu, "g", lw=linewidth, ls="-", alpha=0.6)
+    ax5s.plot(
+        df_shearRate_fit,
+        power_law_df_shearRate_fit_popt,
+        "blue",
+        lw=linewidth,
+        ls="--",
+        alpha=0.7,
+    )
+    ax5s.set_ylim(0, 80)
+    ax5s.set_xlim(0.0001, max(df_shearRate))
+    ax5s.set_xlabel("$\\dot\\gamma^{{{}}}$ [1/s]", font={"size": 16})
+    ax5s.locator_params(axis="x", nbins=6)
+    ax5s.locator_params(axis="y", nbins=7)
+    ax5s.ticklabel_format(style="sci", axis="x", scilimits=(0, 0))
+    ax5s.set_ylabel("$\\eta$ [Pa]", font={"size": 16})
+    ax5s.ticklabel_format(useMathText=True)
+    ax5s.tick_params(axis="both", which="major", labelsize=16)
+
+    # Create a Rectangle patch
+    rect = patches.Rectangle(
+        (df_shearRate_fit.min(), min(power_law_df_shearRate_fit_popt)),
+        df_shearRate_fit.max() - df_shearRate_fit.min(),
+        max(power_law_df_shearRate_fit_popt) - min(power_law_df_shearRate_fit_popt),
+        linewidth=1,
+        edgecolor="k",
+        facecolor="none",
+    )
+    # Add the patch to the Axes
+    axes[1].add_patch(rect)
+
+    if plot_title:
+        axes[1].set_title("{}".format(fig5b_name), weight="bold")
+    axes[1].set_xlabel("{} [1/s]".format(fig2_name))
+    axes[1].set_ylabel("{}".format(fig5a_name2))
+    axes[1].set_xscale("log")
+    axes[1].legend(loc="upper right", prop={"size": 14.5})
+
+    # show x-axis log ticks
+    locmaj = matplotlib.ticker.LogLocator(base=10.0, subs=(1.0,), numticks=100)
+    axes[1].xaxis.set_major_locator(locmaj)
+    locmin = matplotlib.ticker.LogLocator(
+        base=10.0, subs=np.arange(2, 10) * 0.1, numticks=100
+    )
+    axes[1].xaxis.set_minor_locator(locmin)
+    axes[1].xaxis.set_minor_formatter(matplotlib.ticker.NullFormatter())
+
+
+# Contour Plot of the shear stress over the full cross-section
+def full_cut_contour(fig, x, tau_rz, contour_resolution=800, plot_title=False, **_):
+    from matplotlib import cm
+
+    ax = fig.add_subplot()
+    # tau_rz only depends on the radius: rasterize the radial profile instead of meshgrids
+    cpp = contour.radial_contourf(
+        ax,
+        x,
+        tau_rz,
+        levels=np.linspace(0, max(tau_rz), 75),
+        cmap=cm.coolwarm,
+        resolution=contour_resolution,
+    )
+    cbar = fig.colorbar(cpp, ax=ax, ticks=np.linspace(0, max(tau_rz), 10))
+    cbar.ax.tick_params(labelsize=15)
+    cbar.set_label(f"{fig3a_name2}", size=15)
+    fig.supxlabel(f"{radius_name_w_unit}                  ")  # centering xlabel
+    fig.supylabel(f"{radius_name_w_unit}")
+    if plot_title:
+        fig.suptitle(
+            f"Contour Plot of {fig3a_name} (Analytical Solution) within Variable Radius, $-r$ to $r$",
+            weight=title_font_weight,
+            size=11,
+        )
+
+
+# Pressure and maximum shear stress vs. extrusion rate, residence time annotated (data/uLs.csv)
+def pressure_shear_vs_rate(
+    fig,
+    flow_rate_uL_per_s,
+    pressure_kpa,
+    shear_stress_kpa,
+    residence_time_ms,
+    title="Pressure and Shear Stress vs. Extrusion Rate (Cylindrical G27, Alginate I-1G 4% w/v)",
+    **_,
+):
+    ax1 = fig.add_subplot()
+
+    color = "tab:red"
+    # First y-axis (pressure) with markers
+    ax1.set_xlabel("Extrusion Rate (uL/s)")
+    ax1.set_ylabel("Pressure (kPa)", color=color)
+    ax1.plot(flow_rate_uL_per_s, pressure_kpa, color=color, marker="o", linestyle="-")
+    ax1.tick_params(axis="y", labelcolor=color)
+
+    # Annotate residence time for pressure
+    for q, p, txt in zip(flow_rate_uL_per_s, pressure_kpa, residence_time_ms):
+        ax1.annotate(
+            str(txt) + " ms",
+            (q, p),
+            textcoords="offset points",
+            xytext=(0, 18),
+            ha="center",
+            fontweight="bold",
+            # increase zorder to make sure the text is on top of the line
+            zorder=15,
+        )
+
+    # Creating a twin Axes sharing the x-axis
+    ax2 = ax1.twinx()
+
+    color = "tab:blue"
+    # Second y-axis (shear stress) with correct markers
+    ax2.set_ylabel("Maximum Shear Stress (kPa)", color=color)
+    ax2.plot(
+        flow_rate_uL_per_s, shear_stress_kpa, color=color, marker="s", linestyle="--"
+    )
+    ax2.tick_params(axis="y", labelcolor=color)
+
+    # Title and layout
+    ax2.set_title(title)
+    fig.tight_layout()
+
+
+# name -> (builder, figsize, output file name)
+FIGURES = {
+    "velocity_profile": (velocity_profile, figsize_single, "velocity_profile.png"),
+    "shear_rate": (shear_rate, figsize_single, "shear_rate.png"),
+    "shear_stress": (shear_stress, figsize_double, "shear_stress.png"),
+    "apparent_viscosity": (
+        apparent_viscosity,
+        figsize_double,
+        "apparent_viscosity.png",
+    ),
+    "full_cut_contour": (full_cut_contour, (10, 8), "full_cut_contour.png"),
+    "pressure_shear_vs_rate": (pressure_shear_vs_rate, (12, 10), "uLs_annotated.png"),
+}
+NEEDLE_REPORT = (
+    "velocity_profile",
+    "shear_rate",
+    "shear_stress",
+    "apparent_viscosity",
+    "full_cut_contour",
+)
+
+# HEADLESS RENDERING #
+
+
+# build one figure on the Agg canvas and save it; no pyplot, no GUI
+def render(name, data, path, dpi=600, rc=None, **options):
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    builder, figsize, _ = FIGURES[name]
+    with matplotlib.rc_context(RC if rc is None else rc):
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        builder(fig, **data, **options)
+        fig.savefig(path, dpi=dpi, bbox_inches="tight", pad_inches=0)
+    return path
+
+
+def _render_packed(job):
+    name, data, path, dpi, options = job
+    return render(name, data, path, dpi, **options)
+
+
+# render (name, data, path) jobs, spread over a process pool; returns the written paths
+def render_all(jobs, processes=None, dpi=600, **options):
+    jobs = [(name, data, path, dpi, options) for name, data, path in jobs]
+    for _, _, path, _, _ in jobs:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if processes is not None and processes <= 1:
+        return [_render_packed(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_render_packed, jobs))
+
+
+# the five needle figures of one configuration into out_dir
+def report_jobs(data, out_dir, names=NEEDLE_REPORT):
+    return [(name, data, os.path.join(out_dir, FIGURES[name][2])) for name in names]
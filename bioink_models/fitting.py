@@ -0,0 +1,297 @@
+import numpy as np
+
+from bioink_models.rheology import MODELS, PowerLaw
+
+# BATCH RHEOLOGY FITTING #
+# fits eta(gamma_dot) for many datasets (simulation profiles or rheometer sweeps) in one call
+# datasets of different lengths are packed into (datasets, points) arrays with a mask, then
+#   - power law: weighted linear least squares of log(eta) = log(K) + (n-1)*log(gamma_dot),
+#     closed form and vectorized over datasets; only datasets that need it (a bound was hit, or the
+#     linear loss on data that stray from a power law) are refined by a batched Levenberg-Marquardt
+#   - other models: closed-form initial guesses followed by the batched Levenberg-Marquardt
+# bounds are {parameter name: (low, high)} on top of the physical defaults (every parameter >= 0,
+# eta_inf <= eta0); the result reports parameters, covariance, R^2, RMSE and whether the fit
+# converged (cost decrease below tol, no descent direction left or an exact fit; a stall at the
+# damping cap or running out of iterations is reported as not converged)
+
+# physical bounds of every model parameter: viscosities, time constants, exponents and yield
+# stresses are non-negative
+DEFAULT_BOUNDS = {
+    name: (0.0, np.inf) for name in ("K", "n", "tau_y", "eta0", "eta_inf", "lam", "a", "m")
+}
+# (low, high) pairs of parameters where low may not exceed high
+ORDERED = (("eta_inf", "eta0"),)
+
+
+# list of 1D arrays (or one 2D array) -> padded (datasets, points) arrays and the mask of real points
+def pack(gamma_dot, eta, weights=None):
+    if isinstance(gamma_dot, np.ndarray) and gamma_dot.ndim == 2:
+        gamma_dot = list(gamma_dot)
+        eta = list(eta)
+        weights = None if weights is None else list(weights)
+    elif isinstance(gamma_dot, np.ndarray) and gamma_dot.ndim == 1:
+        gamma_dot, eta = [gamma_dot], [eta]
+        weights = None if weights is None else [weights]
+    size = max(len(g) for g in gamma_dot)
+    G = np.ones((len(gamma_dot), size))
+    E = np.ones((len(gamma_dot), size))
+    W = np.zeros((len(gamma_dot), size))
+    for i, (g, e) in enumerate(zip(gamma_dot, eta)):
+        G[i, : len(g)] = np.asarray(g, dtype=np.float64).ravel()
+        E[i, : len(e)] = np.asarray(e, dtype=np.float64).ravel()
+        W[i, : len(g)] = 1.0 if weights is None else np.asarray(weights[i]).ravel()
+    # points that cannot enter a log fit are left out
+    valid = (G > 0) & (E > 0) & np.isfinite(G) & np.isfinite(E)
+    W = np.where(valid, W, 0.0)
+    G = np.where(valid, G, 1.0)
+    E = np.where(valid, E, 1.0)
+    return G, E, W
+
+
+def _bounds(names, bounds):
+    bounds = {**DEFAULT_BOUNDS, **(bounds or {})}
+    lo = np.array([bounds.get(p, (-np.inf, np.inf))[0] for p in names], dtype=np.float64)
+    hi = np.array([bounds.get(p, (-np.inf, np.inf))[1] for p in names], dtype=np.float64)
+    return lo, hi
+
+
+# parameters clipped to the bounds, then the ORDERED pairs put in order
+def _project(names, P, lo, hi):
+    P = np.clip(P, lo, hi)
+    for low, high in ORDERED:
+        if low in names and high in names:
+            i, j = names.index(low), names.index(high)
+            P[:, i] = np.minimum(P[:, i], P[:, j])
+    return P
+
+
+# weighted linear least squares y = a + b*x for every row at once
+def _line_fit(x, y, w):
+    sw = w.sum(axis=1)
+    mx = (w * x).sum(axis=1) / sw
+    my = (w * y).sum(axis=1) / sw
+    dx = x - mx[:, None]
+    sxx = (w * dx**2).sum(axis=1)
+    slope = (w * dx * (y - my[:, None])).sum(axis=1) / sxx
+    return my - slope * mx, slope
+
+
+def _r2(y, y_fit, w):
+    mean = (w * y).sum(axis=1) / w.sum(axis=1)
+    ss_res = (w * (y - y_fit) ** 2).sum(axis=1)
+    ss_tot = (w * (y - mean[:, None]) ** 2).sum(axis=1)
+    return 1 - ss_res / ss_tot
+
+
+# INITIAL GUESSES #
+
+
+def _guess_power_law(G, E, W):
+    log_K, slope = _line_fit(np.log(G), np.log(E), W)
+    return np.stack([np.exp(log_K), slope + 1], axis=1)
+
+
+def _guess_herschel_bulkley(G, E, W):
+    tau = E * G
+    tau_min = np.where(W > 0, tau, np.inf).min(axis=1)
+    tau_y = 0.5 * tau_min
+    log_K, n = _line_fit(np.log(G), np.log(tau - tau_y[:, None]), W)
+    return np.stack([tau_y, np.exp(log_K), n], axis=1)
+
+
+# zero-shear viscosity from the largest eta, time constant from where eta has halved
+def _plateau_guess(G, E, W):
+    eta0 = np.where(W > 0, E, -np.inf).max(axis=1)
+    eta_min = np.where(W > 0, E, np.inf).min(axis=1)
+    half = np.abs(np.log(E) - np.log(0.5 * eta0)[:, None])
+    half = np.where(W > 0, half, np.inf)
+    lam = 1 / G[np.arange(len(G)), half.argmin(axis=1)]
+    n = np.clip(_guess_power_law(G, E, W)[:, 1], 0.05, 0.95)
+    return eta0, 0.1 * eta_min, lam, n
+
+
+def _guess_carreau_yasuda(G, E, W):
+    eta0, eta_inf, lam, n = _plateau_guess(G, E, W)
+    return np.stack([eta0, eta_inf, lam, np.full_like(n, 2.0), n], axis=1)
+
+
+def _guess_cross(G, E, W):
+    eta0, eta_inf, lam, n = _plateau_guess(G, E, W)
+    return np.stack([eta0, eta_inf, lam, 1 - n], axis=1)
+
+
+INITIAL_GUESS = {
+    "power_law": _guess_power_law,
+    "herschel_bulkley": _guess_herschel_bulkley,
+    "carreau_yasuda": _guess_carreau_yasuda,
+    "cross": _guess_cross,
+}
+
+
+# BATCHED LEVENBERG-MARQUARDT #
+
+
+def _residuals(model_cls, P, G, E, W, log_loss):
+    eta = model_cls(*[P[:, i, None] for i in range(P.shape[1])]).viscosity(G)
+    sw = np.sqrt(W)
+    if log_loss:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.log(eta) - np.log(E)
+    else:
+        r = eta - E
+    return np.where(W > 0, sw * np.nan_to_num(r, nan=1e10, posinf=1e10, neginf=-1e10), 0.0)
+
+
+# every dataset keeps its own damping factor and only accepts steps that lower its cost; a dataset
+# converges when an accepted step lowers the cost by less than tol (relative), the gradient is down
+# to round-off or so are the residuals, and stops without converging when the damping reaches its
+# cap (a stall)
+DAMPING_MAX = 1e12
+
+
+def levenberg_marquardt(
+    model_cls, P, G, E, W, lo, hi, log_loss=True, max_iter=100, tol=1e-10
+):
+    names = model_cls.param_names
+    P = _project(names, P.astype(np.float64), lo, hi)
+    B, p = P.shape
+    damping = np.full(B, 1e-3)
+    r = _residuals(model_cls, P, G, E, W, log_loss)
+    cost = (r**2).sum(axis=1)
+    # residuals within round-off of the data (relative 1e-12) are an exact fit
+    exact = 1e-24 * (W if log_loss else W * E**2).sum(axis=1)
+    converged = cost <= exact
+    active = ~converged
+    for _ in range(max_iter):
+        # forward-difference Jacobian, one extra evaluation per parameter; parameters at zero (on
+        # their bound) step with the scale of the largest one, not below round-off
+        scale = 1e-6 * np.abs(P).max(axis=1, keepdims=True)
+        step = 1e-7 * np.maximum(np.abs(P), np.maximum(scale, 1e-12))
+        J = np.empty((B, r.shape[1], p))
+        for i in range(p):
+            Pi = P.copy()
+            Pi[:, i] += step[:, i]
+            J[:, :, i] = (_residuals(model_cls, Pi, G, E, W, log_loss) - r) / step[:, i, None]
+        JtJ = np.einsum("bmi,bmj->bij", J, J)
+        Jtr = np.einsum("bmi,bm->bi", J, r)
+        diag = np.einsum("bii->bi", JtJ)
+        A = JtJ + (damping[:, None] * np.maximum(diag, 1e-30))[:, :, None] * np.eye(p)
+        # parameters on a bound (or within 1e-12 of the largest parameter of it, where the steps
+        # below approach a bound) that the cost pushes outward stay there: their rows and columns
+        # become identity with a zero right-hand side, so the other parameters take the step
+        near = 1e-6 * scale
+        held = ((P - lo <= near) & (Jtr > 0)) | ((hi - P <= near) & (Jtr < 0))
+        A = np.where(held[:, :, None] | held[:, None, :], np.eye(p), A)
+        Jtr = np.where(held, 0.0, Jtr)
+        # no free direction left that lowers the cost: every cosine between the residuals and a
+        # Jacobian column is down to round-off (the start was already the optimum)
+        cosine = np.abs(Jtr) / np.maximum(np.sqrt(diag * cost[:, None]), 1e-300)
+        converged |= active & (cosine.max(axis=1) < 1e-8)
+        try:
+            delta = np.linalg.solve(A, -Jtr[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            delta = -Jtr / np.maximum(np.einsum("bii->bi", A), 1e-30)
+        delta = np.where(np.isfinite(delta) & (active & ~converged)[:, None], delta, 0.0)
+        # a step covers at most 90% of the way to a bound, so parameters approach a bound
+        # geometrically instead of landing on it (a = 0 or eta0 = 0 are degenerate models)
+        with np.errstate(invalid="ignore"):
+            floor, ceiling = lo + 0.1 * (P - lo), hi - 0.1 * (hi - P)
+        floor = np.where(np.isfinite(lo), floor, -np.inf)
+        ceiling = np.where(np.isfinite(hi), ceiling, np.inf)
+        P_new = _project(names, np.clip(P + delta, floor, ceiling), lo, hi)
+        r_new = _residuals(model_cls, P_new, G, E, W, log_loss)
+        cost_new = (r_new**2).sum(axis=1)
+        better = (cost_new < cost) & active
+        improvement = np.where(better, (cost - cost_new) / np.maximum(cost, 1e-300), 0.0)
+        P = np.where(better[:, None], P_new, P)
+        r = np.where(better[:, None], r_new, r)
+        cost = np.where(better, cost_new, cost)
+        converged |= (better & (improvement < tol)) | (cost <= exact)
+        damping = np.where(active, np.where(better, damping / 3, damping * 4), damping)
+        active &= ~converged & (damping < DAMPING_MAX)
+        if not active.any():
+            break
+    return P, r, J, converged
+
+
+def _result(model_cls, P, r, J, G, E, W, converged):
+    names = model_cls.param_names
+    n_points = (W > 0).sum(axis=1)
+    dof = np.maximum(n_points - len(names), 1)
+    ss_res = (r**2).sum(axis=1)
+    JtJ = np.einsum("bmi,bmj->bij", J, J)
+    cov = np.linalg.pinv(JtJ) * (ss_res / dof)[:, None, None]
+    eta_fit = model_cls(*[P[:, i, None] for i in range(P.shape[1])]).viscosity(G)
+    return {
+        "model": model_cls.name,
+        "names": names,
+        "params": P,
+        "cov": cov,
+        "r2": _r2(E, eta_fit, W),
+        "r2_log": _r2(np.log(E), np.log(eta_fit), W),
+        "rmse": np.sqrt((W * (E - eta_fit) ** 2).sum(axis=1) / W.sum(axis=1)),
+        "n_points": n_points,
+        "converged": converged,
+    }
+
+
+# FITTING #
+
+
+# power law K, n for every dataset: closed-form log-log solution, refined where needed
+#   refine : "auto" refines datasets that hit a bound or (linear loss) have log-space R^2 below
+#            1 - r2_tol; True / False refines all / none
+#   loss   : "log" fits log(eta) (relative error), "linear" fits eta like scipy's curve_fit
+def fit_power_law(
+    gamma_dot, eta, weights=None, bounds=None, refine="auto", loss="log", r2_tol=1e-6
+):
+    G, E, W = pack(gamma_dot, eta, weights)
+    lo, hi = _bounds(PowerLaw.param_names, bounds)
+    P = np.clip(_guess_power_law(G, E, W), lo, hi)
+
+    log_loss = loss == "log"
+    r = _residuals(PowerLaw, P, G, E, W, log_loss)
+    # analytic Jacobian of the power law residuals
+    sw = np.sqrt(W)
+    if log_loss:
+        J = np.stack([sw / P[:, 0, None], sw * np.log(G)], axis=2)
+    else:
+        eta_fit = P[:, 0, None] * G ** (P[:, 1, None] - 1)
+        J = np.stack([sw * eta_fit / P[:, 0, None], sw * eta_fit * np.log(G)], axis=2)
+
+    if refine == "auto":
+        # the log-log solution is already the optimum of the log loss unless a bound was hit;
+        # for the linear loss it is only kept where the data follow a power law closely
+        todo = np.any((P <= lo) | (P >= hi), axis=1)
+        if not log_loss:
+            eta_log_fit = PowerLaw(P[:, 0, None], P[:, 1, None]).viscosity(G)
+            todo |= _r2(np.log(E), np.log(eta_log_fit), W) < 1 - r2_tol
+    else:
+        todo = np.full(len(P), bool(refine))
+    converged = ~todo
+    if todo.any():
+        P_t, r_t, J_t, conv_t = levenberg_marquardt(
+            PowerLaw, P[todo], G[todo], E[todo], W[todo], lo, hi, log_loss
+        )
+        P[todo], r[todo], J[todo], converged[todo] = P_t, r_t, J_t, conv_t
+    return _result(PowerLaw, P, r, J, G, E, W, converged)
+
+
+# any rheology model by name ("power_law", "herschel_bulkley", "carreau_yasuda", "cross")
+#   p0 : optional (datasets, parameters) initial guess instead of the closed-form one
+def fit_model(
+    model, gamma_dot, eta, weights=None, bounds=None, p0=None, loss="log", max_iter=200
+):
+    if model == "power_law" and p0 is None:
+        return fit_power_law(gamma_dot, eta, weights, bounds, refine=True, loss=loss)
+    model_cls = MODELS[model]
+    G, E, W = pack(gamma_dot, eta, weights)
+    lo, hi = _bounds(model_cls.param_names, bounds)
+    if p0 is None:
+        P = INITIAL_GUESS[model](G, E, W)
+    else:
+        P = np.broadcast_to(np.asarray(p0, dtype=np.float64), (len(G), len(lo))).copy()
+    P, r, J, converged = levenberg_marquardt(
+        model_cls, P, G, E, W, lo, hi, loss == "log", max_iter
+    )
+    return _result(model_cls, P, r, J, G, E, W, converged)
@@ -0,0 +1,387 @@
+import re
+import sys
+import csv
+import argparse
+import itertools
+import numpy as np
+from math import asin, atan2, hypot, pi, sqrt
+
+# STREAMING G-CODE EXTRUSION PLANNER #
+# turns a print path into the pressure the dispenser needs, segment by segment:
+#   flow   : Q = extruded volume / segment time, segment time = path length / feed rate (a pure
+#            E move uses its own length); the volume per E unit is e_volume (1e-9 m^3 for
+#            volumetric E in mm^3, pi*D^2/4 mm^3 per mm of plunger travel for a syringe of bore D)
+#   needle : pressure drop, wall shear stress at the narrowest section and mean residence time
+#            (volume/Q), so straight, tapered and cartridge + needle paths all work with any
+#            rheology model: closed forms for the power law (geometry.py), otherwise the master
+#            curve of the model (master_curve.py, built once) on the Gauss stations of
+#            geometry.pressure_drop, one station per straight segment
+# segments above the wall shear stress limit (or the dispenser pressure limit) are flagged
+# the file is processed by generator stages, block_size lines at a time:
+#   read_blocks -> parse (Python, keeps the modal state: G90/G91, M82/M83, G92, G20/G21, G28, F)
+#   -> evaluate (NumPy, the whole block at once) -> annotate / csv rows -> written and flushed
+# so memory stays constant for any file length and the run time is that of the line parsing
+# G-code units are mm and mm/min; results are SI inside and printed as uL/s, kPa and s
+
+MOVES = {"G0", "G1"}
+ARCS = {"G2", "G3"}  # clockwise, counterclockwise in the XY plane (G17), helical with Z
+SEGMENT_COLUMNS = ("line", "time", "Q", "Pn", "tau_wall", "residence_time", "flag")
+# a word (letter and optional number, "G28 X" names an axis without one) or a stray character
+_TOKEN = re.compile(r"([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))?|(\S)")
+_INCH = 25.4
+
+
+class _State:
+    def __init__(self):
+        self.position = [0.0, 0.0, 0.0]  # mm
+        self.e = 0.0
+        self.feed = None  # mm/min
+        self.relative = False
+        self.relative_e = False
+        self.scale = 1.0  # 25.4 under G20
+
+
+def read_blocks(stream, block_size=50_000):
+    while True:
+        block = list(itertools.islice(stream, block_size))
+        if not block:
+            return
+        yield block
+
+
+_AXES = {"X": 0, "Y": 1, "Z": 2}
+
+
+# (letter, number) words of a line without its comments, like ("X", "10.5"), packed ("G1X10Y5")
+# or spaced ("X 10"); line numbers (N10) and the checksum (*45) are dropped; also returns whether
+# the line holds anything that is not a word
+def _words(code):
+    words, junk = [], False
+    for letter, value, other in _TOKEN.findall(code.partition("*")[0].upper()):
+        if other:
+            junk = True
+        elif letter != "N":
+            words.append((letter, value))
+    return words, junk
+
+
+# command word as "G1", "M83": G01 and G1 are the same command
+def _command(letter, value):
+    try:
+        return f"{letter}{float(value):g}"
+    except ValueError:
+        return letter
+
+
+# moves of a block of lines: (line offsets, path length [mm], E amount, feed [mm/min], offsets of
+# skipped lines) with the modal state carried from block to block; a move or G92 line with
+# anything but words in it, or a word without its number, is skipped and reported, never guessed
+def parse_block(lines, state):
+    index, length, extruded, feed, skipped = [], [], [], [], []
+    for i, line in enumerate(lines):
+        code = line.partition(";")[0]
+        if "(" in code:
+            code = re.sub(r"\(.*?\)", "", code)
+        words, junk = _words(code)
+        if not words:
+            continue
+        command = _command(*words[0])
+        if command in MOVES or command in ARCS or command == "G92":
+            if junk or not all(value for _, value in words[1:]):
+                skipped.append(i)
+                continue
+        if command in MOVES or command in ARCS:
+            position = list(state.position)
+            e, arc = None, {}
+            for letter, value in words[1:]:
+                v = float(value) * state.scale
+                if letter in _AXES:
+                    axis = _AXES[letter]
+                    position[axis] = position[axis] + v if state.relative else v
+                elif letter == "E":
+                    e = v
+                elif letter == "F":
+                    state.feed = v
+                elif letter in "IJR":
+                    arc[letter] = v
+            if command in ARCS:
+                if not arc:
+                    skipped.append(i)
+                    continue
+                planar = _arc_length(state.position, position, arc, command == "G2")
+                path = hypot(planar, position[2] - state.position[2])
+            else:
+                x0, y0, z0 = state.position
+                x, y, z = position
+                path = sqrt((x - x0) ** 2 + (y - y0) ** 2 + (z - z0) ** 2)
+            de = 0.0
+            if e is not None:
+                de = e if state.relative_e else e - state.e
+                state.e += de
+            state.position = position
+            index.append(i)
+            length.append(path)
+            extruded.append(de)
+            feed.append(state.feed)
+        elif command in ("G90", "G91"):
+            state.relative = state.relative_e = command == "G91"
+        elif command in ("M82", "M83"):
+            state.relative_e = command == "M83"
+        elif command == "G92":
+            for letter, value in words[1:]:
+                v = float(value) * state.scale
+                if letter in _AXES:
+                    state.position[_AXES[letter]] = v
+                elif letter == "E":
+                    state.e = v
+        elif command in ("G20", "G21"):
+            state.scale = _INCH if command == "G20" else 1.0
+        elif command == "G28":
+            # home the named axes, all of them when none is named
+            axes = [_AXES[letter] for letter, _ in words[1:] if letter in _AXES] or [0, 1, 2]
+            for axis in axes:
+                state.position[axis] = 0.0
+    return (
+        np.array(index, dtype=np.int64),
+        np.array(length, dtype=np.float64),
+        np.array(extruded, dtype=np.float64),
+        np.array(feed, dtype=np.float64),  # None (no F yet) becomes NaN
+        np.array(skipped, dtype=np.int64),
+    )
+
+
+# length in the XY plane of an arc from start to end [mm]: centre offset I, J from the start, or
+# radius R (negative for the arc longer than half a turn); start == end with I, J is a full turn
+def _arc_length(start, end, arc, clockwise):
+    (x0, y0), (x, y) = start[:2], end[:2]
+    if "R" in arc:
+        r = abs(arc["R"])
+        half = min(hypot(x - x0, y - y0) / (2 * r), 1.0) if r > 0 else 0.0
+        sweep = 2 * asin(half)
+        return r * (2 * pi - sweep if arc["R"] < 0 else sweep)
+    cx, cy = x0 + arc.get("I", 0.0), y0 + arc.get("J", 0.0)
+    a0, a1 = atan2(y0 - cy, x0 - cx), atan2(y - cy, x - cx)
+    sweep = (a0 - a1 if clockwise else a1 - a0) % (2 * pi)
+    if sweep == 0.0:
+        sweep = 2 * pi
+    return hypot(x0 - cx, y0 - cy) * sweep
+
+
+def parse(blocks):
+    state = _State()
+    for lines in blocks:
+        yield lines, parse_block(lines, state)
+
+
+class Planner:
+    # needle : geometry.Needle of one configuration; model : rheology model
+    # e_volume : extruded volume per E unit [m^3]; tau_limit [Pa] / pressure_limit [Pa] : flags
+    def __init__(self, needle, model, e_volume=1e-9, tau_limit=np.inf, pressure_limit=np.inf):
+        from bioink_models import geometry
+        from bioink_models.rheology import PowerLaw
+
+        self.needle = needle
+        self.model = model
+        self.e_volume = e_volume
+        self.tau_limit = tau_limit
+        self.pressure_limit = pressure_limit
+        self.R_min = float(np.minimum(needle.R_in, needle.R_out).min())
+        self.volume = float(np.sum(needle.volume))
+        self.curve = None
+        if not isinstance(model, PowerLaw):
+            from bioink_models.master_curve import MasterCurve
+
+            # the Gauss stations of pressure_drop, merged where the radius repeats (one station
+            # per straight segment), each with its total dz weight
+            R, weights = geometry._gauss_stations(needle)
+            self.radii, inverse = np.unique(R.ravel(), return_inverse=True)
+            self.weights = np.bincount(inverse, weights.ravel())
+            self.curve = MasterCurve.for_model(model)
+
+    # pressure drop and wall shear stress at R_min [Pa] for the flow rates Q
+    def _needle(self, Q):
+        from bioink_models import geometry
+
+        if self.curve is None:
+            n = self.model.n
+            tau = self.model.K * (Q * (3 * n + 1) / (pi * n * self.R_min**3)) ** n
+            return geometry.pressure_drop(self.needle, Q, self.model), tau
+        # gradients from the master curve table (an interpolation, no root-find per move)
+        R = np.append(self.radii, self.R_min)[:, None]
+        gradient = self.curve.pressure(self.model, Q, R, 1.0)[0]
+        return self.weights @ gradient[:-1], gradient[-1] * self.R_min / 2
+
+    # per-move results {time, Q, Pn, tau_wall, residence_time, flag}; moves without extrusion get
+    # zeros, moves without a feed rate a NaN time
+    def evaluate(self, length, extruded, feed):
+        # the feed rate of a pure E move applies to E
+        distance = np.where(length > 0, length, np.abs(extruded))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            time = distance / (feed / 60)
+            Q = extruded * self.e_volume / time
+        printing = (extruded > 0) & (time > 0) & np.isfinite(Q)
+        Qp = Q[printing]
+        Pn, tau_wall, residence = (np.zeros_like(Q) for _ in range(3))
+        if Qp.size:
+            Pn[printing], tau_wall[printing] = self._needle(Qp)
+            residence[printing] = self.volume / Qp
+        flag = np.where(tau_wall > self.tau_limit, 1, 0) | np.where(
+            Pn > self.pressure_limit, 2, 0
+        )
+        return {
+            "time": time,
+            "Q": np.where(printing, Q, 0.0),
+            "Pn": Pn,
+            "tau_wall": tau_wall,
+            "residence_time": residence,
+            "flag": flag,
+        }
+
+
+def evaluate(parsed, planner):
+    for lines, (index, length, extruded, feed, skipped) in parsed:
+        yield lines, index, planner.evaluate(length, extruded, feed), skipped
+
+
+_FLAGS = {1: " SHEAR_LIMIT", 2: " PRESSURE_LIMIT", 3: " SHEAR_LIMIT PRESSURE_LIMIT"}
+
+
+# G-code text of every block with a comment on each extruding move and skipped line
+def annotate(evaluated):
+    for lines, index, results, skipped in evaluated:
+        lines = list(lines)
+        for j in skipped.tolist():
+            line = lines[j].rstrip("\r\n")
+            lines[j] = f"{line} ; UNPARSED\n"
+        printing = np.flatnonzero(results["Q"] > 0)
+        Q = (results["Q"][printing] * 1e9).tolist()
+        Pn = (results["Pn"][printing] * 1e-3).tolist()
+        tau = (results["tau_wall"][printing] * 1e-3).tolist()
+        t = results["residence_time"][printing].tolist()
+        flags = results["flag"][printing].tolist()
+        for k, j in enumerate(index[printing].tolist()):
+            line = lines[j].rstrip("\r\n")
+            lines[j] = (
+                f"{line} ; Q={Q[k]:.4g}uL/s Pn={Pn[k]:.5g}kPa "
+                f"tau_w={tau[k]:.4g}kPa t_res={t[k]:.4g}s{_FLAGS.get(flags[k], '')}\n"
+            )
+        yield "".join(lines)
+
+
+# csv rows of the extruding moves: line number (1-based), SI results and the flag bits
+def segment_rows(evaluated):
+    offset = 0
+    for lines, index, results, _ in evaluated:
+        printing = np.flatnonzero(results["Q"] > 0)
+        columns = [(index[printing] + offset + 1).tolist()] + [
+            results[k][printing].tolist() for k in SEGMENT_COLUMNS[1:]
+        ]
+        offset += len(lines)
+        yield list(zip(*columns))
+
+
+# plan a whole G-code stream and write the annotated G-code (or the segment csv) to out
+# returns {lines, moves, segments, flagged, skipped, volume [m^3], print_time [s], Pn_max, tau_max}
+def plan(stream, out, planner, output="gcode", block_size=50_000):
+    stats = dict(lines=0, moves=0, segments=0, flagged=0, skipped=0, volume=0.0,
+                 print_time=0.0, Pn_max=0.0, tau_max=0.0)
+
+    def tracked(evaluated):
+        for lines, index, results, skipped in evaluated:
+            printing = results["Q"] > 0
+            time = results["time"]
+            stats["lines"] += len(lines)
+            stats["moves"] += len(index)
+            stats["segments"] += int(printing.sum())
+            stats["flagged"] += int((results["flag"] > 0).sum())
+            stats["skipped"] += len(skipped)
+            stats["volume"] += float((results["Q"][printing] * time[printing]).sum())
+            stats["print_time"] += float(time[np.isfinite(time)].sum())
+            if printing.any():
+                stats["Pn_max"] = max(stats["Pn_max"], float(results["Pn"].max()))
+                stats["tau_max"] = max(stats["tau_max"], float(results["tau_wall"].max()))
+            yield lines, index, results, skipped
+
+    evaluated = tracked(evaluate(parse(read_blocks(stream, block_size)), planner))
+    if output == "csv":
+        writer = csv.writer(out)
+        writer.writerow(SEGMENT_COLUMNS)
+        for rows in segment_rows(evaluated):
+            writer.writerows(rows)
+            out.flush()
+    else:
+        for text in annotate(evaluated):
+            out.write(text)
+            out.flush()
+    return stats
+
+
+def main(argv=None):
+    from bioink_models.cli import silence_stdout
+    from bioink_models.geometry import Needle
+    from bioink_models.rheology import MODELS
+
+    parser = argparse.ArgumentParser(
+        description="Annotate G-code with the flow rate, pressure and wall shear of every segment"
+    )
+    parser.add_argument("input", nargs="?", default="-", help="G-code file (default: stdin)")
+    parser.add_argument("-o", "--out", default="-", help="output file (default: stdout)")
+    parser.add_argument("--output", choices=("gcode", "csv"), default="gcode")
+    parser.add_argument("--model", default="power_law", choices=sorted(MODELS))
+    parser.add_argument(
+        "--params",
+        type=float,
+        nargs="+",
+        default=[160.630, 0.360],
+        help="model parameters in order (power law: K n)",
+    )
+    parser.add_argument("--radius", type=float, default=100e-6, help="needle radius [m]")
+    parser.add_argument("--length", type=float, default=0.02, help="needle length [m]")
+    parser.add_argument(
+        "--tip-radius", type=float, default=None, help="outlet radius of a conical needle [m]"
+    )
+    parser.add_argument(
+        "--syringe-diameter",
+        type=float,
+        default=None,
+        help="E is plunger travel in a syringe of this bore [mm] (default: E in mm^3)",
+    )
+    parser.add_argument("--tau-limit", type=float, default=np.inf, help="wall shear limit [Pa]")
+    parser.add_argument("--pressure-limit", type=float, default=np.inf, help="[Pa]")
+    parser.add_argument("--block-size", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    if args.tip_radius is None:
+        needle = Needle.straight(args.radius, args.length)
+    else:
+        needle = Needle.conical(args.radius, args.tip_radius, args.length)
+    e_volume = 1e-9
+    if args.syringe_diameter is not None:
+        e_volume = pi * args.syringe_diameter**2 / 4 * 1e-9
+    planner = Planner(
+        needle, MODELS[args.model](*args.params), e_volume, args.tau_limit, args.pressure_limit
+    )
+
+    stream = sys.stdin if args.input == "-" else open(args.input)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", newline="")
+    try:
+        stats = plan(stream, out, planner, args.output, args.block_size)
+    except BrokenPipeError:
+        silence_stdout()
+        return 0
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+    print(
+        f"{stats['lines']} lines, {stats['segments']} extruding segments, "
+        f"{stats['flagged']} flagged, {stats['skipped']} unparsed; {stats['volume'] * 1e9:.6g} uL in {stats['print_time']:.6g} s, "
+        f"Pn max {stats['Pn_max'] * 1e-3:.5g} kPa, tau_w max {stats['tau_max'] * 1e-3:.4g} kPa",
+        file=sys.stderr,
+    )
+    return 1 if stats["flagged"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,240 @@
+import numpy as np
+from math import pi
+
+from bioink_models.rheology import PowerLaw, _gauss_01
+
+# NEEDLE GEOMETRY #
+# a needle is a chain of segments from the inlet to the tip, each a cylinder or a cone
+# (length, inlet radius, outlet radius); a cartridge + straight needle is two segments, a conical
+# tip one, and any axial radius function R(z) is approximated by many short cones (second order)
+# segment arrays have shape (segments, *batch) so one Needle holds a whole batch of configurations
+#
+# lubrication approximation: every cross-section carries the fully developed flow of its own radius,
+#   dP/dz = G(Q, R(z)), tau_w(z) = R(z)/2 * dP/dz, V_average(z) = Q/(pi*R(z)^2)
+# for a power law G = 2K*(Q*(3n+1)/(pi*n))^n * R^-(3n+1), which integrates in closed form over a cone:
+#   integral_0^L R^-(3n+1) dz = L*(R0^-3n - R1^-3n)/(3n*(R1 - R0))
+# so a tapered tip costs the same as a straight needle; other rheology models integrate G with
+# Gauss-Legendre stations per segment (model.pressure at every station, all stations at once)
+# residence time: mean = volume/Q; centre line = integral dz/Vz_max(z)
+
+AXIAL_NODES = 8  # Gauss-Legendre stations per segment for models without a closed form
+
+
+def _f64(*args):
+    return [np.asarray(a, dtype=np.float64) for a in args]
+
+
+class Needle:
+    # length, R_in, R_out [m]: arrays (segments, *batch) or one value per segment
+    def __init__(self, length, R_in, R_out=None):
+        R_out = R_in if R_out is None else R_out
+        length, R_in, R_out = _f64(length, R_in, R_out)
+        shape = np.broadcast_shapes(np.shape(length), np.shape(R_in), np.shape(R_out))
+        shape = shape if shape else (1,)
+        self.length, self.R_in, self.R_out = [
+            np.broadcast_to(a, shape) for a in (length, R_in, R_out)
+        ]
+
+    def __repr__(self):
+        return f"Needle(length={self.length!r}, R_in={self.R_in!r}, R_out={self.R_out!r})"
+
+    @classmethod
+    def straight(cls, R, Ln):
+        R, Ln = _f64(R, Ln)
+        return cls(Ln[None], R[None])
+
+    @classmethod
+    def conical(cls, R_in, R_out, Ln):
+        R_in, R_out, Ln = _f64(R_in, R_out, Ln)
+        return cls(Ln[None], R_in[None], R_out[None])
+
+    # barrel of the cartridge, optional conical transition, then the straight needle
+    @classmethod
+    def cartridge(cls, R_barrel, L_barrel, R_needle, L_needle, L_taper=0.0):
+        R_barrel, L_barrel, R_needle, L_needle, L_taper = _f64(
+            R_barrel, L_barrel, R_needle, L_needle, L_taper
+        )
+        shape = np.broadcast_shapes(*[a.shape for a in (R_barrel, L_barrel, R_needle, L_needle)])
+        stack = lambda *a: np.stack([np.broadcast_to(x, shape) for x in a])  # noqa: E731
+        return cls(
+            stack(L_barrel, L_taper, L_needle),
+            stack(R_barrel, R_barrel, R_needle),
+            stack(R_barrel, R_needle, R_needle),
+        )
+
+    # piecewise conical approximation of an axial radius function radius(z) on [0, Ln]
+    @classmethod
+    def from_radius(cls, radius, Ln, segments=64):
+        Ln = np.asarray(Ln, dtype=np.float64)
+        z = np.linspace(0, 1, segments + 1).reshape((-1,) + (1,) * Ln.ndim) * Ln
+        R = np.asarray(radius(z), dtype=np.float64)
+        return cls(np.diff(z, axis=0), R[:-1], R[1:])
+
+    @property
+    def Ln(self):
+        return self.length.sum(axis=0)
+
+    @property
+    def volume(self):
+        return _frustum(self.R_in, self.R_out, self.length).sum(axis=0)
+
+    # axial positions and radii of points stations per segment (segments*points, *batch)
+    def stations(self, points=16):
+        t = np.linspace(0, 1, points).reshape((1, -1) + (1,) * (self.length.ndim - 1))
+        start = np.cumsum(self.length, axis=0) - self.length
+        z = start[:, None] + t * self.length[:, None]
+        R = self.R_in[:, None] + t * (self.R_out - self.R_in)[:, None]
+        shape = (-1,) + self.length.shape[1:]
+        return z.reshape(shape), R.reshape(shape)
+
+
+# integral_0^(t*L) R(z)^-(3n+1) dz over a cone R(z) = R0 + (R1 - R0)*z/L, for t in [0, 1]
+# written as R0^-(3n+1) * L*t * (1 - (1 + e)^-3n) / (3n*e), e = (R(tL) - R0)/R0, which stays
+# accurate down to the straight limit e -> 0
+def _cone_integral(R0, R1, L, n, t=1.0):
+    e = t * (R1 - R0) / R0
+    a = -3 * n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.expm1(a * np.log1p(e)) / (a * e)
+    ratio = np.where(np.abs(e) > 1e-12, ratio, 1.0)
+    return R0 ** (a - 1) * L * t * ratio
+
+
+# power law pressure gradient factor, dP/dz = _gradient_scale(Q) * R^-(3n+1)
+def _gradient_scale(Qn, K, n):
+    return 2 * K * (Qn * (3 * n + 1) / (pi * n)) ** n
+
+
+# the needle broadcast to the batch of the flow rates / pressures and model parameters, so the
+# segment and station axes stay in front of every batch axis (trailing axes are added to the
+# segment arrays first, broadcasting aligns from the right)
+def _batch(needle, model, *arrays):
+    batch = np.broadcast_shapes(
+        needle.length.shape[1:], *[np.shape(a) for a in arrays], *[p.shape for p in model.ink]
+    )
+    shape = needle.length.shape[:1] + batch
+    return Needle(*[
+        np.broadcast_to(a.reshape(a.shape + (1,) * (len(shape) - a.ndim)), shape)
+        for a in (needle.length, needle.R_in, needle.R_out)
+    ])
+
+
+# Gauss-Legendre stations of every segment: radii and dz weights (segments, nodes, *batch)
+def _gauss_stations(needle, nodes=AXIAL_NODES):
+    s, w = _gauss_01(nodes)
+    shape = (1, -1) + (1,) * (needle.length.ndim - 1)
+    s, w = s.reshape(shape), w.reshape(shape)
+    R = needle.R_in[:, None] + s * (needle.R_out - needle.R_in)[:, None]
+    return R, w * needle.length[:, None]
+
+
+# pressure drop over the needle [Pa] for the flow rate Qn [m^3/s]
+def pressure_drop(needle, Qn, model, nodes=AXIAL_NODES):
+    needle = _batch(needle, model, Qn)
+    if isinstance(model, PowerLaw):
+        n = model.n
+        integral = _cone_integral(needle.R_in, needle.R_out, needle.length, n).sum(axis=0)
+        return _gradient_scale(np.asarray(Qn, dtype=np.float64), model.K, n) * integral
+    R, weights = _gauss_stations(needle, nodes)
+    gradient = model.pressure(Qn, R, 1.0)
+    return (gradient * weights).sum(axis=(0, 1))
+
+
+# flow rate [m^3/s] for the pressure drop Pn [Pa]
+def flow_rate(needle, Pn, model, nodes=AXIAL_NODES):
+    needle = _batch(needle, model, Pn)
+    Pn = np.asarray(Pn, dtype=np.float64)
+    if isinstance(model, PowerLaw):
+        K, n = model.K, model.n
+        integral = _cone_integral(needle.R_in, needle.R_out, needle.length, n).sum(axis=0)
+        return pi * n / (3 * n + 1) * (Pn / (2 * K * integral)) ** (1 / n)
+    from bioink_models.solver import find_pressure
+
+    # pressure_drop(Q) is increasing, so the solver's log-log root-find inverts it as well
+    def drop(Q, *_):
+        return pressure_drop(needle, Q, model, nodes)
+
+    return find_pressure(drop, Pn, needle.Ln, needle.Ln, P_lo=1e-15, P_hi=1e-9)
+
+
+# residence times [s]: mean (volume/Q) and along the centre line, where the fluid is fastest
+def residence_time(needle, Qn, model, nodes=AXIAL_NODES):
+    needle = _batch(needle, model, Qn)
+    Qn = np.asarray(Qn, dtype=np.float64)
+    mean = needle.volume / Qn
+    if isinstance(model, PowerLaw):
+        # Vz_max/V_average = (3n+1)/(n+1) in every cross-section
+        return mean, mean * (model.n + 1) / (3 * model.n + 1)
+    R, weights = _gauss_stations(needle, nodes)
+    Vz_max = model.velocity(0.0, model.pressure(Qn, R, 1.0), R, 1.0)
+    return mean, (weights / Vz_max).sum(axis=(0, 1))
+
+
+# volume of a cone segment from its inlet up to the fraction t of its length
+def _frustum(R0, R1, L, t=1.0):
+    Rt = R0 + t * (R1 - R0)
+    return pi * t * L * (R0 * R0 + R0 * Rt + Rt * Rt) / 3
+
+
+# running total over the segments, up to (not including) each segment
+def _before(per_segment):
+    return np.cumsum(per_segment, axis=0) - per_segment
+
+
+# quantities along the axis at points stations per segment, each (segments*points, *batch):
+#   z, R, pressure (gauge, 0 at the tip), tau_wall, V_average, time (mean residence time from the
+#   inlet); power law pressures are exact, other models integrate between stations with nodes
+#   Gauss-Legendre stations each and scale every segment to the total of pressure_drop's rule, so
+#   the pressure falls monotonically and the inlet pressure is pressure_drop (to the root-find
+#   tolerance)
+def axial_profile(needle, Qn, model, points=16, nodes=AXIAL_NODES):
+    needle = _batch(needle, model, Qn)
+    Qn = np.asarray(Qn, dtype=np.float64)
+    z, R = needle.stations(points)
+    t = np.linspace(0, 1, points).reshape((1, -1) + (1,) * (needle.length.ndim - 1))
+    if isinstance(model, PowerLaw):
+        n = model.n
+        scale = _gradient_scale(Qn, model.K, n)
+        gradient = scale * R ** -(3 * n + 1)
+        # spent from the inlet: all earlier segments plus the part of the own segment
+        whole = _cone_integral(needle.R_in, needle.R_out, needle.length, n)
+        partial = _cone_integral(
+            needle.R_in[:, None], needle.R_out[:, None], needle.length[:, None], n, t
+        )
+        spent = (scale * (_before(whole)[:, None] + partial)).reshape(z.shape)
+        pressure = spent[-1] - spent
+    else:
+        gradient = model.pressure(Qn, R, 1.0)
+        # Gauss nodes between consecutive stations, then over the whole segment like
+        # pressure_drop: (segments, points, nodes, *batch), the last row is the whole segment
+        s, w = _gauss_01(nodes)
+        shape = (1, 1, -1) + (1,) * (needle.length.ndim - 1)
+        s, w = s.reshape(shape), w.reshape(shape)
+        lo = np.concatenate([t[:, :-1], np.zeros_like(t[:, :1])], axis=1)[:, :, None]
+        hi = np.concatenate([t[:, 1:], np.ones_like(t[:, :1])], axis=1)[:, :, None]
+        stations = needle.R_in[:, None, None] + (lo + (hi - lo) * s) * (
+            needle.R_out - needle.R_in
+        )[:, None, None]
+        weights = (hi - lo) * w * needle.length[:, None, None]
+        parts = (model.pressure(Qn, stations, 1.0) * weights).sum(axis=2)
+        pieces, whole = parts[:, :-1], parts[:, -1]
+        # from each station to the end of its segment, scaled so the segment total is the
+        # pressure_drop rule's, plus every later segment
+        rest = np.concatenate(
+            [np.cumsum(pieces[:, ::-1], axis=1)[:, ::-1], np.zeros_like(pieces[:, :1])], axis=1
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rest = np.where(rest[:, :1] > 0, rest * (whole / rest[:, 0])[:, None], 0.0)
+        after = np.cumsum(whole[::-1], axis=0)[::-1] - whole
+        pressure = (after[:, None] + rest).reshape(z.shape)
+    segments = needle.R_in, needle.R_out, needle.length
+    partial = _frustum(*[a[:, None] for a in segments], t)
+    volume = (_before(_frustum(*segments))[:, None] + partial).reshape(z.shape)
+    return {
+        "z": z,
+        "R": R,
+        "pressure": pressure,
+        "tau_wall": R / 2 * gradient,
+        "V_average": Qn / (pi * R**2),
+        "time": volume / Qn,
+    }
@@ -0,0 +1,132 @@
+import numpy as np
+from math import pi
+
+from bioink_models import kernel
+
+# ADAPTIVE RADIAL GRIDS #
+# a uniform grid spends most points in the smooth core while, for small n, the shear rate changes
+# fastest at the wall and the viscosity near the axis; these grids place points where the profile
+# curves, so that linear interpolation between them stays within a tolerance:
+#   power_law_grid : closed form, equidistributes the analytic interpolation error estimate
+#                    h^2/8*|f''| of Vz, gamma_dot and eta (no profile evaluation needed)
+#   adaptive_grid  : any profile function, bisects the intervals whose midpoint value is off the
+#                    straight line by more than the tolerance (all intervals of a pass at once)
+#   graded         : plain geometric grading toward the wall
+# the allowed error of a field f is rtol*|f| + atol*max|f| (atol defaults to rtol)
+# grids are sorted 1D radius arrays [m]; integrate / flow_rate / radial_weights work on any of them,
+# and the profile, contour and figure code takes them like the uniform one
+
+
+# grid from a monitor function: one interval per unit of integral of monitor(r) dr, at least n_min
+# points; the integral is taken on an auxiliary geometric grid and inverted by interpolation
+def equidistribute(monitor, r_min, r_max, n_min=16, n_aux=4097, max_points=1_000_000):
+    aux = np.geomspace(r_min, r_max, n_aux)
+    m = monitor(aux)
+    cumulative = np.concatenate([[0.0], np.cumsum(0.5 * (m[1:] + m[:-1]) * np.diff(aux))])
+    intervals = int(min(max(np.ceil(cumulative[-1]), n_min - 1), max_points - 1))
+    r = np.interp(np.linspace(0, cumulative[-1], intervals + 1), cumulative, aux)
+    r[0], r[-1] = r_min, r_max
+    return r
+
+
+# analytic error-controlled grid of the power law profile on [r_min, R]
+#   Vz'' = -gamma_dot/(n*r), gamma_dot'' = gamma_dot*k(k-1)/r^2 with k = 1/n,
+#   eta'' = eta*j(j-1)/r^2 with j = 1 - 1/n; interval h keeps h^2/8*|f''| <= allowed error
+def power_law_grid(
+    R, Ln, Pn, K, n, rtol=1e-4, atol=None, r_min=1e-6, fields=("Vz", "gamma_dot", "eta")
+):
+    atol = rtol if atol is None else atol
+    k, j = 1 / n, 1 - 1 / n
+    scale = {
+        "Vz": abs(kernel.Vz(0.0, R, Ln, Pn, K, n)),
+        "gamma_dot": abs(kernel.gamma_dot(R, Ln, Pn, K, n)),
+        "eta": abs(kernel.eta(r_min, Ln, Pn, K, n)),
+    }
+
+    def monitor(r):
+        gamma_dot = kernel.gamma_dot(r, Ln, Pn, K, n)
+        eta = kernel.eta(r, Ln, Pn, K, n)
+        curvature = {
+            "Vz": (np.abs(gamma_dot / (n * r)), kernel.Vz(r, R, Ln, Pn, K, n)),
+            "gamma_dot": (np.abs(gamma_dot * k * (k - 1)) / r**2, gamma_dot),
+            "eta": (np.abs(eta * j * (j - 1)) / r**2, eta),
+        }
+        total = np.zeros_like(r)
+        for name in fields:
+            second, f = curvature[name]
+            allowed = rtol * np.abs(f) + atol * scale[name]
+            total = np.maximum(total, np.sqrt(second / (8 * allowed)))
+        return total
+
+    return equidistribute(monitor, r_min, R)
+
+
+# error-controlled grid of any profile on [r_min, r_max]
+#   func(r) -> array (points,) or (fields, points), or a dict of such arrays
+def adaptive_grid(func, r_min, r_max, rtol=1e-4, atol=None, n_start=17, max_points=1_000_000):
+    atol = rtol if atol is None else atol
+
+    def evaluate(r):
+        values = func(r)
+        if isinstance(values, dict):
+            values = list(values.values())
+        return np.atleast_2d(np.asarray(values, dtype=np.float64))
+
+    r = np.linspace(r_min, r_max, n_start)
+    f = evaluate(r)
+    while r.size < max_points:
+        mid = 0.5 * (r[1:] + r[:-1])
+        f_mid = evaluate(mid)
+        error = np.abs(f_mid - 0.5 * (f[:, 1:] + f[:, :-1]))
+        allowed = rtol * np.abs(f_mid) + atol * np.abs(f).max(axis=1, keepdims=True)
+        split = np.any(~(error <= allowed), axis=0)
+        if not split.any():
+            break
+        split = np.flatnonzero(split)[: max_points - r.size]
+        order = np.argsort(np.concatenate([r, mid[split]]), kind="stable")
+        r = np.concatenate([r, mid[split]])[order]
+        f = np.concatenate([f, f_mid[:, split]], axis=1)[:, order]
+    return r
+
+
+# geometric grading toward the wall: spacing shrinks by ratio from the axis to R
+def graded(r_min, R, N, ratio=0.01):
+    if ratio == 1:
+        return np.linspace(r_min, R, N)
+    q = ratio ** (1 / max(N - 2, 1))
+    steps = q ** np.arange(N - 1)
+    return r_min + (R - r_min) * np.concatenate([[0.0], np.cumsum(steps)]) / steps.sum()
+
+
+# INTEGRALS ON NON-UNIFORM GRIDS #
+
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz  # NumPy < 2.0
+
+
+# trapezoid weights of a (possibly unsorted, non-uniform) set of radii: sum(w*f) = integral f dr
+def radial_weights(r, area=False):
+    r = np.asarray(r, dtype=np.float64)
+    order = np.argsort(r, kind="stable")
+    rs = r[order]
+    h = np.diff(rs)
+    w_sorted = np.zeros_like(rs)
+    w_sorted[:-1] += 0.5 * h
+    w_sorted[1:] += 0.5 * h
+    if area:
+        w_sorted *= 2 * pi * rs
+    w = np.empty_like(w_sorted)
+    w[order] = w_sorted
+    return w
+
+
+# integral of f over r (trapezoid), along the last axis
+def integrate(r, f):
+    return _trapezoid(f, r, axis=-1)
+
+
+# volumetric flow rate of a velocity profile, Q = 2*pi*integral Vz*r dr (the core r < r[0] is
+# added as a cylinder of the first velocity)
+def flow_rate(r, Vz):
+    r = np.asarray(r, dtype=np.float64)
+    Vz = np.asarray(Vz, dtype=np.float64)
+    return 2 * pi * integrate(r, Vz * r) + pi * r[0] ** 2 * Vz[..., 0]
@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+# IMPORT-TIME REGRESSION CHECK #
+# computes Qave and Pn_func in a fresh interpreter, the way a script or a service would, and fails
+#   - if importing the package pulls in one of HEAVY (they must stay lazy)
+#   - if anything is written to the working directory
+#   - if the package's own import plus the first evaluation exceed the budget [ms]
+# NumPy itself is excluded from the budget by default: its import alone varies from ~20 ms to over
+# 100 ms between machines, which says nothing about this package; --include-numpy counts it too
+#
+#   python -m bioink_models.importcheck [--budget 50] [--include-numpy]
+
+HEAVY = ("matplotlib", "pandas", "scipy")
+BUDGET_MS = 50.0
+
+_SNIPPET = """
+import sys, json, time
+start = time.perf_counter()
+import bioink_models
+imported = time.perf_counter()
+Q = bioink_models.Qave(100e-6, 20e-3, 1465.807e3, 160.630, 0.360)
+P = bioink_models.Pn_func(Q, 100e-6, 20e-3, 160.630, 0.360)
+done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1e3,
+    "compute_ms": (done - imported) * 1e3,
+    "Qave": float(Q),
+    "Pn": float(P),
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+# {module: cumulative import time [ms]} of the -X importtime report
+def _import_times(stderr):
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        try:
+            times[name.strip()] = int(cumulative) / 1e3
+        except ValueError:
+            pass  # the column header line
+    return times
+
+
+# run the snippet in a fresh interpreter inside an empty directory and collect the measurements
+def measure():
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _SNIPPET],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        created = sorted(os.listdir(cwd))
+    result = json.loads(proc.stdout)
+    times = _import_times(proc.stderr)
+    result["numpy_ms"] = times.get("numpy", 0.0)
+    result["package_ms"] = times.get("bioink_models", 0.0) - result["numpy_ms"]
+    result["created"] = created
+    return result
+
+
+# list of failure messages, empty when the check passes
+def check(result, budget_ms=BUDGET_MS, include_numpy=False):
+    failures = []
+    heavy = sorted(
+        m for m in result["modules"] if m.split(".")[0] in HEAVY and "." not in m
+    )
+    if heavy:
+        failures.append(f"imported eagerly: {', '.join(heavy)}")
+    if result["created"]:
+        failures.append(f"files created: {', '.join(result['created'])}")
+    elapsed = result["package_ms"] + result["compute_ms"]
+    if include_numpy:
+        elapsed += result["numpy_ms"]
+    if elapsed > budget_ms:
+        failures.append(f"{elapsed:.1f} ms over the {budget_ms:g} ms budget")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time regression check of bioink_models")
+    parser.add_argument("--budget", type=float, default=BUDGET_MS, help="budget [ms]")
+    parser.add_argument("--include-numpy", action="store_true", help="count the NumPy import")
+    args = parser.parse_args(argv)
+
+    result = measure()
+    print(
+        f"numpy {result['numpy_ms']:.1f} ms, bioink_models {result['package_ms']:.1f} ms, "
+        f"Qave + Pn_func {result['compute_ms']:.2f} ms"
+    )
+    failures = check(result, args.budget, args.include_numpy)
+    for failure in failures:
+        print("FAIL:", failure)
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import os
+import re
+import csv
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from bioink_models.xy import load_xy
+
+# BATCH INGESTION OF SIMULATION RUNS #
+# every '<flow rate>uLs.xy' sample file in a directory is one run at that extrusion rate [uL/s]
+# runs are parsed in a process pool and summarized into the table plot_ss_p_csv.py plots:
+#   flow_rate_uL_per_s, pressure_kpa, shear_stress_kpa, residence_time_ms
+#
+# residence time = Ln/mean(|U_y|), max shear stress = max(|shearStress_xy|)*rho
+# the line samples carry no pressure field, so unless a pressure is given for the run it comes from
+# the momentum balance of the needle, Pn = 2*Ln*tau_w/R
+# the table goes to <directory>/uLs_ingested.csv by default, next to (never over) the measured
+# data/uLs.csv; pass -o data/uLs.csv explicitly to replace it
+
+RUN_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)uLs\.xy$")
+DEFAULT_OUT = "uLs_ingested.csv"
+SUMMARY_COLUMNS = (
+    "flow_rate_uL_per_s",
+    "pressure_kpa",
+    "shear_stress_kpa",
+    "residence_time_ms",
+)
+
+
+# [(flow rate [uL/s], path)] sorted by flow rate
+def discover_runs(directory, pattern=RUN_PATTERN):
+    runs = []
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            runs.append((float(match.group(1)), os.path.join(directory, name)))
+    return sorted(runs)
+
+
+# summary row of one run
+#   Ln  : needle length [m]; R : needle radius [m]; rho : density [kg/m^3]
+#   pressure_kpa : measured/simulated pressure drop, None for the momentum balance estimate
+def summarize_run(path, flow_rate, Ln=0.02, R=100e-6, rho=1000, pressure_kpa=None):
+    data = load_xy(path)
+    avg_u_y = np.abs(data["U_y"]).mean()
+    tau_max = np.abs(data["shearStress_xy"]).max() * rho  # [Pa]
+    if pressure_kpa is None:
+        pressure_kpa = 2 * Ln * tau_max / R / 1e3
+    return {
+        "flow_rate_uL_per_s": flow_rate,
+        "pressure_kpa": float(pressure_kpa),
+        "shear_stress_kpa": float(tau_max / 1e3),
+        "residence_time_ms": float(Ln / avg_u_y * 1e3),
+    }
+
+
+def _summarize_packed(args):
+    return summarize_run(*args)
+
+
+# summarize every run of a directory (in a process pool) and optionally write the summary csv
+#   pressures : optional {flow rate [uL/s]: pressure drop [kPa]}
+def ingest(
+    directory,
+    out_path=None,
+    Ln=0.02,
+    R=100e-6,
+    rho=1000,
+    pressures=None,
+    processes=None,
+):
+    pressures = pressures or {}
+    jobs = [
+        (path, q, Ln, R, rho, pressures.get(q))
+        for q, path in discover_runs(directory)
+    ]
+    if processes is not None and processes <= 1:
+        rows = [_summarize_packed(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            rows = list(pool.map(_summarize_packed, jobs))
+    if out_path is not None:
+        write_summary(rows, out_path)
+    return rows
+
+
+# same layout as the hand-written data/uLs.csv
+def write_summary(rows, out_path):
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_COLUMNS)
+        for row in rows:
+            writer.writerow(
+                [
+                    f"{row['flow_rate_uL_per_s']:g}",
+                    f"{row['pressure_kpa']:.0f}",
+                    f"{row['shear_stress_kpa']:.2f}",
+                    f"{row['residence_time_ms']:.0f}",
+                ]
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Summarize every <flow rate>uLs.xy run of a directory into a csv table"
+    )
+    parser.add_argument("directory")
+    parser.add_argument(
+        "-o", "--out", help=f"summary csv (default: <directory>/{DEFAULT_OUT})"
+    )
+    parser.add_argument("--length", type=float, default=0.02, help="needle length [m]")
+    parser.add_argument("--radius", type=float, default=100e-6, help="needle radius [m]")
+    parser.add_argument("--rho", type=float, default=1000, help="density [kg/m^3]")
+    parser.add_argument("-j", "--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    out_path = args.out or os.path.join(args.directory, DEFAULT_OUT)
+    rows = ingest(
+        args.directory,
+        out_path,
+        Ln=args.length,
+        R=args.radius,
+        rho=args.rho,
+        processes=args.processes,
+    )
+    print(f"{len(rows)} runs -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import sys
+import json
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# PER-STAGE INSTRUMENTATION #
+# opt-in timing and memory accounting around the stages of a run (reading, fitting, plotting, ...)
+#   with recorder.stage("read_data") as stage:
+#       df = read_data()
+#       stage.arrays(df)
+# every stage records wall time, CPU time, peak traced memory (tracemalloc, which also sees NumPy
+# buffers) and the shape / bytes of the arrays handed to it; stages can be nested, the names are
+# joined with '/'. the report is JSON, summary() is a console table
+# a disabled recorder hands out one shared no-op stage, so the instrumented code costs an attribute
+# lookup and an empty with block when instrumentation is off
+
+
+def _describe(value):
+    shape = getattr(value, "shape", None)
+    if shape is not None:
+        return {"shape": list(shape), "bytes": int(getattr(value, "nbytes", 0))}
+    if isinstance(value, dict):
+        parts = {k: _describe(v) for k, v in value.items()}
+        return {k: v for k, v in parts.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return {"shape": [len(value)], "bytes": None}
+    return None
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def arrays(self, *values, **named):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.sizes = {}
+        self.child_peak = 0
+
+    # record the size of arrays (or dicts of arrays) used or produced by the stage
+    def arrays(self, *values, **named):
+        for i, value in enumerate(values):
+            named.setdefault(f"arg{i}" if len(values) > 1 else "value", value)
+        for key, value in named.items():
+            described = _describe(value)
+            if described is not None:
+                self.sizes[key] = described
+
+    def __enter__(self):
+        stack = self.recorder._stack
+        self.path = "/".join([s.name for s in stack] + [self.name])
+        if self.recorder.trace_memory:
+            if stack:
+                # keep the parent's peak so far before the counter is reset for this stage
+                parent = stack[-1]
+                parent.child_peak = max(parent.child_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+        stack.append(self)
+        # the slot keeps stages in the order they started, parents before their children
+        self.index = len(self.recorder.stages)
+        self.recorder.stages.append(None)
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        stack = self.recorder._stack
+        stack.pop()
+        record = {"stage": self.path, "wall_s": wall, "cpu_s": cpu}
+        if self.recorder.trace_memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            record["peak_bytes"] = peak - self.memory_start
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        record["max_rss_bytes"] = _max_rss()
+        if self.sizes:
+            record["arrays"] = self.sizes
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        self.recorder.stages[self.index] = record
+        return False
+
+
+# peak resident set size of the process so far (ru_maxrss is in kB on Linux, bytes on macOS)
+def _max_rss():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Recorder:
+    # enabled=False: every stage() is the shared no-op stage
+    # trace_memory : tracemalloc peak per stage (slows allocation-heavy Python code down a little)
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages = []
+        self._stack = []
+        self._started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return Stage(self, name)
+
+    def report(self):
+        return {
+            "wall_s": time.perf_counter() - self.wall_start,
+            "cpu_s": time.process_time() - self.cpu_start,
+            "max_rss_bytes": _max_rss(),
+            "stages": [s for s in self.stages if s is not None],
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def summary(self):
+        report = self.report()
+        lines = [f"{'stage':<40} {'wall [s]':>10} {'cpu [s]':>10} {'peak [MB]':>10}"]
+        for record in report["stages"]:
+            peak = record.get("peak_bytes")
+            lines.append(
+                f"{record['stage']:<40} {record['wall_s']:>10.4f} {record['cpu_s']:>10.4f} "
+                + (f"{peak / 2**20:>10.2f}" if peak is not None else f"{'-':>10}")
+            )
+        total = f"{'total':<40} {report['wall_s']:>10.4f} {report['cpu_s']:>10.4f}"
+        if report["max_rss_bytes"] is not None:
+            total += f"   max rss {report['max_rss_bytes'] / 2**20:.0f} MB"
+        lines.append(total)
+        return "\n".join(lines)
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
@@ -0,0 +1,85 @@
+import numpy as np
+from math import pi
+
+# POWER LAW KERNEL #
+# closed-form solution for a power law bioink inside a straight cylindrical needle
+# every function is a plain numpy ufunc expression: all arguments broadcast against each other
+# and the result is a float64 array (or float64 scalar for scalar input)
+#
+# r  : variable radius [m]
+# R  : needle radius [m]
+# Ln : needle length [m]
+# Pn : pressure drop along the needle [Pa]
+# Qn : volumetric flow rate [m^3/s]
+# K  : consistency flow index [Pa*s^n]
+# n  : flow behavior index [-]
+
+
+def _f64(*args):
+    return [np.asarray(a, dtype=np.float64) for a in args]
+
+
+# shear stress (absolute value), tau_rz(r) = (Pn/Ln)*(r/2):
+def tau_rz(r, Ln, Pn):
+    r, Ln, Pn = _f64(r, Ln, Pn)
+    return Pn * r / (2 * Ln)
+
+
+# shear rate (absolute value), gamma_dot(r) = -dVz/dr = (tau_rz/K)^(1/n):
+def gamma_dot(r, Ln, Pn, K, n):
+    r, Ln, Pn, K, n = _f64(r, Ln, Pn, K, n)
+    return (Pn * r / (2 * K * Ln)) ** (1 / n)
+
+
+# apparent viscosity, eta(r) = K*gamma_dot^(n-1) (infinite on the center line for n < 1):
+def eta(r, Ln, Pn, K, n):
+    r, Ln, Pn, K, n = _f64(r, Ln, Pn, K, n)
+    with np.errstate(divide="ignore"):
+        return K * (Pn * r / (2 * K * Ln)) ** ((n - 1) / n)
+
+
+# velocity profile along the needle variable radius, Vz(r):
+def Vz(r, R, Ln, Pn, K, n):
+    r, R, Ln, Pn, K, n = _f64(r, R, Ln, Pn, K, n)
+    return (
+        (n / (n + 1))
+        * ((Pn * R) / (2 * K * Ln)) ** (1 / n)
+        * R
+        * (1 - (r / R) ** ((n + 1) / n))
+    )
+
+
+# average volumetric flow rate, Q(R):
+def Qave(R, Ln, Pn, K, n):
+    R, Ln, Pn, K, n = _f64(R, Ln, Pn, K, n)
+    return pi * R**3 * ((Pn * R) / (2 * K * Ln)) ** (1 / n) * (n / (3 * n + 1))
+
+
+# pressure drop based on the average volumetric flow rate, Pn (inverse of Qave):
+def Pn_func(Qn, R, Ln, K, n):
+    Qn, R, Ln, K, n = _f64(Qn, R, Ln, K, n)
+    return (Qn / (pi * R**3) / (n / (3 * n + 1))) ** n * 2 * K * Ln / R
+
+
+# average extrusion velocity, Qn/(pi*R^2):
+def V_average(R, Ln, Pn, K, n):
+    R, Ln, Pn, K, n = _f64(R, Ln, Pn, K, n)
+    return (Pn / 2 / K / Ln) ** (1 / n) * (n / (3 * n + 1)) * R ** ((n + 1) / n)
+
+
+# wall shear stress, tau_rz(R):
+def tau_wall(R, Ln, Pn):
+    return tau_rz(R, Ln, Pn)
+
+
+# power law apparent viscosity based on the average extrusion velocity, eta_PL:
+def eta_PL(V_average, R, K, n):
+    V_average, R, K, n = _f64(V_average, R, K, n)
+    return (
+        K * (V_average / (2 * R)) ** (n - 1) * 8 ** (n - 1) * ((3 * n + 1) / (4 * n)) ** n
+    )
+
+
+# power law Reynolds number, Re_PL:
+def Re_PL(V_average, R, K, n, rho=1000):
+    return rho * V_average * 2 * R / eta_PL(V_average, R, K, n)
@@ -0,0 +1,184 @@
+import os
+import json
+import hashlib
+import numpy as np
+from math import pi
+
+from bioink_models import kernel
+from bioink_models.rheology import MODELS
+
+# DIMENSIONLESS MASTER CURVES #
+# with the stress and shear rate scales of a model (RheologyModel.scales), the flow rate of every
+# bioink sharing the same shape parameters collapses onto one curve
+#
+#   Q* = Q/(pi*R^3*gamma_c) = F(x),   x = tau_w/tau_c,   tau_w = R*Pn/(2*Ln)
+#
+# F is tabulated once per shape on a log grid of (x - x_yield) (x_yield = 1 for Herschel-Bulkley,
+# 0 otherwise) and stored as a memory-mapped .npy file next to a small .json header; forward
+# (Pn -> Q) and inverse (Q -> Pn) queries are then a vectorized np.interp in log-log space
+# the error bound is the largest relative interpolation error measured at the interval midpoints
+# against the quadrature; outside the tabulated range the end slopes are extrapolated and the
+# reported error is inf
+
+N_POINTS = 2049  # tabulated points
+X_RANGE = (1e-6, 1e8)  # tabulated range of x - x_yield
+
+
+def _shape_key(model_name, shape):
+    text = json.dumps([model_name, [round(float(v), 12) for v in shape]])
+    return f"{model_name}_{hashlib.sha1(text.encode()).hexdigest()[:16]}"
+
+
+# one value per shape parameter; a batch of bioinks must share the same shape to share a table
+def _scalar_shape(model):
+    shape = []
+    for value in model.shape():
+        value = np.unique(np.asarray(value, dtype=np.float64))
+        if value.size != 1:
+            raise ValueError(
+                "every bioink in the batch must have the same shape parameters for one master curve"
+            )
+        shape.append(float(value[0]))
+    return tuple(shape)
+
+
+# F(x) of the unit model (tau_c = gamma_c = 1): R = 1 and Ln = 1/2 make tau_w = Pn = x
+def _dimensionless_flow(unit, x):
+    return unit.flow_rate(x, 1.0, 0.5) / pi
+
+
+# linear interpolation in log space with the end slopes extrapolated
+def _interp(x, xp, fp):
+    y = np.interp(x, xp, fp)
+    lo, hi = x < xp[0], x > xp[-1]
+    if lo.any():
+        y = np.where(lo, fp[0] + (x - xp[0]) * (fp[1] - fp[0]) / (xp[1] - xp[0]), y)
+    if hi.any():
+        y = np.where(hi, fp[-1] + (x - xp[-1]) * (fp[-1] - fp[-2]) / (xp[-1] - xp[-2]), y)
+    return y
+
+
+class MasterCurve:
+    def __init__(self, model_name, shape, table, error_bound, inverse_error_bound, x_yield):
+        self.model_name = model_name
+        self.shape = tuple(shape)
+        self.table = table  # (2, N_POINTS): log(x - x_yield), log(F)
+        self.error_bound = error_bound  # relative error of F (forward queries)
+        self.inverse_error_bound = inverse_error_bound  # relative error of x (inverse queries)
+        self.x_yield = x_yield
+
+    @property
+    def key(self):
+        return _shape_key(self.model_name, self.shape)
+
+    # PRECOMPUTATION #
+
+    # tabulate F for one model class and one set of shape parameters
+    @classmethod
+    def build(cls, model_name, shape, n_points=N_POINTS, x_range=X_RANGE):
+        unit = MODELS[model_name].unit(*shape)
+        x_yield = float(unit.yield_stress())
+        log_s = np.linspace(np.log(x_range[0]), np.log(x_range[1]), n_points)
+        log_F = np.log(_dimensionless_flow(unit, x_yield + np.exp(log_s)))
+
+        # error estimate: quadrature against interpolation at the interval midpoints
+        log_s_mid = 0.5 * (log_s[1:] + log_s[:-1])
+        log_F_mid = np.log(_dimensionless_flow(unit, x_yield + np.exp(log_s_mid)))
+        log_error = np.abs(np.interp(log_s_mid, log_s, log_F) - log_F_mid)
+        error_bound = float(np.expm1(log_error.max()))
+        # an error d(log F) moves log(x - x_yield) by d(log F)/slope
+        slope = np.diff(log_F) / np.diff(log_s)
+        inverse_error_bound = float(np.expm1((log_error / slope).max()))
+
+        table = np.stack([log_s, log_F])
+        return cls(model_name, shape, table, error_bound, inverse_error_bound, x_yield)
+
+    # STORAGE #
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.key)
+        np.save(path + ".npy", np.asarray(self.table))
+        with open(path + ".json", "w") as f:
+            json.dump(
+                {
+                    "model": self.model_name,
+                    "shape": list(self.shape),
+                    "error_bound": self.error_bound,
+                    "inverse_error_bound": self.inverse_error_bound,
+                    "x_yield": self.x_yield,
+                },
+                f,
+                indent=2,
+            )
+        return path
+
+    # open a stored table (path without extension); the table itself stays memory-mapped
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        table = np.load(path + ".npy", mmap_mode="r" if mmap else None)
+        return cls(
+            meta["model"],
+            meta["shape"],
+            table,
+            meta["error_bound"],
+            meta["inverse_error_bound"],
+            meta["x_yield"],
+        )
+
+    # table for the shape parameters of a model batch: loaded from directory if present,
+    # otherwise built (and saved when a directory is given)
+    @classmethod
+    def for_model(cls, model, directory=None, **build_kwargs):
+        shape = _scalar_shape(model)
+        if directory is not None:
+            path = os.path.join(directory, _shape_key(model.name, shape))
+            if os.path.exists(path + ".json"):
+                return cls.load(path)
+        curve = cls.build(model.name, shape, **build_kwargs)
+        if directory is not None:
+            curve.save(directory)
+        return curve
+
+    # QUERIES #
+
+    # F(x) and its relative error bound
+    def dimensionless_flow(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        log_s, log_F = self.table[0], self.table[1]
+        s = x - self.x_yield
+        flowing = s > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_x = np.log(np.where(flowing, s, 1.0))
+        F = np.where(flowing, np.exp(_interp(log_x, log_s, log_F)), 0.0)
+        in_range = (log_x >= log_s[0]) & (log_x <= log_s[-1])
+        error = np.where(in_range | ~flowing, self.error_bound, np.inf)
+        return F, error
+
+    # x(F) and its relative error bound (a bound on x - x_yield, so also on x)
+    def dimensionless_stress(self, F):
+        F = np.asarray(F, dtype=np.float64)
+        log_s, log_F = self.table[0], self.table[1]
+        flowing = F > 0
+        with np.errstate(divide="ignore"):
+            log_q = np.log(np.where(flowing, F, 1.0))
+        s = np.where(flowing, np.exp(_interp(log_q, log_F, log_s)), 0.0)
+        in_range = (log_q >= log_F[0]) & (log_q <= log_F[-1])
+        error = np.where(in_range | ~flowing, self.inverse_error_bound, np.inf)
+        return self.x_yield + s, error
+
+    # volumetric flow rate for a model batch, Q [m^3/s], and its relative error bound
+    def flow_rate(self, model, Pn, R, Ln):
+        tau_c, gamma_c = model.scales()
+        R = np.asarray(R, dtype=np.float64)
+        F, error = self.dimensionless_flow(kernel.tau_wall(R, Ln, Pn) / tau_c)
+        return pi * R**3 * gamma_c * F, error
+
+    # pressure drop for a model batch, Pn [Pa], and its relative error bound
+    def pressure(self, model, Qn, R, Ln):
+        tau_c, gamma_c = model.scales()
+        R, Ln = [np.asarray(a, dtype=np.float64) for a in (R, Ln)]
+        x, error = self.dimensionless_stress(Qn / (pi * R**3 * gamma_c))
+        return 2 * Ln * x * tau_c / R, error
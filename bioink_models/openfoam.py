@@ -0,0 +1,400 @@
+import os
+import re
+import gzip
+import numpy as np
+
+# OPENFOAM CASE READER #
+# reads a (reconstructed, ASCII) OpenFOAM case directly, without the ParaView export:
+#   constant/polyMesh/{points, faces, owner, neighbour} and the cell fields of every time directory
+#   (U, nu, strainRate, shearStress, p, ...)
+# lists are tokenized by NumPy: the text between the list's parentheses has its inner parentheses
+# blanked out and the numbers are converted in one np.array call on the split text
+# cell centres are computed like OpenFOAM does (area weighted face centres, pyramid decomposition of
+# the cells) and put in a bucket index, so line and cross-section samples are nearest-cell lookups
+# in memory; read_profile() returns the same quantities as paraview.read_profile
+# Case.new_times() only returns the time directories that appeared since the last call, so a running
+# or finished case can be processed incrementally
+
+FIELDS = ("U", "nu", "strainRate", "shearStress", "p")
+COMPONENTS = {
+    "scalar": 1,
+    "vector": 3,
+    "symmTensor": 6,
+    "sphericalTensor": 1,
+    "tensor": 9,
+    "label": 1,
+}
+_CLASS_COMPONENTS = {
+    "volScalarField": 1,
+    "volVectorField": 3,
+    "volSymmTensorField": 6,
+    "volTensorField": 9,
+}
+_BLANK_PARENS = bytes.maketrans(b"()", b"  ")
+_HEADER = re.compile(rb"FoamFile\s*\{(.*?)\}", re.S)
+_LIST_START = re.compile(rb"(\d+)\s*(\(|\{)")
+
+
+def _read_bytes(path):
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        path = path + ".gz"
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            return f.read()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# FoamFile header entries and the position right after the header
+def _header(data):
+    match = _HEADER.search(data)
+    if match is None:
+        return {}, 0
+    entries = {}
+    for line in match.group(1).split(b";"):
+        parts = line.split(None, 1)
+        if len(parts) == 2:
+            entries[parts[0].decode()] = parts[1].strip().strip(b'"').decode()
+    if entries.get("format", "ascii") != "ascii":
+        raise ValueError("only ascii OpenFOAM files are supported (set writeFormat ascii)")
+    return entries, match.end()
+
+
+# whitespace separated numbers of a bytes slice
+def _numbers(text, dtype=np.float64):
+    return np.array(text.split(), dtype=dtype)
+
+
+# parse the list whose size starts at or after pos; returns (flat float/int array, size, end)
+def _parse_list(data, pos, dtype=np.float64):
+    match = _LIST_START.search(data, pos)
+    if match is None:
+        raise ValueError("no list found")
+    size = int(match.group(1))
+    start = match.end()
+    if match.group(2) == b"{":
+        # uniform list, N{value}
+        end = data.index(b"}", start)
+        value = _numbers(data[start:end].translate(_BLANK_PARENS), dtype)
+        return np.tile(value, size), size, end + 1
+    if b"\n" in data[match.start() : start]:
+        # long lists: the closing parenthesis sits on its own line
+        end = data.index(b"\n)", start) + 1
+    else:
+        # short lists are written inline, find the matching parenthesis
+        depth, end = 1, start
+        while depth:
+            c = data[end : end + 1]
+            depth += (c == b"(") - (c == b")")
+            end += 1
+        end -= 1
+    body = data[start:end].translate(_BLANK_PARENS)
+    return _numbers(body, dtype), size, end + 1
+
+
+def read_list(path, dtype=np.float64):
+    data = _read_bytes(path)
+    _, pos = _header(data)
+    values, size, _ = _parse_list(data, pos, dtype)
+    return values.reshape(size, -1) if size else values.reshape(0, 1)
+
+
+# faces as (offsets, labels): face i has the points labels[offsets[i]:offsets[i + 1]]
+def read_faces(path):
+    data = _read_bytes(path)
+    header, pos = _header(data)
+    if header.get("class") == "faceCompactList":
+        offsets, _, pos = _parse_list(data, pos, np.int64)
+        labels, _, _ = _parse_list(data, pos, np.int64)
+        return offsets, labels
+    match = _LIST_START.search(data, pos)
+    start = match.end()
+    end = data.index(b"\n)", start)
+    body = data[start:end]
+    sizes = np.array(re.findall(rb"(\d+)\(", body), dtype=np.int64)
+    labels = _numbers(b" ".join(re.findall(rb"\(([^()]*)\)", body)), np.int64)
+    return np.concatenate([[0], np.cumsum(sizes)]), labels
+
+
+# cell field of a field file, (cells, components); uniform values are broadcast to n_cells
+def read_field(path, n_cells=None):
+    data = _read_bytes(path)
+    header, pos = _header(data)
+    pos = data.index(b"internalField", pos) + len(b"internalField")
+    kind = data[pos : pos + 64].split(None, 1)[0]
+    if kind == b"uniform":
+        end = data.index(b";", pos)
+        value = _numbers(
+            data[pos + data[pos:].index(b"uniform") + 7 : end].translate(_BLANK_PARENS)
+        )
+        if n_cells is None:
+            raise ValueError(f"{path}: uniform field, give n_cells")
+        return np.tile(value, (n_cells, 1))
+    match = re.compile(rb"List<(\w+)>").search(data, pos)
+    comps = COMPONENTS.get(match.group(1).decode(), None) if match else None
+    comps = comps or _CLASS_COMPONENTS.get(header.get("class"), 1)
+    values, size, _ = _parse_list(data, match.end() if match else pos)
+    return values.reshape(size, comps)
+
+
+# OpenFOAM's face centres and area vectors: triangles fanned around the face point average
+def face_geometry(points, offsets, labels):
+    n_faces = len(offsets) - 1
+    sizes = np.diff(offsets)
+    face = np.repeat(np.arange(n_faces), sizes)
+    p = points[labels]
+    estimate = np.stack(
+        [np.bincount(face, p[:, k], n_faces) for k in range(3)], axis=1
+    ) / sizes[:, None]
+    # next point of every face point, wrapping around inside its face
+    following = np.arange(len(labels)) + 1
+    following[offsets[1:] - 1] = offsets[:-1]
+    a = p - estimate[face]
+    b = p[following] - estimate[face]
+    normal = np.cross(a, b)
+    area = np.linalg.norm(normal, axis=1)
+    centre = (p + p[following] + estimate[face]) / 3
+    total = np.bincount(face, area, n_faces)
+    weighted = np.stack([np.bincount(face, area * centre[:, k], n_faces) for k in range(3)], 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centres = np.where(total[:, None] > 0, weighted / total[:, None], estimate)
+    areas = 0.5 * np.stack([np.bincount(face, normal[:, k], n_faces) for k in range(3)], 1)
+    return centres, areas
+
+
+# OpenFOAM's cell centres: pyramids from every face to the face centre average of the cell
+def cell_centres(face_centres, face_areas, owner, neighbour, n_cells):
+    n_internal = len(neighbour)
+    cells = np.concatenate([owner, neighbour])
+    faces = np.concatenate([np.arange(len(owner)), np.arange(n_internal)])
+    count = np.bincount(cells, minlength=n_cells)
+    estimate = np.stack(
+        [np.bincount(cells, face_centres[faces, k], n_cells) for k in range(3)], 1
+    ) / np.maximum(count, 1)[:, None]
+    sign = np.concatenate([np.ones(len(owner)), -np.ones(n_internal)])
+    volume = sign * np.einsum("ij,ij->i", face_areas[faces], face_centres[faces] - estimate[cells])
+    centre = 0.75 * face_centres[faces] + 0.25 * estimate[cells]
+    total = np.bincount(cells, volume, n_cells)
+    weighted = np.stack([np.bincount(cells, volume * centre[:, k], n_cells) for k in range(3)], 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(np.abs(total)[:, None] > 0, weighted / total[:, None], estimate)
+
+
+# largest distance from each cell centre to its points: samples further than that from the nearest
+# centre are outside the mesh
+def cell_radius(points, offsets, labels, owner, neighbour, centres):
+    face = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    internal = face < len(neighbour)
+    cells = np.concatenate([owner[face], neighbour[face[internal]]])
+    point_labels = np.concatenate([labels, labels[internal]])
+    radius = np.zeros(len(centres))
+    np.maximum.at(radius, cells, np.linalg.norm(points[point_labels] - centres[cells], axis=1))
+    return radius
+
+
+# nearest-cell lookups through a uniform bucket grid over the cell centres
+class CellIndex:
+    def __init__(self, centres, cells_per_bucket=4):
+        self.centres = np.asarray(centres, dtype=np.float64)
+        self.lo = self.centres.min(axis=0)
+        extent = np.maximum(self.centres.max(axis=0) - self.lo, 1e-300)
+        # bucket counts proportional to the extent of each axis, flat axes get one bucket
+        n_buckets = max(len(self.centres) / cells_per_bucket, 1)
+        live = extent > extent.max() * 1e-9
+        scale = (n_buckets / np.prod(extent[live])) ** (1 / live.sum())
+        self.shape = np.where(live, np.maximum(np.floor(extent * scale), 1), 1).astype(np.int64)
+        self.size = np.where(live, extent / self.shape, np.inf)
+        keys = self._keys(self._cells(self.centres))
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def _cells(self, points):
+        ijk = np.floor((points - self.lo) / self.size)
+        return np.clip(np.nan_to_num(ijk), 0, self.shape - 1).astype(np.int64)
+
+    def _keys(self, ijk):
+        return (ijk[:, 0] * self.shape[1] + ijk[:, 1]) * self.shape[2] + ijk[:, 2]
+
+    # bucket offsets at Chebyshev distance k, none further than the grid extends
+    def _ring(self, k):
+        axes = [np.arange(-min(k, size - 1), min(k, size - 1) + 1) for size in self.shape]
+        offsets = np.stack(np.meshgrid(*axes, indexing="ij"), -1).reshape(-1, 3)
+        return offsets[np.abs(offsets).max(axis=1) == k]
+
+    # lower bound of the distance from each point to every centre outside the buckets within
+    # Chebyshev distance k of its own (inf once those buckets cover the grid)
+    def _unsearched(self, points, ijk, k):
+        with np.errstate(invalid="ignore"):
+            below = np.where(ijk - k > 0, points - (self.lo + (ijk - k) * self.size), np.inf)
+            above = np.where(
+                ijk + k + 1 < self.shape, self.lo + (ijk + k + 1) * self.size - points, np.inf
+            )
+        return np.minimum(below, above).min(axis=1)
+
+    # index of the nearest cell centre of every point (points, 3) and its distance; the buckets are
+    # searched ring by ring around the point's bucket until no unsearched centre can be closer, or
+    # none can be within max_distance: such points get index -1 and distance inf
+    def nearest(self, points, max_distance=np.inf):
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        best = np.full(len(points), -1, dtype=np.int64)
+        dist = np.full(len(points), np.inf)
+        ijk = self._cells(points)
+        todo = np.arange(len(points))
+        k = 0
+        while todo.size:
+            p, cells = points[todo], ijk[todo]
+            b, d_best = best[todo], dist[todo]
+            for offset in self._ring(k):
+                cell = cells + offset
+                valid = np.all((cell >= 0) & (cell < self.shape), axis=1)
+                if not valid.any():
+                    continue
+                keys = self._keys(np.where(valid[:, None], cell, 0))
+                start = np.searchsorted(self.sorted_keys, keys, "left")
+                stop = np.where(valid, np.searchsorted(self.sorted_keys, keys, "right"), start)
+                for j in range(int((stop - start).max(initial=0))):
+                    has = start + j < stop
+                    candidate = self.order[np.minimum(start + j, len(self.order) - 1)]
+                    d = np.linalg.norm(self.centres[candidate] - p, axis=1)
+                    better = has & (d < d_best)
+                    b = np.where(better, candidate, b)
+                    d_best = np.where(better, d, d_best)
+            best[todo], dist[todo] = b, d_best
+            bound = self._unsearched(p, cells, k)
+            todo = todo[(d_best > bound) & (bound <= max_distance)]
+            k += 1
+        far = dist > max_distance
+        best[far], dist[far] = -1, np.inf
+        return best, dist
+
+
+def _is_time(name):
+    try:
+        float(name)
+    except ValueError:
+        return False
+    return True
+
+
+class Case:
+    def __init__(self, path):
+        self.path = path
+        self.mesh_path = os.path.join(path, "constant", "polyMesh")
+        self._seen = set()
+        self._mesh = None
+        self._index = None
+
+    # time directory names sorted by time
+    def times(self):
+        names = [
+            n
+            for n in os.listdir(self.path)
+            if _is_time(n) and os.path.isdir(os.path.join(self.path, n))
+        ]
+        return sorted(names, key=float)
+
+    # times not returned by an earlier call (those holding at least one of fields)
+    def new_times(self, fields=FIELDS):
+        new = []
+        for time in self.times():
+            if time in self._seen:
+                continue
+            if any(self.has_field(time, f) for f in fields):
+                self._seen.add(time)
+                new.append(time)
+        return new
+
+    def has_field(self, time, name):
+        path = os.path.join(self.path, time, name)
+        return os.path.exists(path) or os.path.exists(path + ".gz")
+
+    @property
+    def mesh(self):
+        if self._mesh is None:
+            points = read_list(os.path.join(self.mesh_path, "points"))
+            offsets, labels = read_faces(os.path.join(self.mesh_path, "faces"))
+            owner = read_list(os.path.join(self.mesh_path, "owner"), np.int64).ravel()
+            neighbour = read_list(os.path.join(self.mesh_path, "neighbour"), np.int64).ravel()
+            n_cells = int(max(owner.max(initial=-1), neighbour.max(initial=-1)) + 1)
+            face_centres, face_areas = face_geometry(points, offsets, labels)
+            centres = cell_centres(face_centres, face_areas, owner, neighbour, n_cells)
+            self._mesh = {
+                "points": points,
+                "face_offsets": offsets,
+                "face_labels": labels,
+                "owner": owner,
+                "neighbour": neighbour,
+                "n_cells": n_cells,
+                "cell_centres": centres,
+                "cell_radius": cell_radius(points, offsets, labels, owner, neighbour, centres),
+            }
+        return self._mesh
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = CellIndex(self.mesh["cell_centres"])
+        return self._index
+
+    def read_field(self, time, name):
+        return read_field(os.path.join(self.path, time, name), self.mesh["n_cells"])
+
+    # {field: (cells, components)} of one time, fields missing from the time are skipped
+    def read_fields(self, time, fields=FIELDS):
+        return {f: self.read_field(time, f) for f in fields if self.has_field(time, f)}
+
+    # yield (time, fields) for every time not processed yet
+    def iter_times(self, fields=FIELDS):
+        for time in self.new_times(fields):
+            yield time, self.read_fields(time, fields)
+
+    # field values at arbitrary points (nearest cell), {field: (points, components)}, and the mask
+    # of the points inside the mesh (to within one cell)
+    def sample(self, time, points, fields=FIELDS):
+        radius = self.mesh["cell_radius"]
+        # no point further than the largest cell radius from every centre is inside
+        cells, dist = self.index.nearest(points, radius.max())
+        inside = (cells >= 0) & (dist <= radius[cells])
+        cells = np.where(inside, cells, 0)
+        values = {name: a[cells] for name, a in self.read_fields(time, fields).items()}
+        return values, inside
+
+    # quantities of paraview.read_profile along the line start -> end (n points), so the rest
+    # of the package can use a case in place of the ParaView csv
+    def read_profile(self, time, start, end, n=1000, rho=1000):
+        start = np.asarray(start, dtype=np.float64)
+        end = np.asarray(end, dtype=np.float64)
+        t = np.linspace(0, 1, n)
+        points = start + t[:, None] * (end - start)
+        values, inside = self.sample(time, points)
+        # like the ParaView export filtered on vtkValidPointMask
+        values = {k: a[inside] for k, a in values.items()}
+        points, t = points[inside], t[inside]
+        profile = {}
+        if "U" in values:
+            profile["U"] = np.linalg.norm(values["U"], axis=1)
+        if "strainRate" in values:
+            profile["strainRate"] = values["strainRate"][:, 0]
+        if "nu" in values:
+            profile["nu"] = values["nu"][:, 0] * rho
+        if "shearStress" in values:
+            profile["shearStress"] = np.linalg.norm(values["shearStress"], axis=1) * rho
+        if "p" in values:
+            profile["p"] = values["p"][:, 0]
+        profile["arc_length"] = t * np.linalg.norm(end - start)
+        for k in range(3):
+            profile[f"Points:{k}"] = points[:, k]
+        return profile
+
+    # cross-section raster: the plane through origin spanned by unit vectors u, v, sampled on a
+    # (resolution, resolution) grid of half width half_width; {field: (res, res, components)},
+    # NaN outside the mesh
+    def cross_section(self, time, origin, u, v, half_width, resolution=200, fields=FIELDS):
+        origin, u, v = (np.asarray(a, dtype=np.float64) for a in (origin, u, v))
+        s = np.linspace(-half_width, half_width, resolution)
+        points = origin + s[:, None, None] * u + s[None, :, None] * v
+        values, inside = self.sample(time, points.reshape(-1, 3), fields)
+        return {
+            k: np.where(inside[:, None], a, np.nan).reshape(resolution, resolution, -1)
+            for k, a in values.items()
+        }
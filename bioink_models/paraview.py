@@ -0,0 +1,78 @@
+import csv
+import numpy as np
+
+# PARAVIEW / OPENFOAM CSV READER #
+# Paraview -> slice over needle cross-section -> plot over line -> save data as .csv
+# the export has ~29 columns; only the ones below are parsed, chunk by chunk, and every chunk is
+# reduced straight away to the quantities main.py uses:
+#   U           : velocity magnitude sqrt(U:0^2+U:1^2+U:2^2) [m/s]
+#   strainRate  : shear rate [1/s]
+#   nu          : apparent (dynamic) viscosity, nu*rho [Pa*s]
+#   shearStress : sqrt(shearStress:0^2+...+shearStress:5^2)*rho [Pa]
+#   arc_length, Points:0, Points:1, Points:2 : sample coordinates [m]
+# rows outside the mesh (vtkValidPointMask = 0) are dropped (rows with NaN if there is no mask)
+
+VELOCITY = "U:"
+SHEAR_STRESS = "shearStress:"
+STRAIN_RATE = "strainRate"
+VISCOSITY = "nu"
+MASK = "vtkValidPointMask"
+COORDINATES = ("arc_length", "Points:0", "Points:1", "Points:2")
+
+
+def read_header(path):
+    with open(path, newline="") as f:
+        return next(csv.reader(f))
+
+
+# needed columns of the export, resolved from the header alone
+def resolve_columns(header):
+    columns = {
+        "U": [c for c in header if c.startswith(VELOCITY)],
+        "shearStress": [c for c in header if c.startswith(SHEAR_STRESS)],
+        "strainRate": [c for c in header if c == STRAIN_RATE],
+        "nu": [c for c in header if c == VISCOSITY],
+        "mask": [c for c in header if c == MASK],
+    }
+    for name in COORDINATES:
+        columns[name] = [c for c in header if c == name]
+    missing = [k for k in ("U", "shearStress", "strainRate", "nu") if not columns[k]]
+    if missing:
+        raise KeyError(f"columns missing from the export: {missing}")
+    return columns
+
+
+def _magnitude(chunk, cols):
+    return np.sqrt(sum(chunk[c].to_numpy() ** 2 for c in cols))
+
+
+# stream the export and return {quantity: 1D array}
+def read_profile(path, rho=1000, chunksize=100_000, float32=False):
+    import pandas as pd
+
+    columns = resolve_columns(read_header(path))
+    usecols = sorted({c for cols in columns.values() for c in cols})
+    dtype = np.float32 if float32 else np.float64
+    parts = {
+        k: [] for k in ("U", "strainRate", "nu", "shearStress", *COORDINATES) if columns[k]
+    }
+
+    for chunk in pd.read_csv(
+        path, usecols=usecols, dtype={c: dtype for c in usecols}, chunksize=chunksize
+    ):
+        if columns["mask"]:
+            chunk = chunk[chunk[MASK] != 0]
+        else:
+            chunk = chunk.dropna()
+        parts["U"].append(_magnitude(chunk, columns["U"]))
+        parts["shearStress"].append(_magnitude(chunk, columns["shearStress"]) * rho)
+        parts["strainRate"].append(chunk[STRAIN_RATE].to_numpy())
+        parts["nu"].append(chunk[VISCOSITY].to_numpy() * rho)
+        for name in COORDINATES:
+            if name in parts:
+                parts[name].append(chunk[name].to_numpy())
+
+    return {
+        k: np.concatenate(v).astype(dtype, copy=False) if v else np.empty(0, dtype)
+        for k, v in parts.items()
+    }
@@ -0,0 +1,384 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from bioink_models.grid import graded
+
+# FINITE-VOLUME PIPE FLOW SOLVER #
+# fully developed laminar flow of a generalized Newtonian fluid in a straight needle, a quick
+# stand-in for the OpenFOAM case when checking a new ink or needle:
+#   (1/r) d/dr(r*eta(gamma_dot)*dU/dr) = -G,  G = Pn/Ln,  U(R) = 0,  dU/dr(0) = 0
+# discretized by finite volumes on nodes r_0 = 0 ... r_N = R (uniform, or graded toward the wall):
+#   F_f = r_f*eta_f*(U_{f+1} - U_f)/h_f on the faces,  F_i - F_{i-1} + G*(r_i+^2 - r_i-^2)/2 = 0
+# eta_f is taken at the regularized shear rate sqrt(gamma_dot^2 + eps^2) with eps = regularization
+# times the wall shear rate, which bounds the viscosity of shear-thinning (and yield stress)
+# models where gamma_dot -> 0 on the axis
+# the system is tridiagonal, so the sparse solve is a Thomas sweep vectorized over a batch of cases
+# (one node at a time, all cases at once); iteration:
+#   "picard" : viscosity from the previous iterate, linear solve for U
+#   "newton" : exact Jacobian, d(eta*gamma_dot)/d(gamma_dot) = eta*(1 + slope), slope from the
+#              model's d(log eta)/d(log gamma_dot), with a backtracking line search per case
+# starting from a few Picard steps on the Newtonian profile
+# outputs are the fields of paraview.read_profile from the axis to the wall: U, strainRate,
+# nu (dynamic viscosity [Pa*s]) and shearStress [Pa], all derived from the discrete U, p (kinematic,
+# like OpenFOAM, at the axial position z), arc_length = r; summaries add Q, V_average, tau_wall
+# and the Metzner-Reed Reynolds number with the entrance length estimate 0.06*Re*D of
+# report.summary
+# the 2D axisymmetric entrance region is not modelled
+
+PICARD_START = 3  # Picard steps before Newton
+LINE_SEARCH = 30  # step halvings per Newton iteration at most
+
+
+# solve the tridiagonal systems lower[i]*x[i-1] + diag[i]*x[i] + upper[i]*x[i+1] = rhs[i]
+# arrays (nodes, cases): the sweep runs over the nodes, every case at once
+def thomas(lower, diag, upper, rhs):
+    m = len(diag)
+    c = np.empty_like(diag)
+    d = np.empty_like(rhs)
+    c[0] = upper[0] / diag[0]
+    d[0] = rhs[0] / diag[0]
+    for i in range(1, m):
+        denom = diag[i] - lower[i] * c[i - 1]
+        c[i] = upper[i] / denom
+        d[i] = (rhs[i] - lower[i] * d[i - 1]) / denom
+    x = np.empty_like(d)
+    x[-1] = d[-1]
+    for i in range(m - 2, -1, -1):
+        x[i] = d[i] - c[i] * x[i + 1]
+    return x
+
+
+class _Discretization:
+    # s : dimensionless nodes 0..1; R, G : (cases,) radius and pressure gradient
+    def __init__(self, s, R):
+        self.r = s[:, None] * R  # (nodes, cases)
+        self.h = np.diff(self.r, axis=0)  # (faces, cases)
+        self.r_face = 0.5 * (self.r[1:] + self.r[:-1])
+        face_sq = np.concatenate([np.zeros_like(R)[None], self.r_face**2])
+        self.volume = 0.5 * np.diff(face_sq, axis=0)  # control volumes of the unknown nodes
+
+    def shear_rate(self, U):
+        return np.abs(np.diff(U, axis=0)) / self.h
+
+    # face viscosity and d(flux)/d(U_{f+1}) for Picard (secant) or Newton (tangent)
+    def face_terms(self, model, U, eps, newton):
+        gamma_dot = self.shear_rate(U)
+        gamma_eff_sq = gamma_dot**2 + eps**2
+        eta, slope = model._viscosity_slope(np.sqrt(gamma_eff_sq))
+        k = self.r_face / self.h * eta
+        tangent = k * (1 + slope * gamma_dot**2 / gamma_eff_sq) if newton else k
+        return k, tangent
+
+    def residual(self, model, U, G, eps):
+        k, _ = self.face_terms(model, U, eps, False)
+        flux = k * np.diff(U, axis=0)
+        previous = np.concatenate([np.zeros_like(flux[:1]), flux[:-1]])
+        return flux - previous + G * self.volume
+
+    # linear system of the unknown nodes 0..N-1 (U_N = 0) with the face coefficients k
+    @staticmethod
+    def matrix(k):
+        lower = np.concatenate([np.zeros_like(k[:1]), k[:-1]])
+        upper = k.copy()
+        upper[-1] = 0.0
+        diag = -k - lower
+        return lower, diag, upper
+
+
+# Newtonian profile with the viscosity the model has at the wall shear stress, as a first iterate
+def _initial_profile(model, disc, G, R):
+    tau_w = G * R / 2
+    eta = model.viscosity(np.maximum(model.shear_rate(tau_w), 1e-300))
+    return G / (4 * eta) * (R**2 - disc.r**2)
+
+
+# iterate to convergence; returns U (nodes, cases), iterations and the converged mask
+def _iterate(model, disc, G, R, U, eps, method, tol, max_iter):
+    converged = np.zeros(G.shape, dtype=bool)
+    for iteration in range(1, max_iter + 1):
+        newton = method == "newton" and iteration > PICARD_START
+        k, tangent = disc.face_terms(model, U, eps, newton)
+        if newton:
+            residual = disc.residual(model, U, G, eps)
+            step = thomas(*disc.matrix(tangent), -residual)
+            # a residual at round-off level (relative to G*R^2) cannot decrease any more
+            norm = np.maximum(np.abs(residual).max(axis=0), 1e-12 * G * R**2)
+            alpha = np.ones_like(G)
+            for _ in range(LINE_SEARCH):
+                trial = U.copy()
+                trial[:-1] += alpha * step
+                better = np.abs(disc.residual(model, trial, G, eps)).max(axis=0) <= norm
+                better |= converged
+                if better.all():
+                    break
+                alpha = np.where(better, alpha, 0.5 * alpha)
+        else:
+            solution = thomas(*disc.matrix(k), -G * disc.volume)
+            step = solution - U[:-1]
+            alpha = np.ones_like(G)
+        change = np.abs(alpha * step).max(axis=0) / np.maximum(np.abs(U).max(axis=0), 1e-300)
+        U = U.copy()
+        U[:-1] += np.where(converged, 0.0, alpha) * step
+        converged |= change <= tol
+        if converged.all():
+            break
+    return U, iteration, converged
+
+
+# fully developed profiles of a batch of cases (arrays broadcast against each other)
+#   model : rheology model (parameters broadcast against the cases); Pn [Pa] or Qn [m^3/s]
+#   N : radial intervals; wall_ratio : last/first spacing of the graded grid (1 = uniform)
+#   z : axial position of the section for p [m] (default mid-length)
+# returns {field: (cases, nodes)} with the paraview.read_profile fields plus "r", and the scalars
+# {Q, V_average, tau_wall, Re, entrance_length, Pn, iterations, converged}, each (cases,)
+def solve(
+    model,
+    R,
+    Ln,
+    Pn=None,
+    Qn=None,
+    rho=1000,
+    N=400,
+    wall_ratio=1.0,
+    method="newton",
+    regularization=1e-6,
+    tol=1e-10,
+    max_iter=200,
+    z=None,
+    flow_tol=1e-8,
+):
+    if (Pn is None) == (Qn is None):
+        raise ValueError("give either the pressure drop Pn or the flow rate Qn")
+    load = Pn if Qn is None else Qn
+    arrays = [np.asarray(a, dtype=np.float64) for a in (R, Ln, load)]
+    shape = np.broadcast_shapes(*[a.shape for a in arrays], *[p.shape for p in model.ink])
+    R, Ln, load = [np.broadcast_to(a, shape).ravel() for a in arrays]
+    model = type(model)(*[np.broadcast_to(p, shape).ravel() for p in model.ink])
+
+    s = graded(0.0, 1.0, N + 1, wall_ratio)
+    disc = _Discretization(s, R)
+    if Qn is None:
+        Pn = load
+    else:
+        # pressure of the exact quadrature as the first estimate, corrected on the discrete flow
+        Pn = model.pressure(load, R, Ln)
+    G = Pn / Ln
+    eps = regularization * model.shear_rate(G * R / 2)
+    U = _initial_profile(model, disc, G, R)
+    U, iterations, converged = _iterate(model, disc, G, R, U, eps, method, tol, max_iter)
+
+    if Qn is not None:
+        # secant correction of log G on log Q, the profile scaled to the new gradient as a start
+        log_G, log_Q = np.log(G), np.log(_flow_rate(disc, U))
+        slope = np.ones_like(G)
+        for _ in range(50):
+            miss = np.log(load) - log_Q
+            if np.all(np.abs(miss) <= flow_tol):
+                break
+            new_log_G = log_G + miss / slope
+            G_new = np.exp(new_log_G)
+            U = U * (G_new / G) ** (1 / slope)
+            G = G_new
+            eps = regularization * model.shear_rate(G * R / 2)
+            U, more, ok = _iterate(model, disc, G, R, U, eps, method, tol, max_iter)
+            iterations += more
+            converged &= ok
+            new_log_Q = np.log(_flow_rate(disc, U))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                secant = (new_log_Q - log_Q) / (new_log_G - log_G)
+            slope = np.where(np.isfinite(secant) & (secant > 0), secant, slope)
+            log_G, log_Q = new_log_G, new_log_Q
+        Pn = G * Ln
+    return _fields(model, disc, U, G, R, Ln, Pn, rho, eps, z, iterations, converged)
+
+
+# Q = 2*pi*integral U*r dr (trapezoid on the nodes)
+def _flow_rate(disc, U):
+    q = U * disc.r
+    return np.pi * ((q[1:] + q[:-1]) * disc.h).sum(axis=0)
+
+
+# shear rate of U at the nodes: the face rates |dU/dr| interpolated linearly in log(r) -
+# log(gamma_dot) between the two faces around a node (exact for the local power law gamma_dot ~ r^p
+# near the axis, where linear averaging smears the steep rise), extrapolated the same way to the
+# wall, and 0 on the axis by symmetry
+def _node_shear_rate(disc, U):
+    face = disc.shear_rate(U)
+    r_face = disc.r_face
+    # faces below / above every node 1..N, the wall node uses the last two faces
+    lower = np.concatenate([face[:-1], face[-2:-1]])
+    upper = np.concatenate([face[1:], face[-1:]])
+    r_lower = np.concatenate([r_face[:-1], r_face[-2:-1]])
+    r_upper = np.concatenate([r_face[1:], r_face[-1:]])
+    theta = np.log(disc.r[1:] / r_lower) / np.log(r_upper / r_lower)
+    flowing = (lower > 0) & (upper > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_rate = (1 - theta) * np.log(lower) + theta * np.log(upper)
+    nodes = np.where(flowing, np.exp(np.where(flowing, log_rate, 0.0)), 0.0)
+    return np.concatenate([np.zeros_like(face[:1]), nodes])
+
+
+def _fields(model, disc, U, G, R, Ln, Pn, rho, eps, z, iterations, converged):
+    # every field derives from the discrete velocity: the shear rate of U, the viscosity the solver
+    # used at that rate (regularized like eta_f) and their product, so they show the regularization
+    # near the axis or in a plug instead of repeating the exact tau = G*r/2
+    strain_rate = _node_shear_rate(disc, U)
+    eta = model.viscosity(np.sqrt(strain_rate**2 + eps**2))
+    shear_stress = eta * strain_rate
+    z = Ln / 2 if z is None else z
+    Q = _flow_rate(disc, U)
+    V_average = Q / (np.pi * R**2)
+    tau_wall = G * R / 2
+    eta_MR = tau_wall * 2 * R / (8 * V_average)  # Metzner-Reed viscosity, eta_PL of a power law
+    Re = rho * V_average * 2 * R / eta_MR
+    return {
+        "r": disc.r.T,
+        "arc_length": disc.r.T,
+        "U": U.T,
+        "strainRate": strain_rate.T,
+        "nu": eta.T,
+        "shearStress": shear_stress.T,
+        "p": np.broadcast_to((Pn * (1 - z / Ln) / rho)[:, None], U.T.shape),
+        "Q": Q,
+        "V_average": V_average,
+        "tau_wall": tau_wall,
+        "Pn": Pn,
+        "Re": Re,
+        "entrance_length": Re * 2 * R * 0.06,
+        "iterations": np.full(Q.shape, iterations),
+        "converged": converged,
+    }
+
+
+def _solve_packed(args):
+    model_cls, ink, kwargs = args
+    return solve(model_cls(*ink), **kwargs)
+
+
+# solve a batch of cases split into chunks over a process pool; arguments as solve()
+def solve_batch(model, R, Ln, Pn=None, Qn=None, chunk_size=256, processes=None, **kwargs):
+    load = Pn if Qn is None else Qn
+    arrays = [np.asarray(a, dtype=np.float64) for a in (R, Ln, load)]
+    shape = np.broadcast_shapes(*[a.shape for a in arrays], *[p.shape for p in model.ink])
+    R, Ln, load = [np.broadcast_to(a, shape).ravel() for a in arrays]
+    ink = [np.broadcast_to(p, shape).ravel() for p in model.ink]
+    key = "Pn" if Qn is None else "Qn"
+    jobs = []
+    for start in range(0, R.size, chunk_size):
+        part = slice(start, start + chunk_size)
+        jobs.append(
+            (type(model), [p[part] for p in ink],
+             dict(kwargs, R=R[part], Ln=Ln[part], **{key: load[part]}))
+        )
+    if processes is not None and processes <= 1:
+        results = [_solve_packed(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_solve_packed, jobs))
+    return {k: np.concatenate([r[k] for r in results]) for k in results[0]}
+
+
+# one case of solve() as a ParaView-style csv that paraview.read_profile (and so main.py and
+# validate.py) reads like an OpenFOAM export: flow along y, sample line along x from the axis,
+# kinematic nu and shearStress as OpenFOAM writes them
+def write_csv(fields, out_path, case=0, rho=1000):
+    r = fields["r"][case]
+    zeros = np.zeros_like(r)
+    columns = {
+        "U:0": zeros,
+        "U:1": fields["U"][case],
+        "U:2": zeros,
+        "strainRate": fields["strainRate"][case],
+        "nu": fields["nu"][case] / rho,
+        **{f"shearStress:{k}": zeros for k in range(6)},
+        "p": fields["p"][case],
+        "vtkValidPointMask": np.ones_like(r),
+        "arc_length": r,
+        "Points:0": r,
+        "Points:1": zeros,
+        "Points:2": zeros,
+    }
+    columns["shearStress:1"] = fields["shearStress"][case] / rho
+    np.savetxt(
+        out_path,
+        np.column_stack(list(columns.values())),
+        delimiter=",",
+        header=",".join(f'"{name}"' for name in columns),
+        comments="",
+        fmt="%.10g",
+    )
+
+
+def format_summary(fields):
+    lines = [
+        f"{'case':>5} {'Pn [kPa]':>10} {'Q [uL/s]':>10} {'V [mm/s]':>10} {'tau_w [kPa]':>11} "
+        f"{'Re':>10} {'L_e [um]':>10} {'iter':>5}"
+    ]
+    for i in range(len(fields["Q"])):
+        lines.append(
+            f"{i:>5} {fields['Pn'][i] * 1e-3:>10.5g} {fields['Q'][i] * 1e9:>10.5g} "
+            f"{fields['V_average'][i] * 1e3:>10.5g} {fields['tau_wall'][i] * 1e-3:>11.5g} "
+            f"{fields['Re'][i]:>10.4g} {fields['entrance_length'][i] * 1e6:>10.4g} "
+            f"{int(fields['iterations'][i]):>5}" + ("" if fields["converged"][i] else "  not converged")
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    from bioink_models.rheology import MODELS
+
+    parser = argparse.ArgumentParser(
+        description="Fully developed generalized Newtonian needle flow (finite volumes)"
+    )
+    parser.add_argument("--model", default="power_law", choices=sorted(MODELS))
+    parser.add_argument(
+        "--params",
+        type=float,
+        nargs="+",
+        default=[160.630, 0.360],
+        help="model parameters in order (power law: K n)",
+    )
+    parser.add_argument("--radius", type=float, nargs="+", default=[100e-6], help="[m]")
+    parser.add_argument("--length", type=float, default=0.02, help="needle length [m]")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--pressure", type=float, nargs="+", help="pressure drops [Pa]")
+    load.add_argument("--flow-rate", type=float, nargs="+", help="flow rates [m^3/s]")
+    parser.add_argument("--rho", type=float, default=1000, help="density [kg/m^3]")
+    parser.add_argument("-N", type=int, default=400, help="radial intervals")
+    parser.add_argument("--wall-ratio", type=float, default=1.0)
+    parser.add_argument("--method", default="newton", choices=("newton", "picard"))
+    parser.add_argument(
+        "--regularization", type=float, default=1e-6, help="eps as a fraction of the wall shear rate"
+    )
+    parser.add_argument("-o", "--out", help="csv of the first case, readable as a ParaView export")
+    args = parser.parse_args(argv)
+
+    model = MODELS[args.model](*args.params)
+    Pn, Qn = args.pressure, args.flow_rate
+    if Pn is None and Qn is None:
+        Pn = [1465.807e3]
+    # every radius with every load
+    R = np.asarray(args.radius)[:, None]
+    load = np.asarray(Pn if Qn is None else Qn)[None, :]
+    fields = solve(
+        model,
+        R,
+        args.length,
+        Pn=None if Pn is None else load,
+        Qn=None if Qn is None else load,
+        rho=args.rho,
+        N=args.N,
+        wall_ratio=args.wall_ratio,
+        method=args.method,
+        regularization=args.regularization,
+    )
+    print(format_summary(fields))
+    if args.out:
+        write_csv(fields, args.out, rho=args.rho)
+    return 0 if fields["converged"].all() else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+import numpy as np
+
+from bioink_models import kernel
+
+# NEEDLE REPORT #
+# the computations behind main.py, free of printing, plotting and file writing so that scripts and
+# services can import them; NumPy only, the OpenFOAM profile (pandas) and the power law fit are
+# loaded on first use
+#   R : needle radius [m]; Ln : needle length [m]; Pn : pressure drop [Pa]
+#   K : consistency index [Pa*s^n]; n : flow behavior index [-]; rho : density [kg/m^3]
+
+
+# version of analytic_profile results, part of main.py's profile cache key: bump it whenever the
+# kernel or the radial grids change what it returns, so stale cached profiles are not served
+PROFILE_VERSION = 1
+
+
+# closed-form profile from 1e-6 m to R on
+#   grid="uniform"  : N evenly spaced radii
+#   grid="adaptive" : the error-controlled grid of grid.power_law_grid for the relative tolerance
+#                     rtol (N is ignored)
+def analytic_profile(R, Ln, Pn, K, n, N=1000, grid="uniform", rtol=1e-4):
+    if grid == "adaptive":
+        from bioink_models.grid import power_law_grid
+
+        r = power_law_grid(R, Ln, Pn, K, n, rtol=rtol)
+    else:
+        r = np.linspace(1e-6, R, N)
+    return {
+        "r": r,
+        "Vz": kernel.Vz(r, R, Ln, Pn, K, n),
+        "dVzdr": -kernel.gamma_dot(r, Ln, Pn, K, n),  # derivative of Vz(r) with respect to r
+        "tau_rz": kernel.tau_rz(r, Ln, Pn),  # shear stress (absolute value)
+        "eta": kernel.eta(r, Ln, Pn, K, n),  # apparent viscosity
+    }
+
+
+# scalar quantities printed by main.py, in SI units
+def summary(R, Ln, Pn, K, n, rho=1000):
+    Q_average = kernel.Qave(R, Ln, Pn, K, n)
+    V_average = kernel.V_average(R, Ln, Pn, K, n)
+    Re_PL = kernel.Re_PL(V_average, R, K, n, rho)
+    return {
+        "Q_average": Q_average,
+        "mass_flow_rate": Q_average * rho,
+        "Pn": Pn,
+        "Vz_max": kernel.Vz(0.0, R, Ln, Pn, K, n),
+        "V_average": V_average,
+        "tau_wall": kernel.tau_wall(R, Ln, Pn),
+        "eta_PL": kernel.eta_PL(V_average, R, K, n),
+        "Re_PL": Re_PL,
+        "entrance_length": Re_PL * 2 * R * 0.06,
+    }
+
+
+# OpenFOAM profile of a ParaView csv, each field with its radius axis in micrometer
+def simulation_profile(path, R, rho=1000):
+    from bioink_models import paraview
+
+    df = paraview.read_profile(path, rho)
+    data = {}
+    for field, key in (
+        ("U", "U"),
+        ("shearRate", "strainRate"),
+        ("shearStress", "shearStress"),
+        ("nu", "nu"),
+    ):
+        data["df_" + field] = df[key]
+        data["xx_" + field] = np.linspace(1e-6, R * 1e6, len(df[key]))
+    return data
+
+
+# version of simulation_profile + fit_simulation results, part of main.py's fit cache key: bump it
+# whenever the reader or the fitter changes what they return, so stale cached fits are not served
+FIT_VERSION = 2
+
+
+# eta = K*gamma_dot^(-m) fit of the simulation viscosity, parameters (K, m = 1 - n) and covariance
+def fit_simulation(shear_rate, nu):
+    from bioink_models import fitting
+
+    # log-log initial solution refined on eta (same loss as scipy's curve_fit)
+    result = fitting.fit_power_law(np.ravel(shear_rate), np.ravel(nu), loss="linear")
+    K_fit, n_fit = result["params"][0]
+    jacobian = np.array([[1, 0], [0, -1]])  # (K, n) -> (K, 1 - n)
+    return {
+        "popt": np.array([K_fit, 1 - n_fit]),
+        "pcov": jacobian @ result["cov"][0] @ jacobian.T,
+    }
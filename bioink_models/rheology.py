@@ -0,0 +1,315 @@
+import numpy as np
+from math import pi
+
+from bioink_models import kernel
+
+# GENERALIZED NEWTONIAN RHEOLOGY MODELS #
+# a model only has to give its apparent viscosity eta(gamma_dot); everything inside the needle
+# follows from the wall stress relation tau_rz(r) = tau_w * r/R with tau_w = R*Pn/(2*Ln):
+#
+#   Q     = pi*R^3/tau_w^3 * integral_{tau_y}^{tau_w} tau^2 * gamma_dot(tau) dtau
+#   Vz(r) = integral_r^R gamma_dot(tau_w * s/R) ds
+#
+# gamma_dot(tau) is the inverse of tau = eta(gamma_dot)*gamma_dot (closed form for power law and
+# Herschel-Bulkley, vectorized Newton iteration otherwise) and both integrals use Gauss-Legendre
+# nodes computed once at import. Model parameters are arrays that broadcast against Pn, R, Ln and r,
+# so one model instance holds a whole batch of bioinks
+
+QUAD_NODES = 32  # Gauss-Legendre nodes for the flow rate integral
+QUAD_NODES_PROFILE = 16  # Gauss-Legendre nodes per radius for Vz(r)
+
+
+# Gauss-Legendre nodes and weights mapped from [-1, 1] to [0, 1]
+def _gauss_01(k):
+    x, w = np.polynomial.legendre.leggauss(k)
+    return 0.5 * (x + 1), 0.5 * w
+
+
+_s, _w = _gauss_01(QUAD_NODES)
+_s_profile, _w_profile = _gauss_01(QUAD_NODES_PROFILE)
+
+
+class RheologyModel:
+    name = "generic"
+    param_names = ()
+    newton_iter = 50
+    newton_tol = 1e-12
+
+    def __init__(self, *args, **kwargs):
+        values = dict(zip(self.param_names, args))
+        values.update(kwargs)
+        missing = [p for p in self.param_names if p not in values]
+        if missing or len(values) != len(self.param_names):
+            raise TypeError(
+                f"{type(self).__name__} takes the parameters {self.param_names}"
+            )
+        for p in self.param_names:
+            setattr(self, p, np.asarray(values[p], dtype=np.float64))
+
+    def __repr__(self):
+        params = ", ".join(f"{p}={getattr(self, p)!r}" for p in self.param_names)
+        return f"{type(self).__name__}({params})"
+
+    # parameter arrays in param_names order (the ink tuple used by solver.select_needles)
+    @property
+    def ink(self):
+        return tuple(getattr(self, p) for p in self.param_names)
+
+    # flow rate in the solver form flow_rate(Pn, R, Ln, *ink)
+    @classmethod
+    def flow_rate_of(cls, Pn, R, Ln, *ink):
+        return cls(*ink).flow_rate(Pn, R, Ln)
+
+    # same model with a trailing axis added to every parameter (for the quadrature node axis)
+    def _node_axis(self):
+        return type(self)(*[p[..., None] for p in self.ink])
+
+    # DIMENSIONLESS FORM #
+    # gamma_dot(tau)/gamma_c depends on tau/tau_c and on the shape parameters only, so
+    # Q/(pi*R^3*gamma_c) is a single master curve of tau_w/tau_c for every shape (master_curve.py)
+
+    # stress and shear rate scales (tau_c [Pa], gamma_c [1/s])
+    def scales(self):
+        raise NotImplementedError
+
+    # dimensionless shape parameters, one array per parameter
+    def shape(self):
+        raise NotImplementedError
+
+    # model with tau_c = gamma_c = 1 for the given shape parameters
+    @classmethod
+    def unit(cls, *shape):
+        raise NotImplementedError
+
+    # CONSTITUTIVE RELATION #
+
+    # apparent viscosity, eta(gamma_dot) [Pa*s]
+    def viscosity(self, gamma_dot):
+        raise NotImplementedError
+
+    # eta and d(log eta)/d(log gamma_dot) in one pass, used by the Newton inversion
+    def _viscosity_slope(self, gamma_dot):
+        raise NotImplementedError
+
+    # yield stress [Pa]; no flow below it
+    def yield_stress(self):
+        return np.zeros(())
+
+    # first guess of gamma_dot(tau) for the Newton inversion
+    def _shear_rate_guess(self, tau):
+        raise NotImplementedError
+
+    # shear rate for a given shear stress, inverse of tau = eta(gamma_dot)*gamma_dot
+    # Newton iteration on log(gamma_dot), vectorized over every point and bioink at once
+    def shear_rate(self, tau):
+        tau = np.asarray(tau, dtype=np.float64)
+        positive = tau > 0
+        log_tau = np.log(np.where(positive, tau, 1.0))
+        u = np.log(self._shear_rate_guess(np.where(positive, tau, 1.0)))
+        for _ in range(self.newton_iter):
+            eta, slope = self._viscosity_slope(np.exp(u))
+            du = (np.log(eta) + u - log_tau) / (1 + slope)
+            u = u - np.clip(du, -5, 5)
+            if np.all(np.abs(du) < self.newton_tol):
+                break
+        return np.where(positive, np.exp(u), 0.0)
+
+    # NEEDLE FLOW #
+
+    # shear stress (absolute value), tau_rz(r) [Pa]
+    def tau_rz(self, r, Ln, Pn):
+        return kernel.tau_rz(r, Ln, Pn)
+
+    # shear rate (absolute value), gamma_dot(r) [1/s]
+    def gamma_dot(self, r, Ln, Pn):
+        return self.shear_rate(self.tau_rz(r, Ln, Pn))
+
+    # apparent viscosity along the radius, eta(r) [Pa*s]
+    def eta(self, r, Ln, Pn):
+        return self.viscosity(self.gamma_dot(r, Ln, Pn))
+
+    # volumetric flow rate, Q [m^3/s]
+    def flow_rate(self, Pn, R, Ln):
+        R, Ln, Pn = [np.asarray(a, dtype=np.float64) for a in (R, Ln, Pn)]
+        tau_w = kernel.tau_wall(R, Ln, Pn)
+        tau_y = np.minimum(self.yield_stress(), tau_w)
+        # tau = tau_y + (tau_w - tau_y)*s on the Gauss nodes s, trailing axis = node axis
+        span = tau_w - tau_y
+        tau = tau_y[..., None] + span[..., None] * _s
+        integral = span * ((tau**2 * self._node_axis().shear_rate(tau)) @ _w)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(tau_w > 0, pi * R**3 / tau_w**3 * integral, 0.0)
+
+    # velocity profile along the needle variable radius, Vz(r) [m/s]
+    # Vz(r) = R/tau_w * integral_{max(tau_rz(r), tau_y)}^{tau_w} gamma_dot(tau) dtau on Gauss nodes,
+    # so the plug of a yield stress fluid is exact
+    def velocity(self, r, Pn, R, Ln):
+        r, R, Ln, Pn = [np.asarray(a, dtype=np.float64) for a in (r, R, Ln, Pn)]
+        tau_w = kernel.tau_wall(R, Ln, Pn)
+        tau_lo = np.minimum(np.maximum(tau_w * r / R, self.yield_stress()), tau_w)
+        span = tau_w - tau_lo
+        tau = tau_lo[..., None] + span[..., None] * _s_profile
+        integral = span * (self._node_axis().shear_rate(tau) @ _w_profile)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(tau_w > 0, R / tau_w * integral, 0.0)
+
+    # pressure drop for a given flow rate, Pn [Pa] (vectorized root-find on flow_rate)
+    def pressure(self, Qn, R, Ln):
+        from bioink_models.solver import find_pressure
+
+        return find_pressure(type(self).flow_rate_of, Qn, R, Ln, self.ink)
+
+
+# POWER LAW #
+# eta = K*gamma_dot^(n-1); every needle quantity has a closed form (kernel.py)
+class PowerLaw(RheologyModel):
+    name = "power_law"
+    param_names = ("K", "n")
+
+    def scales(self):
+        return self.K, np.ones_like(self.K)
+
+    def shape(self):
+        return (self.n,)
+
+    @classmethod
+    def unit(cls, n):
+        return cls(1.0, n)
+
+    def viscosity(self, gamma_dot):
+        with np.errstate(divide="ignore"):
+            return self.K * np.asarray(gamma_dot, dtype=np.float64) ** (self.n - 1)
+
+    def _viscosity_slope(self, gamma_dot):
+        return self.viscosity(gamma_dot), self.n - 1
+
+    def shear_rate(self, tau):
+        return (np.asarray(tau, dtype=np.float64) / self.K) ** (1 / self.n)
+
+    def gamma_dot(self, r, Ln, Pn):
+        return kernel.gamma_dot(r, Ln, Pn, self.K, self.n)
+
+    def eta(self, r, Ln, Pn):
+        return kernel.eta(r, Ln, Pn, self.K, self.n)
+
+    def flow_rate(self, Pn, R, Ln):
+        return kernel.Qave(R, Ln, Pn, self.K, self.n)
+
+    def velocity(self, r, Pn, R, Ln):
+        return kernel.Vz(r, R, Ln, Pn, self.K, self.n)
+
+    def pressure(self, Qn, R, Ln):
+        return kernel.Pn_func(Qn, R, Ln, self.K, self.n)
+
+
+# HERSCHEL-BULKLEY #
+# tau = tau_y + K*gamma_dot^n above the yield stress tau_y, plug flow below it
+class HerschelBulkley(RheologyModel):
+    name = "herschel_bulkley"
+    param_names = ("tau_y", "K", "n")
+
+    # scaled by the yield stress, so tau_y must be positive (use PowerLaw for tau_y = 0)
+    def scales(self):
+        return self.tau_y, (self.tau_y / self.K) ** (1 / self.n)
+
+    def shape(self):
+        return (self.n,)
+
+    @classmethod
+    def unit(cls, n):
+        return cls(1.0, 1.0, n)
+
+    def viscosity(self, gamma_dot):
+        gamma_dot = np.asarray(gamma_dot, dtype=np.float64)
+        with np.errstate(divide="ignore"):
+            return self.tau_y / gamma_dot + self.K * gamma_dot ** (self.n - 1)
+
+    def _viscosity_slope(self, gamma_dot):
+        gamma_dot = np.asarray(gamma_dot, dtype=np.float64)
+        power = self.K * gamma_dot**self.n
+        tau = self.tau_y + power
+        return tau / gamma_dot, ((self.n - 1) * power - self.tau_y) / tau
+
+    def yield_stress(self):
+        return self.tau_y
+
+    def shear_rate(self, tau):
+        excess = np.maximum(np.asarray(tau, dtype=np.float64) - self.tau_y, 0.0)
+        return (excess / self.K) ** (1 / self.n)
+
+
+# CARREAU-YASUDA #
+# eta = eta_inf + (eta0 - eta_inf)*(1 + (lam*gamma_dot)^a)^((n-1)/a)
+class CarreauYasuda(RheologyModel):
+    name = "carreau_yasuda"
+    param_names = ("eta0", "eta_inf", "lam", "a", "n")
+
+    def scales(self):
+        return self.eta0 / self.lam, 1 / self.lam
+
+    def shape(self):
+        return (self.a, self.n, self.eta_inf / self.eta0)
+
+    @classmethod
+    def unit(cls, a, n, eta_ratio):
+        return cls(1.0, eta_ratio, 1.0, a, n)
+
+    def viscosity(self, gamma_dot):
+        x = (self.lam * np.asarray(gamma_dot, dtype=np.float64)) ** self.a
+        return self.eta_inf + (self.eta0 - self.eta_inf) * (1 + x) ** (
+            (self.n - 1) / self.a
+        )
+
+    def _viscosity_slope(self, gamma_dot):
+        x = (self.lam * np.asarray(gamma_dot, dtype=np.float64)) ** self.a
+        thinning = (self.eta0 - self.eta_inf) * (1 + x) ** ((self.n - 1) / self.a)
+        eta = self.eta_inf + thinning
+        return eta, (self.n - 1) * x / (1 + x) * thinning / eta
+
+    # the larger of the zero-shear plateau and the shear-thinning asymptote,
+    # capped by the infinite-shear plateau
+    def _shear_rate_guess(self, tau):
+        newtonian = tau / self.eta0
+        thinning = (tau / (self.eta0 * self.lam ** (self.n - 1))) ** (1 / self.n)
+        with np.errstate(divide="ignore"):
+            return np.minimum(np.maximum(newtonian, thinning), tau / self.eta_inf)
+
+
+# CROSS #
+# eta = eta_inf + (eta0 - eta_inf)/(1 + (lam*gamma_dot)^m)
+# tau(gamma_dot) is only invertible for m <= 1 or eta_inf > 0
+class Cross(RheologyModel):
+    name = "cross"
+    param_names = ("eta0", "eta_inf", "lam", "m")
+
+    def scales(self):
+        return self.eta0 / self.lam, 1 / self.lam
+
+    def shape(self):
+        return (self.m, self.eta_inf / self.eta0)
+
+    @classmethod
+    def unit(cls, m, eta_ratio):
+        return cls(1.0, eta_ratio, 1.0, m)
+
+    def viscosity(self, gamma_dot):
+        x = (self.lam * np.asarray(gamma_dot, dtype=np.float64)) ** self.m
+        return self.eta_inf + (self.eta0 - self.eta_inf) / (1 + x)
+
+    def _viscosity_slope(self, gamma_dot):
+        x = (self.lam * np.asarray(gamma_dot, dtype=np.float64)) ** self.m
+        thinning = (self.eta0 - self.eta_inf) / (1 + x)
+        eta = self.eta_inf + thinning
+        return eta, -self.m * x / (1 + x) * thinning / eta
+
+    def _shear_rate_guess(self, tau):
+        newtonian = tau / self.eta0
+        exponent = 1 / (1 - np.minimum(self.m, 0.99))
+        thinning = (tau * self.lam**self.m / self.eta0) ** exponent
+        with np.errstate(divide="ignore"):
+            return np.minimum(np.maximum(newtonian, thinning), tau / self.eta_inf)
+
+
+MODELS = {
+    model.name: model for model in (PowerLaw, HerschelBulkley, CarreauYasuda, Cross)
+}
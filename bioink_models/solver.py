@@ -0,0 +1,112 @@
+import numpy as np
+from math import pi
+
+from bioink_models import kernel
+
+# INVERSE SOLVER #
+# needle / pressure selection for a target extrusion rate under a wall shear stress limit
+# (tau_max) and an optional residence time limit
+#
+# the pressure for every candidate is found at once: either with the power law closed form
+# (kernel.Pn_func) or, for rheology models without a closed-form inverse, by a vectorized
+# root-find on any flow rate function flow_rate(Pn, R, Ln, *ink) -> Q [m^3/s]
+# that increases with Pn and broadcasts over its arguments
+
+
+# vectorized Illinois (modified regula falsi) root-find of flow_rate(Pn) = Qn in log-log space
+# every candidate is bracketed first, then all brackets are refined together; for a power law
+# log(Q) is linear in log(Pn) so the first step is already exact
+def find_pressure(
+    flow_rate, Qn, R, Ln, ink=(), P_lo=1.0, P_hi=1e6, rtol=1e-10, max_iter=100
+):
+    Qn, R, Ln = [np.asarray(a, dtype=np.float64) for a in (Qn, R, Ln)]
+    ink = tuple(np.asarray(a, dtype=np.float64) for a in ink)
+    shape = np.broadcast_shapes(Qn.shape, R.shape, Ln.shape, *[a.shape for a in ink])
+    Qn, R, Ln = [np.broadcast_to(a, shape) for a in (Qn, R, Ln)]
+    ink = tuple(np.broadcast_to(a, shape) for a in ink)
+    target = np.log(Qn)
+
+    def f(log_P):
+        with np.errstate(divide="ignore"):
+            return np.log(flow_rate(np.exp(log_P), R, Ln, *ink)) - target
+
+    # bracket: move the bounds outwards by decades until the sign changes
+    a = np.full(shape, np.log(P_lo))
+    b = np.full(shape, np.log(P_hi))
+    fa, fb = f(a), f(b)
+    for _ in range(60):
+        low, high = fa > 0, fb < 0
+        if not (low.any() or high.any()):
+            break
+        a = np.where(low, a - np.log(10.0), a)
+        b = np.where(high, b + np.log(10.0), b)
+        fa, fb = f(a), f(b)
+    else:
+        raise RuntimeError("could not bracket the pressure for every candidate")
+
+    side = np.zeros(shape, dtype=np.int8)
+    for _ in range(max_iter):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            c = (a * fb - b * fa) / (fb - fa)
+        c = np.where(np.isfinite(c), c, 0.5 * (a + b))
+        fc = f(c)
+        left = np.sign(fc) == np.sign(fa)
+        # Illinois: halve the function value of the end point that stays put twice in a row
+        fb = np.where(left & (side == 1), 0.5 * fb, fb)
+        fa = np.where(~left & (side == -1), 0.5 * fa, fa)
+        a, fa = np.where(left, c, a), np.where(left, fc, fa)
+        b, fb = np.where(left, b, c), np.where(left, fb, fc)
+        side = np.where(left, 1, -1).astype(np.int8)
+        if np.all((np.abs(b - a) <= rtol) | (np.abs(fc) <= rtol)):
+            break
+    return np.exp(c)
+
+
+# power law flow rate in the flow_rate(Pn, R, Ln, *ink) form, ink = (K, n)
+def power_law_flow_rate(Pn, R, Ln, K, n):
+    return kernel.Qave(R, Ln, Pn, K, n)
+
+
+# feasible needle radius / length / pressure set for every bioink
+#   Qn            : target volumetric flow rate(s) [m^3/s]
+#   tau_max       : maximum allowable wall shear stress [Pa]
+#   R, Ln         : candidate needle radii and lengths [m]
+#   ink           : tuple of bioink parameter arrays, one entry per bioink; (K, n) for the power law
+#   residence_max : optional maximum residence time inside the needle [s]
+#   flow_rate     : None for the power law closed form, otherwise flow_rate(Pn, R, Ln, *ink)
+#                   (for a rheology.RheologyModel: ink=model.ink, flow_rate=type(model).flow_rate_of)
+# candidates are the grid R x Ln x ink x Qn (C order); returns the columnar table of feasible rows
+def select_needles(
+    Qn, tau_max, R, Ln, ink, residence_max=None, flow_rate=None, max_iter=100
+):
+    R, Ln, Qn = [np.ravel(np.asarray(a, dtype=np.float64)) for a in (R, Ln, Qn)]
+    ink = [np.ravel(np.asarray(a, dtype=np.float64)) for a in ink]
+    n_ink = ink[0].size
+    if any(a.size != n_ink for a in ink):
+        raise ValueError("every bioink parameter needs one value per bioink")
+
+    shape = (R.size, Ln.size, n_ink, Qn.size)
+    i_R, i_Ln, i_ink, i_Q = [i.ravel() for i in np.indices(shape)]
+    R, Ln, Qn = R[i_R], Ln[i_Ln], Qn[i_Q]
+    ink = [a[i_ink] for a in ink]
+
+    if flow_rate is None:
+        Pn = kernel.Pn_func(Qn, R, Ln, *ink)
+    else:
+        Pn = find_pressure(flow_rate, Qn, R, Ln, ink, max_iter=max_iter)
+
+    tau_wall = kernel.tau_wall(R, Ln, Pn)
+    residence_time = Ln * pi * R**2 / Qn
+    feasible = tau_wall <= tau_max
+    if residence_max is not None:
+        feasible &= residence_time <= residence_max
+
+    return {
+        "R": R[feasible],
+        "Ln": Ln[feasible],
+        "ink": i_ink[feasible],
+        "Qn": Qn[feasible],
+        "Pn": Pn[feasible],
+        "tau_wall": tau_wall[feasible],
+        "residence_time": residence_time[feasible],
+    }
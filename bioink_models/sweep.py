@@ -0,0 +1,125 @@
+import numpy as np
+from math import pi
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from bioink_models import kernel
+
+# PARAMETER SWEEP #
+# evaluates the power law needle model over the full grid
+#   needle radius R [m] x needle length Ln [m] x bioink (K [Pa*s^n], n [-]) x pressure Pn [Pa] or flow rate Qn [m^3/s]
+# K and n are paired: one bioink is one (K, n) couple, so they must have the same length
+# the grid is flattened in C order (R slowest, Pn/Qn fastest) and processed in chunks of rows,
+# which bounds the size of the temporary arrays; chunks can be spread over a process pool, with at
+# most two chunks per process in flight so memory stays bounded while the table is consumed
+
+COLUMNS = (
+    "R",
+    "Ln",
+    "ink",
+    "K",
+    "n",
+    "Pn",
+    "Qave",
+    "tau_wall",
+    "V_average",
+    "eta_PL",
+    "Re_PL",
+    "residence_time",
+)
+
+
+def _grid_axes(R, Ln, K, n, Pn, Qn):
+    if (Pn is None) == (Qn is None):
+        raise ValueError("give either the pressure drop Pn or the flow rate Qn")
+    axes = [np.ravel(np.asarray(a, dtype=np.float64)) for a in (R, Ln, K, n)]
+    if axes[2].size != axes[3].size:
+        raise ValueError("K and n must have the same length (one value per bioink)")
+    load = np.ravel(np.asarray(Pn if Qn is None else Qn, dtype=np.float64))
+    return axes[0], axes[1], axes[2], axes[3], load, Qn is None
+
+
+# evaluate rows [start, stop) of the flattened grid
+def _evaluate(R, Ln, K, n, load, pressure_is_known, rho, start, stop):
+    shape = (R.size, Ln.size, K.size, load.size)
+    i_R, i_Ln, i_ink, i_load = np.unravel_index(np.arange(start, stop), shape)
+    R, Ln, K, n, load = R[i_R], Ln[i_Ln], K[i_ink], n[i_ink], load[i_load]
+
+    if pressure_is_known:
+        Pn = load
+        Q = kernel.Qave(R, Ln, Pn, K, n)
+    else:
+        Q = load
+        Pn = kernel.Pn_func(Q, R, Ln, K, n)
+
+    V_average = Q / (pi * R**2)
+    eta_PL = kernel.eta_PL(V_average, R, K, n)
+    return {
+        "R": R,
+        "Ln": Ln,
+        "ink": i_ink,
+        "K": K,
+        "n": n,
+        "Pn": Pn,
+        "Qave": Q,
+        "tau_wall": kernel.tau_wall(R, Ln, Pn),
+        "V_average": V_average,
+        "eta_PL": eta_PL,
+        "Re_PL": rho * V_average * 2 * R / eta_PL,
+        "residence_time": Ln / V_average,
+    }
+
+
+def _evaluate_packed(args):
+    return _evaluate(*args)
+
+
+# func over the jobs in a pool, results in job order, with at most window jobs submitted and not
+# yet consumed; jobs is read lazily, and the jobs still pending are cancelled if the consumer stops
+def _bounded_map(pool, func, jobs, window):
+    pending = deque()
+    try:
+        for job in jobs:
+            pending.append(pool.submit(func, job))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# yield the sweep table chunk by chunk (use this when the whole table does not fit in memory)
+def iter_sweep(
+    R, Ln, K, n, Pn=None, Qn=None, rho=1000, chunk_size=1_000_000, processes=None
+):
+    R, Ln, K, n, load, pressure_is_known = _grid_axes(R, Ln, K, n, Pn, Qn)
+    size = R.size * Ln.size * K.size * load.size
+    jobs = (
+        (R, Ln, K, n, load, pressure_is_known, rho, start, min(start + chunk_size, size))
+        for start in range(0, size, chunk_size)
+    )
+    if processes is None or processes <= 1:
+        for job in jobs:
+            yield _evaluate_packed(job)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            yield from _bounded_map(pool, _evaluate_packed, jobs, 2 * processes)
+
+
+# evaluate the whole grid and return a columnar table {column name: 1D array}
+def sweep(
+    R, Ln, K, n, Pn=None, Qn=None, rho=1000, chunk_size=1_000_000, processes=None
+):
+    chunks = list(iter_sweep(R, Ln, K, n, Pn, Qn, rho, chunk_size, processes))
+    if not chunks:
+        return {col: np.empty(0) for col in COLUMNS}
+    return {col: np.concatenate([c[col] for c in chunks]) for col in COLUMNS}
+
+
+# columnar table -> pandas DataFrame
+def to_frame(table):
+    import pandas as pd
+
+    return pd.DataFrame(table, columns=list(COLUMNS))
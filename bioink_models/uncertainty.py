@@ -0,0 +1,433 @@
+import argparse
+import functools
+import numpy as np
+from math import pi
+from concurrent.futures import ProcessPoolExecutor
+
+from bioink_models import kernel
+
+# MONTE CARLO UNCERTAINTY PROPAGATION #
+# propagates the uncertainty of the power law fit and the tolerances of the needle and of the
+# dispenser to the print outputs:
+#   K, n        : bivariate normal around the fitted values with the fit covariance
+#                 (fitting.fit_power_law(...)["cov"][i]); samples with K <= 0 or n <= 0 are dropped
+#   R, Ln, Pn/Qn: relative tolerances, uniform in nominal*(1 +- tol) or normal with tol as the
+#                 relative standard deviation
+# samples come from a pseudo-random generator (method="random") or a Sobol sequence, digitally
+# shifted when a seed is given (method="sobol", lower error for the same count on these smooth
+# outputs), and are evaluated in chunks, so millions of samples need no more memory than one chunk;
+# every output goes into a streaming log-spaced histogram from which the percentiles are read at
+# the end (relative bin width about 1e-3) alongside the exact mean and standard deviation
+# chunks are independent (Sobol index ranges, spawned random streams) and may run in a process pool
+
+INPUTS = ("K", "n", "R", "Ln", "load")
+OUTPUTS = ("Qave", "Pn", "tau_wall", "V_average", "residence_time")
+PERCENTILES = (0.5, 2.5, 5, 25, 50, 75, 95, 97.5, 99.5)
+HISTOGRAM_BINS = 1 << 14
+HISTOGRAM_SPAN = 1e3  # histogram covers the pilot chunk range widened by this factor each way
+
+
+# SOBOL SEQUENCE #
+# primitive polynomials (degree s, coefficients a) and initial direction numbers m of the first
+# dimensions (Joe & Kuo, new-joe-kuo-6.21201); dimension 0 is the van der Corput sequence
+_SOBOL_TABLE = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+)
+_SOBOL_BITS = 32
+
+
+# direction numbers v[dimension, bit] scaled to 32-bit integers
+def _sobol_directions(dimensions):
+    if dimensions > len(_SOBOL_TABLE) + 1:
+        raise ValueError(f"Sobol sampling supports up to {len(_SOBOL_TABLE) + 1} dimensions")
+    v = np.zeros((dimensions, _SOBOL_BITS), dtype=np.uint64)
+    v[0] = [1 << (_SOBOL_BITS - 1 - k) for k in range(_SOBOL_BITS)]
+    for d in range(1, dimensions):
+        s, a, m = _SOBOL_TABLE[d - 1]
+        m = list(m)
+        for k in range(s, _SOBOL_BITS):
+            value = m[k - s] ^ (m[k - s] << s)
+            for j in range(1, s):
+                if (a >> (s - 1 - j)) & 1:
+                    value ^= m[k - j] << j
+            m.append(value)
+        v[d] = [m[k] << (_SOBOL_BITS - 1 - k) for k in range(_SOBOL_BITS)]
+    return v
+
+
+# XOR of the direction numbers v[:, bits] selected by every value of len(bits) bits,
+# (2^len(bits), dimensions), built by doubling
+def _xor_table(v, bits):
+    table = np.zeros((1, v.shape[0]), dtype=np.uint64)
+    for k in bits:
+        table = np.concatenate([table, table ^ v[:, k]])
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def _sobol_tables(dimensions):
+    v = _sobol_directions(dimensions)
+    half = _SOBOL_BITS // 2
+    return _xor_table(v, range(half)), _xor_table(v, range(half, _SOBOL_BITS))
+
+
+# points [start, stop) of the Sobol sequence in (0, 1)^dimensions, digitally shifted by shift
+# (one 32-bit integer per dimension, zero for the plain sequence); point i is the XOR of the
+# direction numbers of the set bits of its Gray code, read as two table lookups (low and high
+# 16 bits) for all points of the range at once
+def sobol(start, stop, dimensions, shift=None):
+    low, high = _sobol_tables(dimensions)
+    i = np.arange(start, stop, dtype=np.uint64)
+    gray = i ^ (i >> np.uint64(1))
+    half = np.uint64(_SOBOL_BITS // 2)
+    x = low[gray & np.uint64((1 << (_SOBOL_BITS // 2)) - 1)] ^ high[gray >> half]
+    if shift is not None:
+        x ^= np.asarray(shift, dtype=np.uint64)
+    # centre of the 2^-32 cell, so no point lands on 0 or 1
+    return (x.astype(np.float64) + 0.5) / 2.0**_SOBOL_BITS
+
+
+# inverse of the standard normal distribution function (Acklam's rational approximation, relative
+# error below 1.2e-9), vectorized
+_A = (-39.69683028665376, 220.9460984245205, -275.9285104469687, 138.3577518672690,
+      -30.66479806614716, 2.506628277459239)
+_B = (-54.47609879822406, 161.5858368580409, -155.6989798598866, 66.80131188771972,
+      -13.28068155288572)
+_C = (-7.784894002430293e-03, -0.3223964580411365, -2.400758277161838, -2.549732539343734,
+      4.374664141464968, 2.938163982698783)
+_D = (7.784695709041462e-03, 0.3224671290700398, 2.445134137142996, 3.754408661907416)
+
+
+def norm_ppf(p):
+    p = np.asarray(p, dtype=np.float64)
+    q = p - 0.5
+    r = q * q
+    central = (
+        (((((_A[0] * r + _A[1]) * r + _A[2]) * r + _A[3]) * r + _A[4]) * r + _A[5]) * q
+        / (((((_B[0] * r + _B[1]) * r + _B[2]) * r + _B[3]) * r + _B[4]) * r + 1)
+    )
+    # tails, mirrored so that both use the small tail probability
+    t = np.sqrt(-2 * np.log(np.minimum(p, 1 - p)))
+    tail = (
+        (((((_C[0] * t + _C[1]) * t + _C[2]) * t + _C[3]) * t + _C[4]) * t + _C[5])
+        / ((((_D[0] * t + _D[1]) * t + _D[2]) * t + _D[3]) * t + 1)
+    )
+    return np.where(np.abs(q) <= 0.5 - 0.02425, central, np.where(q < 0, tail, -tail))
+
+
+# STREAMING HISTOGRAM #
+
+
+# fixed log-spaced bins over [lo, hi] plus under/overflow counts, exact count/sum/sum of squares
+# histograms of separate chunks with the same bins add up with merge()
+class StreamingHistogram:
+    def __init__(self, lo, hi, bins=HISTOGRAM_BINS):
+        self.edges = np.geomspace(lo, hi, bins + 1)
+        self._log_lo = np.log(lo)
+        self._scale = bins / (np.log(hi) - np.log(lo))
+        self.counts = np.zeros(bins + 2, dtype=np.int64)  # [underflow, bins..., overflow]
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+
+    # running mean and squared deviations, chunks combined with Chan's parallel update (no
+    # cancellation, a constant output has a std of exactly 0)
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return
+        with np.errstate(divide="ignore", invalid="ignore"):
+            index = np.floor((np.log(values) - self._log_lo) * self._scale)
+        index = np.clip(np.nan_to_num(index, nan=-1, neginf=-1), -1, len(self.counts) - 2)
+        self.counts += np.bincount(index.astype(np.int64) + 1, minlength=len(self.counts))
+        # deviations from the first value keep the chunk statistics exact for constant chunks
+        shifted = values - values[0]
+        shift_mean = shifted.mean()
+        deviation = shifted - shift_mean
+        self._combine(values.size, values[0] + shift_mean, np.dot(deviation, deviation))
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def merge(self, other):
+        self.counts += other.counts
+        if other.count:
+            self._combine(other.count, other._mean, other._m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return float(self._mean) if self.count else float("nan")
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return float("nan")
+        return float(np.sqrt(max(self._m2 / (self.count - 1), 0.0)))
+
+    # percentiles q [%], log-linear interpolation inside the bins; percentiles that fall in the
+    # under/overflow are clamped to the observed min/max
+    def percentile(self, q):
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        cumulative = np.cumsum(self.counts)
+        target = q / 100 * self.count
+        k = np.clip(np.searchsorted(cumulative, target, side="left"), 0, len(self.counts) - 1)
+        before = np.where(k > 0, cumulative[np.maximum(k - 1, 0)], 0)
+        inside = np.where(self.counts[k] > 0, (target - before) / np.maximum(self.counts[k], 1), 0)
+        bin_index = np.clip(k - 1, 0, len(self.edges) - 2)
+        lo, hi = np.log(self.edges[bin_index]), np.log(self.edges[bin_index + 1])
+        value = np.exp(lo + np.clip(inside, 0, 1) * (hi - lo))
+        value = np.where(k == 0, self.min, np.where(k == len(self.counts) - 1, self.max, value))
+        return np.clip(value, self.min, self.max)
+
+
+# SAMPLING AND PROPAGATION #
+
+
+def _check_load(Pn, Qn):
+    if (Pn is None) == (Qn is None):
+        raise ValueError("give either the pressure drop Pn or the flow rate Qn")
+    return (Pn, True) if Qn is None else (Qn, False)
+
+
+# lower Cholesky factor of the (K, n) covariance, tolerant to a singular (e.g. zero) matrix
+def _cholesky(cov):
+    cov = np.zeros((2, 2)) if cov is None else np.asarray(cov, dtype=np.float64)
+    w, V = np.linalg.eigh(0.5 * (cov + cov.T))
+    return V * np.sqrt(np.clip(w, 0, None))
+
+
+# input samples of chunk [start, stop): {K, n, R, Ln, load}, uniforms u in (0, 1)^5 mapped to the
+# input distributions
+def _inputs(u, K, n, cov, R, Ln, load, tolerance, distribution):
+    z = norm_ppf(u[:, :2]) @ _cholesky(cov).T
+    samples = {"K": K + z[:, 0], "n": n + z[:, 1]}
+    for j, (name, nominal) in enumerate((("R", R), ("Ln", Ln), ("load", load)), start=2):
+        tol = tolerance.get(name, 0.0)
+        if distribution == "normal":
+            factor = 1 + tol * norm_ppf(u[:, j])
+        else:
+            factor = 1 + tol * (2 * u[:, j] - 1)
+        samples[name] = nominal * factor
+    return samples
+
+
+def _uniforms(method, seed, start, stop):
+    if method == "sobol":
+        shift = None
+        if seed is not None:
+            shift = np.random.default_rng(seed).integers(0, 1 << _SOBOL_BITS, len(INPUTS))
+        return sobol(start, stop, len(INPUTS), shift)
+    if method == "random":
+        # one independent stream per chunk, identified by its start index
+        rng = np.random.default_rng([start] + ([] if seed is None else [seed]))
+        return rng.random((stop - start, len(INPUTS)))
+    raise ValueError(f"unknown sampling method {method!r} (use 'random' or 'sobol')")
+
+
+# evaluate the samples [start, stop): output arrays and the number of dropped samples
+def _evaluate(start, stop, K, n, cov, R, Ln, load, pressure_is_known, tolerance, distribution,
+              method, seed):
+    u = _uniforms(method, seed, start, stop)
+    s = _inputs(u, K, n, cov, R, Ln, load, tolerance, distribution)
+    keep = (s["K"] > 0) & (s["n"] > 0) & (s["R"] > 0) & (s["Ln"] > 0) & (s["load"] > 0)
+    K, n, R, Ln, load = [s[name][keep] for name in INPUTS]
+    if pressure_is_known:
+        Pn, Q = load, kernel.Qave(R, Ln, load, K, n)
+    else:
+        Pn, Q = kernel.Pn_func(load, R, Ln, K, n), load
+    V_average = Q / (pi * R**2)
+    outputs = {
+        "Qave": Q,
+        "Pn": Pn,
+        "tau_wall": kernel.tau_wall(R, Ln, Pn),
+        "V_average": V_average,
+        "residence_time": Ln / V_average,
+    }
+    return outputs, int((~keep).sum())
+
+
+def _histograms(outputs, bins):
+    histograms = {}
+    for name, values in outputs.items():
+        finite = values[np.isfinite(values) & (values > 0)]
+        lo, hi = (finite.min(), finite.max()) if finite.size else (1e-300, 1e300)
+        histograms[name] = StreamingHistogram(lo / HISTOGRAM_SPAN, hi * HISTOGRAM_SPAN, bins)
+    return histograms
+
+
+def _chunk_histograms(args):
+    edges, job = args[0], args[1:]
+    outputs, dropped = _evaluate(*job)
+    histograms = {}
+    for name, (lo, hi, bins) in edges.items():
+        histograms[name] = StreamingHistogram(lo, hi, bins)
+        histograms[name].add(outputs[name])
+    return histograms, dropped
+
+
+# Monte Carlo propagation of samples input samples; returns
+#   {"samples": evaluated, "dropped": non-physical draws, "histograms": {output: histogram},
+#    "percentiles": {output: {q: value}}, "mean": {...}, "std": {...}}
+#   K, n, cov : fitted power law and its 2x2 covariance of (K, n) (None: exact)
+#   tolerance : relative tolerances {"R": ..., "Ln": ..., "Pn": ...} (or "Qn")
+def propagate(
+    K,
+    n,
+    cov,
+    R,
+    Ln,
+    Pn=None,
+    Qn=None,
+    tolerance=None,
+    samples=1_000_000,
+    method="sobol",
+    distribution="uniform",
+    seed=None,
+    percentiles=PERCENTILES,
+    chunk_size=200_000,
+    processes=None,
+    bins=HISTOGRAM_BINS,
+):
+    load, pressure_is_known = _check_load(Pn, Qn)
+    tolerance = dict(tolerance or {})
+    tolerance["load"] = tolerance.pop("Pn" if pressure_is_known else "Qn", 0.0)
+    if method == "random" and seed is None:
+        seed = np.random.SeedSequence().entropy
+    args = (K, n, cov, R, Ln, load, pressure_is_known, tolerance, distribution, method, seed)
+
+    # the first chunk fixes the histogram ranges
+    first = min(chunk_size, samples)
+    outputs, dropped = _evaluate(0, first, *args)
+    histograms = _histograms(outputs, bins)
+    for name, values in outputs.items():
+        histograms[name].add(values)
+    edges = {name: (h.edges[0], h.edges[-1], bins) for name, h in histograms.items()}
+    jobs = (
+        (edges, start, min(start + chunk_size, samples)) + args
+        for start in range(first, samples, chunk_size)
+    )
+    if processes is None or processes <= 1:
+        results = map(_chunk_histograms, jobs)
+        for chunk, chunk_dropped in results:
+            for name in histograms:
+                histograms[name].merge(chunk[name])
+            dropped += chunk_dropped
+    else:
+        from bioink_models.sweep import _bounded_map
+
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            # a few chunks per process in flight, not every chunk of the run
+            for chunk, chunk_dropped in _bounded_map(pool, _chunk_histograms, jobs, 2 * processes):
+                for name in histograms:
+                    histograms[name].merge(chunk[name])
+                dropped += chunk_dropped
+
+    return {
+        "samples": samples - dropped,
+        "dropped": dropped,
+        "histograms": histograms,
+        "percentiles": {
+            name: dict(zip(percentiles, h.percentile(percentiles).tolist()))
+            for name, h in histograms.items()
+        },
+        "mean": {name: h.mean for name, h in histograms.items()},
+        "std": {name: h.std for name, h in histograms.items()},
+    }
+
+
+UNITS = {"Qave": "uL/s", "Pn": "kPa", "tau_wall": "kPa", "V_average": "mm/s", "residence_time": "s"}
+SCALE = {"Qave": 1e9, "Pn": 1e-3, "tau_wall": 1e-3, "V_average": 1e3, "residence_time": 1.0}
+
+
+def format_table(result):
+    qs = list(next(iter(result["percentiles"].values())))
+    header = f"{'output':<16} {'unit':<5} {'mean':>10} {'std':>10}" + "".join(
+        f" {f'p{q:g}':>10}" for q in qs
+    )
+    lines = [header]
+    for name in OUTPUTS:
+        scale = SCALE[name]
+        values = [result["mean"][name], result["std"][name]] + list(
+            result["percentiles"][name].values()
+        )
+        lines.append(
+            f"{name:<16} {UNITS[name]:<5}" + "".join(f" {v * scale:>10.5g}" for v in values)
+        )
+    lines.append(f"{result['samples']} samples, {result['dropped']} non-physical draws dropped")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Confidence bands of the needle outputs from the fit covariance and tolerances"
+    )
+    parser.add_argument("--K", type=float, default=160.630, help="consistency index [Pa*s^n]")
+    parser.add_argument("--n", type=float, default=0.360, help="flow behavior index [-]")
+    parser.add_argument(
+        "--cov", type=float, nargs=3, default=None, metavar=("VAR_K", "COV_KN", "VAR_N"),
+        help="covariance of the (K, n) fit",
+    )
+    parser.add_argument("--radius", type=float, default=100e-6, help="needle radius [m]")
+    parser.add_argument("--length", type=float, default=0.02, help="needle length [m]")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--pressure", type=float, help="pressure drop [Pa]")
+    load.add_argument("--flow-rate", type=float, help="flow rate [m^3/s]")
+    parser.add_argument("--tol-radius", type=float, default=0.0, help="relative tolerance of R")
+    parser.add_argument("--tol-length", type=float, default=0.0, help="relative tolerance of Ln")
+    parser.add_argument("--tol-load", type=float, default=0.0, help="relative tolerance of Pn/Qn")
+    parser.add_argument("--distribution", default="uniform", choices=("uniform", "normal"))
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--method", default="sobol", choices=("sobol", "random"))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("-j", "--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    cov = None
+    if args.cov is not None:
+        var_K, cov_Kn, var_n = args.cov
+        cov = [[var_K, cov_Kn], [cov_Kn, var_n]]
+    Pn, Qn = args.pressure, args.flow_rate
+    if Pn is None and Qn is None:
+        Pn = 1465.807e3
+    key = "Pn" if Qn is None else "Qn"
+    result = propagate(
+        args.K,
+        args.n,
+        cov,
+        args.radius,
+        args.length,
+        Pn=Pn,
+        Qn=Qn,
+        tolerance={"R": args.tol_radius, "Ln": args.tol_length, key: args.tol_load},
+        samples=args.samples,
+        method=args.method,
+        distribution=args.distribution,
+        seed=args.seed,
+        processes=args.processes,
+    )
+    print(format_table(result))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
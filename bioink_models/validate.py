@@ -0,0 +1,234 @@
+import os
+import re
+import csv
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from bioink_models.grid import radial_weights
+from bioink_models.rheology import MODELS
+
+# ANALYTIC VS SIMULATION VALIDATION #
+# compares a simulation profile with the analytic solution at the radii where it was sampled,
+# instead of spreading the samples evenly over 0..R:
+#   ParaView csv : radius = distance of Points:0..2 from the needle axis, the axis being parallel
+#                  to the coordinate that stays constant along the sample line and passing through
+#                  the first sample (the export puts point 0 on the centre)
+#   .xy sample   : radius = |x|
+# the model is evaluated right at those radii (closed form for the power law, vectorized quadrature
+# otherwise), samples outside the needle (r > R) are left out and counted
+# error metrics of every field (velocity, shear rate, shear stress, viscosity):
+#   l2 = sqrt(mean((sim - ana)^2)), linf = max|sim - ana|,
+#   rel_l2 = ||sim - ana||_2 / ||ana||_2, rel_linf = linf / max|ana|
+# means and norms are weighted by the radial spacing of the samples (grid.radial_weights), so
+# non-uniform sampling does not over-count densely sampled regions
+# a field passes when rel_l2 <= its tolerance; fields the file does not carry (.xy samples have no
+# shear rate or viscosity) are reported as missing and do not count
+
+FIELDS = ("velocity", "shear_rate", "shear_stress", "viscosity")
+TOLERANCE = {"velocity": 0.1, "shear_rate": 0.1, "shear_stress": 0.1, "viscosity": 0.2}
+TABLE_COLUMNS = (
+    "run",
+    "field",
+    "n_points",
+    "n_outside",
+    "l2",
+    "linf",
+    "rel_l2",
+    "rel_linf",
+    "tolerance",
+    "passed",
+)
+CASE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)uLs\.(xy|csv)$")
+
+
+# sample radii [m] and simulated fields of a ParaView csv or .xy file
+def load_samples(path, rho=1000):
+    if path.endswith(".xy"):
+        from bioink_models.xy import load_xy
+
+        data = load_xy(path)
+        return np.abs(data["x"]), {
+            "velocity": np.abs(data["U_y"]),
+            "shear_stress": np.abs(data["shearStress_xy"]) * rho,
+        }
+
+    from bioink_models import paraview
+
+    data = paraview.read_profile(path, rho)
+    return sample_radius(data), {
+        "velocity": data["U"],
+        "shear_rate": data["strainRate"],
+        "shear_stress": data["shearStress"],
+        "viscosity": data["nu"],
+    }
+
+
+def sample_radius(data):
+    names = [f"Points:{i}" for i in range(3)]
+    if not all(name in data for name in names):
+        return np.asarray(data["arc_length"])
+    points = np.stack([np.asarray(data[name]) for name in names], axis=1)
+    axis = np.ptp(points, axis=0).argmin()
+    offset = np.delete(points - points[0], axis, axis=1)
+    return np.hypot(offset[:, 0], offset[:, 1])
+
+
+# analytic fields of the model at radii r
+def analytic(model, r, R, Ln, Pn):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "velocity": model.velocity(r, Pn, R, Ln),
+            "shear_rate": model.gamma_dot(r, Ln, Pn),
+            "shear_stress": model.tau_rz(r, Ln, Pn),
+            "viscosity": model.eta(r, Ln, Pn),
+        }
+
+
+# weights : per-sample weights (e.g. radial_weights(r) for non-uniform samples), uniform if None
+def error_metrics(simulated, exact, weights=None):
+    simulated = np.asarray(simulated, dtype=np.float64)
+    exact = np.asarray(exact, dtype=np.float64)
+    keep = np.isfinite(simulated) & np.isfinite(exact)
+    diff = simulated[keep] - exact[keep]
+    exact = exact[keep]
+    w = np.ones_like(diff) if weights is None else np.asarray(weights, dtype=np.float64)[keep]
+    if diff.size == 0 or not w.sum() > 0:
+        nan = float("nan")
+        return dict(n_points=int(diff.size), l2=nan, linf=nan, rel_l2=nan, rel_linf=nan)
+    linf = np.abs(diff).max()
+    return {
+        "n_points": int(diff.size),
+        "l2": float(np.sqrt(np.sum(w * diff**2) / w.sum())),
+        "linf": float(linf),
+        "rel_l2": float(np.sqrt(np.sum(w * diff**2) / np.sum(w * exact**2))),
+        "rel_linf": float(linf / np.abs(exact).max()),
+    }
+
+
+# table rows (one per field) of one simulation run
+#   model : rheology model instance; Pn [Pa] or Qn [m^3/s] of the run; tolerance : {field: rel_l2}
+def validate_run(path, model, R, Ln, Pn=None, Qn=None, rho=1000, tolerance=None):
+    tolerance = {**TOLERANCE, **(tolerance or {})}
+    if Pn is None:
+        Pn = model.pressure(Qn, R, Ln)
+    r, simulated = load_samples(path, rho)
+    inside = r <= R
+    exact = analytic(model, r[inside], R, Ln, Pn)
+    weights = radial_weights(r[inside])
+    rows = []
+    for field in FIELDS:
+        row = {"run": os.path.basename(path), "field": field, "n_outside": int((~inside).sum())}
+        if field in simulated:
+            row.update(error_metrics(simulated[field][inside], exact[field], weights))
+            row["tolerance"] = tolerance[field]
+            row["passed"] = bool(row["rel_l2"] <= tolerance[field])
+        else:
+            row.update(error_metrics([], []))
+            row.update(tolerance=tolerance[field], passed=None)
+        rows.append(row)
+    return rows
+
+
+def _validate_packed(args):
+    return validate_run(*args)
+
+
+# [(flow rate [m^3/s], path)] of every '<flow rate [uL/s]>uLs.xy' / '.csv' file of a directory
+def discover_cases(directory, pattern=CASE_PATTERN):
+    cases = []
+    for name in sorted(os.listdir(directory)):
+        match = pattern.match(name)
+        if match:
+            cases.append((float(match.group(1)) * 1e-9, os.path.join(directory, name)))
+    return sorted(cases)
+
+
+# validate every case of a directory in a process pool; cases are (Qn [m^3/s], path) or
+# {"path": ..., "Pn": ...} / {"path": ..., "Qn": ...}, discovered from the file names by default
+def validate_directory(
+    directory, model, R, Ln, rho=1000, tolerance=None, cases=None, processes=None
+):
+    cases = discover_cases(directory) if cases is None else cases
+    jobs = []
+    for case in cases:
+        if isinstance(case, dict):
+            Pn, Qn, path = case.get("Pn"), case.get("Qn"), case["path"]
+        else:
+            (Qn, path), Pn = case, None
+        jobs.append((path, model, R, Ln, Pn, Qn, rho, tolerance))
+    if processes is not None and processes <= 1:
+        results = [_validate_packed(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_validate_packed, jobs))
+    return [row for rows in results for row in rows]
+
+
+# True when every compared field of every run passed
+def all_passed(rows):
+    return all(row["passed"] is not False for row in rows)
+
+
+def write_table(rows, out_path):
+    with open(out_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, TABLE_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_table(rows):
+    lines = [
+        f"{'run':<16} {'field':<13} {'points':>7} {'outside':>7} {'l2':>11} {'linf':>11} "
+        f"{'rel_l2':>9} {'rel_linf':>9}  result"
+    ]
+    for row in rows:
+        result = {True: "PASS", False: "FAIL", None: "n/a"}[row["passed"]]
+        lines.append(
+            f"{row['run']:<16} {row['field']:<13} {row['n_points']:>7} {row['n_outside']:>7} "
+            f"{row['l2']:>11.4g} {row['linf']:>11.4g} {row['rel_l2']:>9.4f} "
+            f"{row['rel_linf']:>9.4f}  {result}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare every <flow rate>uLs.xy/.csv run of a directory with the analytic model"
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--model", default="power_law", choices=sorted(MODELS))
+    parser.add_argument(
+        "--params",
+        type=float,
+        nargs="+",
+        default=[160.630, 0.360],
+        help="model parameters in order (power law: K n)",
+    )
+    parser.add_argument("--length", type=float, default=0.02, help="needle length [m]")
+    parser.add_argument("--radius", type=float, default=100e-6, help="needle radius [m]")
+    parser.add_argument("--rho", type=float, default=1000, help="density [kg/m^3]")
+    parser.add_argument("--tolerance", type=float, default=None, help="rel_l2 of every field")
+    parser.add_argument("-o", "--out", help="also write the table as csv")
+    parser.add_argument("-j", "--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    model = MODELS[args.model](*args.params)
+    tolerance = None if args.tolerance is None else dict.fromkeys(FIELDS, args.tolerance)
+    rows = validate_directory(
+        args.directory,
+        model,
+        args.radius,
+        args.length,
+        args.rho,
+        tolerance,
+        processes=args.processes,
+    )
+    print(format_table(rows))
+    if args.out:
+        write_table(rows, args.out)
+    return 0 if all_passed(rows) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+import os
+import json
+import numpy as np
+
+# .XY LINE-SAMPLE FILES #
+# OpenFOAM sample output: one '#' header line with the column names, then whitespace separated rows
+# the text is parsed once into a binary columnar cache, (columns, rows) float64 in a .npy file, and
+# every later load memory-maps that file, so each column is a zero-copy contiguous view
+# the cache is rebuilt whenever the source mtime or size changes
+
+# column names used when the file has no header line
+COLUMNS = (
+    "x",
+    "shearStress_xx",
+    "shearStress_xy",
+    "shearStress_xz",
+    "shearStress_yy",
+    "shearStress_yz",
+    "shearStress_zz",
+    "U_x",
+    "U_y",
+    "U_z",
+)
+
+CACHE_DIR = ".xycache"  # created next to the .xy file
+
+
+def _header(path):
+    with open(path) as f:
+        first = f.readline()
+    if first.startswith("#"):
+        return tuple(first.lstrip("#").split())
+    return None
+
+
+def _cache_paths(path, cache_dir):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, stem + ".npy"), os.path.join(cache_dir, stem + ".json")
+
+
+# parse the text file into a (columns, rows) array and its column names
+def parse_xy(path):
+    table = np.loadtxt(path, comments="#", ndmin=2, dtype=np.float64)
+    names = _header(path) or COLUMNS[: table.shape[1]]
+    if len(names) != table.shape[1]:
+        names = COLUMNS[: table.shape[1]]
+    return np.ascontiguousarray(table.T), tuple(names)
+
+
+# {column name: 1D array}; zero-copy views of the memory-mapped cache when use_cache is True
+def load_xy(path, cache_dir=None, use_cache=True):
+    if not use_cache:
+        table, names = parse_xy(path)
+        return dict(zip(names, table))
+
+    npy_path, meta_path = _cache_paths(path, cache_dir)
+    stat = os.stat(path)
+    source = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    meta = None
+    if os.path.exists(npy_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("source") != source:
+            meta = None
+
+    if meta is None:
+        table, names = parse_xy(path)
+        os.makedirs(os.path.dirname(npy_path), exist_ok=True)
+        np.save(npy_path + ".tmp.npy", table)
+        os.replace(npy_path + ".tmp.npy", npy_path)
+        meta = {"source": source, "columns": list(names)}
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+    table = np.load(npy_path, mmap_mode="r")
+    return dict(zip(meta["columns"], table))
+
+
+# collapse runs of consecutive rows whose fields (all columns except the coordinate) are identical,
+# e.g. sample points inside the same mesh cell; every run becomes one sample at the mean
+# coordinate, with weight = number of rows in the run and the coordinate span of the run
+def compact(data, coordinate="x"):
+    fields = [k for k in data if k != coordinate]
+    if not fields:
+        return dict(data)
+    size = len(data[coordinate])
+    x = np.asarray(data[coordinate])
+    if size == 0:
+        # no rows: every output column, empty
+        compacted = {coordinate: x.astype(np.float64)}
+        compacted.update({k: np.asarray(data[k]) for k in fields})
+        compacted[coordinate + "_min"] = x.copy()
+        compacted[coordinate + "_max"] = x.copy()
+        compacted["weight"] = np.zeros(0, dtype=np.int64)
+        return compacted
+    changed = np.zeros(size, dtype=bool)
+    changed[0] = True
+    for k in fields:
+        column = np.asarray(data[k])
+        changed[1:] |= column[1:] != column[:-1]
+    starts = np.flatnonzero(changed)
+    weights = np.diff(np.append(starts, size))
+
+    compacted = {coordinate: np.add.reduceat(x, starts) / weights}
+    compacted.update({k: np.asarray(data[k])[starts] for k in fields})
+    compacted[coordinate + "_min"] = np.minimum.reduceat(x, starts)
+    compacted[coordinate + "_max"] = np.maximum.reduceat(x, starts)
+    compacted["weight"] = weights
+    return compacted
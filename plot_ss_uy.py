@@ -1,29 +1,17 @@
-import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
+from bioink_models.xy import load_xy
 
-# Define your columns upfront for clarity
-columns = [
-    "x",
-    "shearStress_xx",
-    "shearStress_xy",
-    "shearStress_xz",
-    "shearStress_yy",
-    "shearStress_yz",
-    "shearStress_zz",
-    "U_x",
-    "U_y",
-    "U_z",
-]
-
-# Load the data from the file
+# Load the data from the file (columns: x, shearStress_xx..zz, U_x, U_y, U_z)
+# the text is parsed once into a binary cache under data/.xycache and memory-mapped afterwards
 file_path = "data/2uLs.xy"
-data = pd.read_csv(file_path, delim_whitespace=True, comment="#", names=columns)
+data = load_xy(file_path)
 
 # Assuming the shear stress and velocity might have negative values and need to be made absolute
-data["shearStress_xy"] = abs(data["shearStress_xy"])
-data["U_y"] = abs(data["U_y"])
+shearStress_xy = np.abs(data["shearStress_xy"])
+U_y = np.abs(data["U_y"])
 
-avg_u_y = data["U_y"].mean()
+avg_u_y = U_y.mean()
 print(f"{0.02/avg_u_y * 1000:.4f} ms")
 
 # Plotting
@@ -33,14 +21,14 @@ fig, ax1 = plt.subplots(figsize=(10, 6))
 color = "tab:red"
 ax1.set_xlabel("Position (m)")
 ax1.set_ylabel("Shear Stress (kPa)", color=color)
-ax1.plot(data["x"], data["shearStress_xy"], color=color)
+ax1.plot(data["x"], shearStress_xy, color=color)
 ax1.tick_params(axis="y", labelcolor=color)
 
 # Creating a twin axis for flow velocity
 ax2 = ax1.twinx()
 color = "tab:blue"
 ax2.set_ylabel("Flow Velocity (m/s)", color=color)
-ax2.plot(data["x"], data["U_y"], color=color)
+ax2.plot(data["x"], U_y, color=color)
 ax2.tick_params(axis="y", labelcolor=color)
 
 # Additional formatting
@@ -0,0 +1,25 @@
+import csv
+import io
+import json
+
+from bioink_models import Pn_func
+from bioink_models.cli import read_records, run
+
+RECORD = {"id": 3, "R": 1e-4, "Ln": 0.02, "K": 160.63, "n": 0.36, "Qn": 1e-9}
+
+
+def test_broken_first_line_keeps_the_csv_columns():
+    stream = io.StringIO(f"garbage{{\n{json.dumps(RECORD)}\n")
+    out = io.StringIO()
+    assert run(stream, out, "ndjson", "csv") == 2
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert rows[0]["error"].startswith("invalid JSON")
+    assert rows[1]["id"] == "3" and rows[1]["error"] == ""
+    assert float(rows[1]["Pn"]) == Pn_func(1e-9, 1e-4, 0.02, 160.63, 0.36)
+
+
+def test_auto_detects_json_lines_only():
+    records = list(read_records(io.StringIO(f"[1]\n{json.dumps(RECORD)}\n")))
+    assert records == [{"error": "not a JSON object: list"}, RECORD]
+    records = list(read_records(io.StringIO("id,R\n1,2\n")))
+    assert records == [{"id": "1", "R": "2"}]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from bioink_models import Pn_func, coaxial
+from bioink_models.rheology import CarreauYasuda, PowerLaw
+
+R, LN = 100e-6, 0.02
+
+
+# one ink in both layers is single fluid flow: the pressure of the total flow rate, and the
+# interface where the power law profile carries the core's share,
+#   Q(r < k*R)/Q = (k^2 - 2*k^(s+2)/(s+2))*(s+2)/s,  s = (n+1)/n
+def test_identical_power_law_inks_are_one_fluid():
+    K, n = 160.63, 0.36
+    ink = PowerLaw(K, n)
+    Q_core, Q_shell = np.array([1e-9, 2e-9, 0.2e-9]), np.array([1e-9, 0.5e-9, 3e-9])
+    result = coaxial.solve(ink, ink, Q_core, Q_shell, R, LN)
+    assert np.allclose(result["Pn"], Pn_func(Q_core + Q_shell, R, LN, K, n), rtol=1e-8)
+    s = (n + 1) / n
+    k = result["fraction"]
+    share = (k**2 - 2 * k ** (s + 2) / (s + 2)) * (s + 2) / s
+    assert np.allclose(share, Q_core / (Q_core + Q_shell), rtol=1e-8)
+    assert np.allclose(result["Q_core"], Q_core, rtol=1e-8)
+    assert np.allclose(result["Q_shell"], Q_shell, rtol=1e-8)
+
+
+def test_identical_generic_inks_are_one_fluid():
+    ink = CarreauYasuda(300, 0.1, 0.5, 2, 0.3)
+    result = coaxial.solve(ink, ink, 1e-9, 1e-9, R, LN)
+    assert result["Pn"] == pytest.approx(ink.pressure(2e-9, R, LN), rel=1e-8)
+
+
+# two Newtonian layers (power laws with n = 1) in closed form for the gradient G and interface r_i:
+#   Q_shell = pi*G*(R^2 - r_i^2)^2/(8*mu_s),  U_i = G*(R^2 - r_i^2)/(4*mu_s)
+#   Q_core = pi*r_i^2*U_i + pi*G*r_i^4/(8*mu_c)
+def test_newtonian_layers_match_the_closed_form():
+    mu_c, mu_s = 10.0, 0.5
+    G, r_i = 5e7, np.array([0.2, 0.5, 0.8]) * R
+    Q_core, Q_shell, U_i = coaxial.layer_flow_rates(
+        PowerLaw(mu_c, 1.0), PowerLaw(mu_s, 1.0), np.full(3, G), r_i, R
+    )
+    U = G * (R**2 - r_i**2) / (4 * mu_s)
+    assert np.allclose(U_i, U, rtol=1e-10)
+    assert np.allclose(Q_shell, np.pi * G * (R**2 - r_i**2) ** 2 / (8 * mu_s), rtol=1e-10)
+    assert np.allclose(Q_core, np.pi * r_i**2 * U + np.pi * G * r_i**4 / (8 * mu_c), rtol=1e-10)
+
+    result = coaxial.solve(PowerLaw(mu_c, 1.0), PowerLaw(mu_s, 1.0), Q_core, Q_shell, R, LN)
+    assert np.allclose(result["r_interface"], r_i, rtol=1e-8)
+    assert np.allclose(result["G"], G, rtol=1e-8)
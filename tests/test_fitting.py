@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from bioink_models.fitting import fit_model, fit_power_law
+from bioink_models.rheology import MODELS
+
+GAMMA_DOT = np.geomspace(1e-2, 1e4, 60)
+TRUE = {
+    "power_law": (160.63, 0.36),
+    "herschel_bulkley": (50.0, 20.0, 0.5),
+    "carreau_yasuda": (300.0, 0.1, 0.5, 2.0, 0.3),
+    "cross": (100.0, 0.1, 1.0, 0.7),
+}
+
+
+def noisy(model, seed, sigma=0.05, datasets=8):
+    rng = np.random.default_rng(seed)
+    eta = MODELS[model](*TRUE[model]).viscosity(GAMMA_DOT)
+    return eta * np.exp(sigma * rng.standard_normal((datasets, GAMMA_DOT.size)))
+
+
+# noise-free data: every model recovers its parameters and reports convergence
+@pytest.mark.parametrize("model", TRUE)
+def test_exact_data_recover_the_parameters(model):
+    eta = MODELS[model](*TRUE[model]).viscosity(GAMMA_DOT)
+    result = fit_model(model, GAMMA_DOT, eta)
+    assert result["converged"].all()
+    assert np.allclose(result["params"][0], TRUE[model], rtol=1e-5)
+    assert np.isclose(result["r2"][0], 1.0)
+
+
+# the log loss power law is the least squares line through log(eta) vs log(gamma_dot)
+def test_log_loss_power_law_is_the_log_log_line():
+    E = noisy("power_law", 0)
+    result = fit_power_law(np.tile(GAMMA_DOT, (len(E), 1)), E)
+    for P, e in zip(result["params"], E):
+        slope, intercept = np.polyfit(np.log(GAMMA_DOT), np.log(e), 1)
+        assert np.allclose(P, [np.exp(intercept), slope + 1], rtol=1e-10)
+
+
+# the linear loss matches scipy's curve_fit on the same data and the same (non-negative) bounds;
+# some of the Cross datasets have their optimum on eta_inf = 0
+@pytest.mark.parametrize("model", ["power_law", "cross"])
+def test_linear_loss_matches_curve_fit(model):
+    optimize = pytest.importorskip("scipy.optimize")
+    E = noisy(model, 1, datasets=4)
+    result = fit_model(model, np.tile(GAMMA_DOT, (len(E), 1)), E, loss="linear")
+    assert result["converged"].all()
+
+    def f(g, *p):
+        return MODELS[model](*p).viscosity(g)
+
+    for P, e in zip(result["params"], E):
+        expected, _ = optimize.curve_fit(
+            f, GAMMA_DOT, e, p0=TRUE[model], bounds=(0, np.inf), xtol=1e-14, ftol=1e-14
+        )
+        assert np.allclose(P, expected, rtol=1e-4, atol=1e-8 * expected.max())
+
+
+def test_bounds_are_respected():
+    eta = MODELS["power_law"](*TRUE["power_law"]).viscosity(GAMMA_DOT)
+    result = fit_power_law(GAMMA_DOT, eta, bounds={"n": (0.0, 0.3)})
+    assert result["params"][0, 1] == pytest.approx(0.3)
+    E = noisy("cross", 2, sigma=0.3, datasets=16)
+    result = fit_model("cross", np.tile(GAMMA_DOT, (len(E), 1)), E)
+    names = list(result["names"])
+    P = result["params"]
+    assert (P >= 0).all()
+    assert (P[:, names.index("eta_inf")] <= P[:, names.index("eta0")]).all()
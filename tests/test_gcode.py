@@ -0,0 +1,63 @@
+import io
+from math import pi
+
+import numpy as np
+import pytest
+
+from bioink_models import gcode
+from bioink_models.geometry import Needle, pressure_drop
+from bioink_models.rheology import CarreauYasuda, PowerLaw
+
+NEEDLES = {
+    "straight": Needle.straight(100e-6, 0.0127),
+    "cartridge": Needle.cartridge(4.5e-3, 0.03, 100e-6, 0.0127, 0.005),
+    "conical": Needle.conical(400e-6, 100e-6, 0.03),
+}
+
+
+def parse(text):
+    return gcode.parse_block(io.StringIO(text).readlines(), gcode._State())
+
+
+# extruding moves of 1, 2 and 3 uL/s: E in mm^3, 10 mm at 600 mm/min take 1 s
+def moves(count):
+    return "G21\nM83\n" + "".join(f"G1 X{10 * (k + 1)} E{k + 1} F600\n" for k in range(count))
+
+
+@pytest.mark.parametrize("needle", NEEDLES, ids=str)
+@pytest.mark.parametrize("count", [1, 2, 3])
+def test_planner_matches_geometry(needle, count):
+    needle = NEEDLES[needle]
+    Q = np.arange(1, count + 1) * 1e-9
+    # the master curve of a non-power-law model interpolates to ~1e-5
+    models = ((PowerLaw(160.63, 0.36), 1e-12), (CarreauYasuda(300, 0.1, 0.5, 2, 0.3), 1e-4))
+    for model, rtol in models:
+        planner = gcode.Planner(needle, model)
+        index, length, extruded, feed, _ = parse(moves(count))
+        results = planner.evaluate(length, extruded, feed)
+        assert np.allclose(results["Q"], Q, rtol=1e-12)
+        expected = [pressure_drop(needle, q, model) for q in Q]
+        assert np.allclose(results["Pn"], expected, rtol=rtol)
+        assert np.allclose(results["residence_time"], needle.volume / Q, rtol=1e-12)
+        tau = model.pressure(Q, planner.R_min, 1.0) * planner.R_min / 2
+        assert np.allclose(results["tau_wall"], tau, rtol=rtol)
+
+
+def test_arcs_follow_the_circle():
+    _, length, _, _, skipped = parse(
+        "G1 X10 Y0 F600\nG2 X0 Y-10 I-10 J0\nG3 X10 Y0 R-10\nG2 X10 Y0 I-10 J0\nG2 X0 Y0\n"
+    )
+    r = 10.0
+    assert np.allclose(length[1:], [pi * r / 2, 3 * pi * r / 2, 2 * pi * r])
+    assert skipped.tolist() == [4]
+
+
+def test_home_resets_only_the_named_axes():
+    _, length, _, _, _ = parse("G1 X3 Y4 Z12 F600\nG28 X\nG1 X3 Y4 Z12\nG28\nG1 X3 Y4 Z12\n")
+    assert np.allclose(length, [13.0, 3.0, 13.0])
+
+
+def test_unparseable_moves_are_skipped():
+    index, _, _, _, skipped = parse("G1 X1 F600\nG1 X# Y2\nG1 X\nN5 G1 X2*33\n")
+    assert index.tolist() == [0, 3]
+    assert skipped.tolist() == [1, 2]
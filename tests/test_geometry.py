@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from bioink_models import Pn_func
+from bioink_models.geometry import (
+    Needle,
+    axial_profile,
+    flow_rate,
+    pressure_drop,
+    residence_time,
+)
+from bioink_models.rheology import CarreauYasuda, PowerLaw
+
+MODELS = [PowerLaw(160.63, 0.36), CarreauYasuda(300, 0.1, 0.5, 2, 0.3)]
+Q = np.array([1e-9, 2e-9, 3e-9])
+
+
+def cartridge():
+    return Needle.cartridge(4.5e-3, 0.03, 100e-6, 0.0127, 0.005)
+
+
+def test_straight_needle_matches_closed_form():
+    needle = Needle.straight(100e-6, 0.02)
+    expected = Pn_func(Q, 100e-6, 0.02, 160.63, 0.36)
+    assert np.allclose(pressure_drop(needle, Q, MODELS[0]), expected, rtol=1e-12)
+
+
+# a batch of flow rates gives the results of one call per flow rate, for multi-segment needles
+@pytest.mark.parametrize("model", MODELS, ids=lambda m: type(m).__name__)
+@pytest.mark.parametrize("count", [1, 2, 3])
+def test_batched_cartridge_matches_scalar_calls(model, count):
+    needle, Qn = cartridge(), Q[:count]
+    scalar = np.array([pressure_drop(needle, q, model) for q in Qn])
+    Pn = pressure_drop(needle, Qn, model)
+    assert np.allclose(Pn, scalar, rtol=1e-12)
+    assert np.allclose(flow_rate(needle, Pn, model), Qn, rtol=1e-8)
+    mean, centre = residence_time(needle, Qn, model)
+    scalar_centre = np.array([residence_time(needle, q, model)[1] for q in Qn])
+    assert np.allclose(mean, needle.volume / Qn, rtol=1e-12)
+    assert np.allclose(centre, scalar_centre, rtol=1e-12)
+
+
+@pytest.mark.parametrize("model", MODELS, ids=lambda m: type(m).__name__)
+def test_axial_profile_falls_from_pressure_drop_to_zero(model):
+    needle = cartridge()
+    pressure = axial_profile(needle, Q, model)["pressure"]
+    assert np.allclose(pressure[0], pressure_drop(needle, Q, model), rtol=1e-12)
+    assert np.all(pressure[-1] == 0)
+    # segment ends repeat as the start of the next segment: equal up to round-off
+    assert np.all(np.diff(pressure, axis=0) <= 1e-12 * pressure[0])
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from bioink_models import kernel
+from bioink_models.grid import (
+    adaptive_grid,
+    flow_rate,
+    graded,
+    integrate,
+    power_law_grid,
+    radial_weights,
+)
+
+R, LN, PN, K = 100e-6, 0.02, 1465.807e3, 160.63
+
+
+def fields(r, n):
+    return {
+        "Vz": kernel.Vz(r, R, LN, PN, K, n),
+        "gamma_dot": kernel.gamma_dot(r, LN, PN, K, n),
+        "eta": kernel.eta(r, LN, PN, K, n),
+    }
+
+
+# linear interpolation on the grid stays within rtol*|f| + atol*max|f| (atol = rtol) at points
+# between the grid radii
+@pytest.mark.parametrize("n", [0.2, 0.36, 0.8])
+@pytest.mark.parametrize("rtol", [1e-3, 1e-5])
+def test_power_law_grid_meets_the_tolerance(n, rtol):
+    r = power_law_grid(R, LN, PN, K, n, rtol=rtol)
+    assert r[0] == 1e-6 and r[-1] == R and np.all(np.diff(r) > 0)
+    between = (r[:-1, None] + np.diff(r)[:, None] * np.linspace(0, 1, 7)[1:-1]).ravel()
+    exact, on_grid = fields(between, n), fields(r, n)
+    for name in exact:
+        scale = np.abs(on_grid[name]).max()
+        error = np.abs(np.interp(between, r, on_grid[name]) - exact[name])
+        assert np.all(error <= rtol * (np.abs(exact[name]) + scale))
+
+
+def test_power_law_grid_flow_rate_matches_qave():
+    n = 0.36
+    r = power_law_grid(R, LN, PN, K, n, rtol=1e-6, r_min=1e-9)
+    Q = flow_rate(r, kernel.Vz(r, R, LN, PN, K, n))
+    assert Q == pytest.approx(kernel.Qave(R, LN, PN, K, n), rel=1e-5)
+
+
+def test_adaptive_grid_meets_the_tolerance():
+    def func(r):
+        return {"a": np.exp(-50 * r), "b": np.sin(20 * r)}
+
+    rtol = 1e-4
+    r = adaptive_grid(func, 0.0, 1.0, rtol=rtol)
+    mid = 0.5 * (r[1:] + r[:-1])
+    for name, f in func(r).items():
+        exact = func(mid)[name]
+        error = np.abs(0.5 * (f[1:] + f[:-1]) - exact)
+        assert np.all(error <= rtol * np.abs(exact) + rtol * np.abs(f).max())
+
+
+def test_graded_spacing():
+    r = graded(0.0, 1.0, 101, ratio=0.01)
+    h = np.diff(r)
+    assert r[0] == 0.0 and r[-1] == pytest.approx(1.0)
+    assert h[-1] / h[0] == pytest.approx(0.01)
+    assert np.array_equal(graded(0.0, 1.0, 11, ratio=1), np.linspace(0, 1, 11))
+
+
+def test_radial_weights_integrate_unsorted_radii():
+    rng = np.random.default_rng(0)
+    r = np.sort(rng.random(200))
+    shuffle = rng.permutation(r.size)
+    f = np.cos(r)
+    assert np.sum(radial_weights(r[shuffle]) * f[shuffle]) == pytest.approx(integrate(r, f))
+    area = radial_weights(r[shuffle], area=True) @ np.ones(r.size)
+    assert area == pytest.approx(np.pi * (r[-1] ** 2 - r[0] ** 2), rel=1e-4)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from bioink_models.openfoam import CellIndex, cell_centres, face_geometry, read_field
+
+HEADER = "FoamFile\n{\n    format      ascii;\n    class       %s;\n    object      %s;\n}\n\n"
+
+
+def brute_force(centres, points):
+    d = np.linalg.norm(points[:, None, :] - centres[None, :, :], axis=2)
+    return d.argmin(axis=1), d.min(axis=1)
+
+
+CLOUDS = {
+    "uniform": lambda rng: rng.random((3000, 3)),
+    # a long thin needle and a flat cross section, where most buckets are empty or one deep
+    "needle": lambda rng: rng.random((3000, 3)) * [1e-4, 1e-4, 2e-2],
+    "flat": lambda rng: np.c_[rng.random((3000, 2)), np.zeros(3000)],
+    # cells graded toward a wall, like a boundary layer mesh
+    "graded": lambda rng: rng.random((3000, 3)) ** [3, 1, 1],
+}
+
+
+@pytest.mark.parametrize("cloud", CLOUDS)
+def test_nearest_matches_brute_force(cloud):
+    rng = np.random.default_rng(0)
+    centres = CLOUDS[cloud](rng)
+    lo, hi = centres.min(axis=0), centres.max(axis=0)
+    span = np.maximum(hi - lo, 1e-3)
+    # inside the cloud and well beyond its bounding box
+    points = lo - span + rng.random((400, 3)) * 3 * span
+    points[:200] = lo + rng.random((200, 3)) * (hi - lo)
+    index, dist = CellIndex(centres).nearest(points)
+    expected_index, expected_dist = brute_force(centres, points)
+    assert np.array_equal(dist, expected_dist)
+    # ties may pick another centre at the same distance
+    assert np.array_equal(np.linalg.norm(centres[index] - points, axis=1), expected_dist)
+
+
+def test_nearest_beyond_max_distance():
+    rng = np.random.default_rng(1)
+    centres = rng.random((2000, 3))
+    points = rng.random((400, 3)) * 3 - 1
+    index, dist = CellIndex(centres).nearest(points, max_distance=0.05)
+    expected_index, expected_dist = brute_force(centres, points)
+    far = expected_dist > 0.05
+    assert np.all(index[far] == -1) and np.all(np.isinf(dist[far]))
+    assert np.array_equal(dist[~far], expected_dist[~far])
+
+
+# a unit cube as one cell: six outward faces owned by cell 0
+def test_cell_centre_of_a_cube():
+    points = np.array([[i, j, k] for i in (0, 1) for j in (0, 1) for k in (0, 1)], float)
+    faces = [[0, 1, 3, 2], [4, 6, 7, 5], [0, 4, 5, 1], [2, 3, 7, 6], [0, 2, 6, 4], [1, 5, 7, 3]]
+    offsets = np.arange(0, 25, 4)
+    centres, areas = face_geometry(points, offsets, np.concatenate(faces))
+    assert np.allclose(np.abs(areas).sum(axis=1), 1.0)
+    centre = cell_centres(centres, areas, np.zeros(6, int), np.zeros(0, int), 1)
+    assert np.allclose(centre, 0.5)
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        ("internalField   uniform (1 2 3);", [[1, 2, 3]] * 4),
+        ("internalField   nonuniform List<vector> 2((1 2 3) (4 5 6));", [[1, 2, 3], [4, 5, 6]]),
+        ("internalField nonuniform List<scalar>\n3\n(\n1.5\n-2e-3\n7\n)\n;", [[1.5], [-2e-3], [7]]),
+    ],
+)
+def test_read_field(tmp_path, body, expected):
+    path = tmp_path / "U"
+    path.write_text(HEADER % ("volVectorField", "U") + body + "\n")
+    assert np.array_equal(read_field(str(path), n_cells=4), expected)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from bioink_models import kernel, pipeflow
+from bioink_models.rheology import CarreauYasuda, HerschelBulkley, PowerLaw
+
+R, LN, PN, K, N_PL = 100e-6, 0.02, 1465.807e3, 160.63, 0.36
+POWER_LAW = PowerLaw(K, N_PL)
+
+
+def test_thomas_matches_a_dense_solve():
+    rng = np.random.default_rng(0)
+    m, cases = 12, 3
+    lower, upper = rng.random((m, cases)), rng.random((m, cases))
+    diag = 3 + rng.random((m, cases))
+    rhs = rng.random((m, cases))
+    x = pipeflow.thomas(lower, diag, upper, rhs)
+    for c in range(cases):
+        A = np.diag(diag[:, c]) + np.diag(lower[1:, c], -1) + np.diag(upper[:-1, c], 1)
+        assert np.allclose(A @ x[:, c], rhs[:, c])
+
+
+# the discrete fields against the closed-form power law (second order in the spacing); the
+# strain rate and stress come from the discrete U, so they check the solver as well
+@pytest.mark.parametrize("method", ["newton", "picard"])
+@pytest.mark.parametrize("wall_ratio", [1.0, 0.1])
+def test_power_law_matches_the_closed_form(method, wall_ratio):
+    f = pipeflow.solve(POWER_LAW, R, LN, Pn=PN, method=method, wall_ratio=wall_ratio)
+    assert f["converged"].all()
+    assert f["Q"][0] == pytest.approx(kernel.Qave(R, LN, PN, K, N_PL), rel=1e-4)
+    r = f["r"][0]
+    U = kernel.Vz(r, R, LN, PN, K, N_PL)
+    assert np.allclose(f["U"][0], U, rtol=0, atol=1e-5 * U.max())
+    # away from the regularized core near the axis
+    core = r > 0.1 * R
+    gamma_dot = kernel.gamma_dot(r[core], LN, PN, K, N_PL)
+    assert np.allclose(f["strainRate"][0][core], gamma_dot, rtol=1e-4)
+    assert np.allclose(f["shearStress"][0][core], kernel.tau_rz(r[core], LN, PN), rtol=1e-4)
+
+
+def test_flow_rate_mode_finds_the_pressure():
+    Qn = np.array([1e-9, 3e-9])
+    f = pipeflow.solve(POWER_LAW, R, LN, Qn=Qn)
+    assert np.allclose(f["Q"], Qn, rtol=1e-7)
+    assert np.allclose(f["Pn"], kernel.Pn_func(Qn, R, LN, K, N_PL), rtol=1e-4)
+
+
+@pytest.mark.parametrize(
+    "model", [CarreauYasuda(300, 0.1, 0.5, 2, 0.3), HerschelBulkley(200, 100, 0.4)],
+    ids=lambda m: type(m).__name__,
+)
+def test_generic_models_match_the_quadrature(model):
+    f = pipeflow.solve(model, R, LN, Pn=PN)
+    assert f["converged"].all()
+    assert f["Q"][0] == pytest.approx(model.flow_rate(PN, R, LN), rel=1e-4)
+
+
+def test_batch_matches_single_cases():
+    Pn = np.array([0.5e6, 1e6, 1.5e6])
+    batch = pipeflow.solve_batch(POWER_LAW, R, LN, Pn=Pn, chunk_size=2, processes=2)
+    for i, p in enumerate(Pn):
+        single = pipeflow.solve(POWER_LAW, R, LN, Pn=p)
+        assert np.allclose(batch["U"][i], single["U"][0], rtol=1e-12, atol=0)
+        assert batch["Q"][i] == pytest.approx(single["Q"][0], rel=1e-12)
@@ -0,0 +1,24 @@
+import numpy as np
+
+from bioink_models.uncertainty import StreamingHistogram
+
+
+def test_constant_output_has_zero_std():
+    histogram = StreamingHistogram(1.0, 1e4)
+    for _ in range(7):
+        histogram.add(np.full(100_000, 1465.807))
+    assert histogram.mean == 1465.807
+    assert histogram.std == 0.0
+
+
+def test_merged_chunks_match_the_whole_sample():
+    x = np.random.default_rng(0).lognormal(5, 1, 100_000)
+    a, b = StreamingHistogram(1.0, 1e6), StreamingHistogram(1.0, 1e6)
+    for chunk in np.array_split(x[:60_000], 7):
+        a.add(chunk)
+    for chunk in np.array_split(x[60_000:], 3):
+        b.add(chunk)
+    a.merge(b)
+    assert a.count == x.size
+    assert np.isclose(a.mean, x.mean(), rtol=1e-14)
+    assert np.isclose(a.std, x.std(ddof=1), rtol=1e-13)